@@ -53,7 +53,9 @@ def run_migrations_online():
         import asyncio
 
         async def run_async_migrations():
-            async with connectable.begin() as conn:
+            # connect(), not begin(): alembic manages the transaction itself,
+            # which autocommit_block() (CREATE INDEX CONCURRENTLY) relies on
+            async with connectable.connect() as conn:
                 await conn.run_sync(do_run)
 
         asyncio.run(run_async_migrations())
@@ -16,7 +16,45 @@ branch_labels = None
 depends_on = None
 
 
+def _create_shoutout_tables():
+    """
+    `shoutouts` and `shoutout_recipients` predate the migrations (they used to
+    come from `create_all` at startup); create them as they were at this
+    revision when missing so the chain also builds a fresh database.
+    """
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'shoutouts' not in tables:
+        op.create_table(
+            'shoutouts',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('author_id', sa.Integer(), nullable=False),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+            sa.ForeignKeyConstraint(['author_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_shoutouts_id'), 'shoutouts', ['id'], unique=False)
+        op.create_index(op.f('ix_shoutouts_author_id'), 'shoutouts', ['author_id'], unique=False)
+    if 'shoutout_recipients' not in tables:
+        op.create_table(
+            'shoutout_recipients',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('shoutout_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['shoutout_id'], ['shoutouts.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_shoutout_recipients_id'), 'shoutout_recipients', ['id'], unique=False)
+        op.create_index(
+            op.f('ix_shoutout_recipients_shoutout_id'), 'shoutout_recipients', ['shoutout_id'], unique=False
+        )
+        op.create_index(op.f('ix_shoutout_recipients_user_id'), 'shoutout_recipients', ['user_id'], unique=False)
+
+
 def upgrade():
+    _create_shoutout_tables()
+
     # Create enum type for reactions if it doesn't exist
     op.execute("""
         DO $$ BEGIN
@@ -32,7 +70,11 @@ def upgrade():
         sa.Column('id', sa.Integer(), nullable=False),
         sa.Column('shoutout_id', sa.Integer(), nullable=False),
         sa.Column('user_id', sa.Integer(), nullable=False),
-        sa.Column('reaction_type', postgresql.ENUM('like', 'clap', 'star', name='reactiontypeenum'), nullable=False),
+        sa.Column(
+            'reaction_type',
+            postgresql.ENUM('like', 'clap', 'star', name='reactiontypeenum', create_type=False),
+            nullable=False
+        ),
         sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
         sa.ForeignKeyConstraint(['shoutout_id'], ['shoutouts.id'], ),
         sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
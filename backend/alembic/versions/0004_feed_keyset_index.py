@@ -0,0 +1,25 @@
+"""feed keyset index
+
+Revision ID: 0004_feed_keyset_index
+Revises: 0003_add_reactions_and_comments
+Create Date: 2026-10-18 09:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0004_feed_keyset_index'
+down_revision = '0003_add_reactions_and_comments'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # matches ORDER BY created_at DESC, id DESC and the (created_at, id) < (:c, :i) cursor predicate
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_shoutouts_created_at_id "
+        "ON shoutouts (created_at DESC, id DESC)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_shoutouts_created_at_id")
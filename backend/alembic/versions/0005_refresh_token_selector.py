@@ -0,0 +1,29 @@
+"""refresh token selector
+
+Revision ID: 0005_refresh_token_selector
+Revises: 0004_feed_keyset_index
+Create Date: 2026-10-18 10:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0005_refresh_token_selector'
+down_revision = '0004_feed_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS selector VARCHAR")
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_refresh_tokens_selector "
+        "ON refresh_tokens (selector)"
+    )
+    # tokens issued before the selector format can no longer be looked up;
+    # revoke them so their owners simply log in again
+    op.execute("UPDATE refresh_tokens SET revoked = 1 WHERE selector IS NULL AND revoked = 0")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_refresh_tokens_selector")
+    op.execute("ALTER TABLE refresh_tokens DROP COLUMN IF EXISTS selector")
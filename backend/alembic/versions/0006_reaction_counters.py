@@ -0,0 +1,86 @@
+"""reaction counters
+
+Revision ID: 0006_reaction_counters
+Revises: 0005_refresh_token_selector
+Create Date: 2026-10-18 11:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0006_reaction_counters'
+down_revision = '0005_refresh_token_selector'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for column in ('like_count', 'clap_count', 'star_count'):
+        op.execute(f"ALTER TABLE shoutouts ADD COLUMN IF NOT EXISTS {column} INTEGER NOT NULL DEFAULT 0")
+
+    # keep only the latest reaction per (shoutout, user) before enforcing uniqueness
+    op.execute("""
+        DELETE FROM reactions a USING reactions b
+        WHERE a.shoutout_id = b.shoutout_id AND a.user_id = b.user_id AND a.id < b.id
+    """)
+    op.execute("""
+        DO $$ BEGIN
+            ALTER TABLE reactions ADD CONSTRAINT uq_reactions_shoutout_user UNIQUE (shoutout_id, user_id);
+        EXCEPTION
+            WHEN duplicate_object OR duplicate_table THEN null;
+        END $$;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION reactions_maintain_counts() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND OLD.reaction_type = NEW.reaction_type AND OLD.shoutout_id = NEW.shoutout_id THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE shoutouts SET
+                    like_count = like_count - (OLD.reaction_type = 'like')::int,
+                    clap_count = clap_count - (OLD.reaction_type = 'clap')::int,
+                    star_count = star_count - (OLD.reaction_type = 'star')::int
+                WHERE id = OLD.shoutout_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE shoutouts SET
+                    like_count = like_count + (NEW.reaction_type = 'like')::int,
+                    clap_count = clap_count + (NEW.reaction_type = 'clap')::int,
+                    star_count = star_count + (NEW.reaction_type = 'star')::int
+                WHERE id = NEW.shoutout_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS reactions_maintain_counts ON reactions")
+    op.execute("""
+        CREATE TRIGGER reactions_maintain_counts
+        AFTER INSERT OR UPDATE OR DELETE ON reactions
+        FOR EACH ROW EXECUTE FUNCTION reactions_maintain_counts()
+    """)
+
+    # initial fill; scripts/reconcile_reaction_counts.py repairs drift later on
+    op.execute("""
+        UPDATE shoutouts s SET
+            like_count = c.like_count,
+            clap_count = c.clap_count,
+            star_count = c.star_count
+        FROM (
+            SELECT shoutout_id,
+                   count(*) FILTER (WHERE reaction_type = 'like') AS like_count,
+                   count(*) FILTER (WHERE reaction_type = 'clap') AS clap_count,
+                   count(*) FILTER (WHERE reaction_type = 'star') AS star_count
+            FROM reactions GROUP BY shoutout_id
+        ) c
+        WHERE s.id = c.shoutout_id
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS reactions_maintain_counts ON reactions")
+    op.execute("DROP FUNCTION IF EXISTS reactions_maintain_counts()")
+    op.execute("ALTER TABLE reactions DROP CONSTRAINT IF EXISTS uq_reactions_shoutout_user")
+    for column in ('like_count', 'clap_count', 'star_count'):
+        op.execute(f"ALTER TABLE shoutouts DROP COLUMN IF EXISTS {column}")
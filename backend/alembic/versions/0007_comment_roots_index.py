@@ -0,0 +1,25 @@
+"""comment roots index
+
+Revision ID: 0007_comment_roots_index
+Revises: 0006_reaction_counters
+Create Date: 2026-10-18 12:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0007_comment_roots_index'
+down_revision = '0006_reaction_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keyset pages of top-level comments; replies are found through ix_comments_parent_id
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_comments_roots "
+        "ON comments (shoutout_id, created_at, id) WHERE parent_id IS NULL"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_comments_roots")
@@ -0,0 +1,144 @@
+"""daily rollups
+
+Revision ID: 0008_daily_rollups
+Revises: 0007_comment_roots_index
+Create Date: 2026-10-18 13:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0008_daily_rollups'
+down_revision = '0007_comment_roots_index'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = [
+    ('shoutouts', 'INSERT'),
+    ('shoutouts', 'DELETE'),
+    ('shoutout_recipients', 'INSERT'),
+    ('shoutout_recipients', 'DELETE'),
+    ('reactions', 'INSERT'),
+    ('reactions', 'UPDATE'),
+    ('reactions', 'DELETE'),
+]
+
+TRANSITION_TABLES = {
+    'INSERT': 'NEW TABLE AS new_rows',
+    'UPDATE': 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'DELETE': 'OLD TABLE AS old_rows',
+}
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS daily_user_stats (
+            day DATE NOT NULL,
+            user_id INTEGER NOT NULL,
+            sent INTEGER NOT NULL DEFAULT 0,
+            received INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, user_id)
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_daily_user_stats_user_id ON daily_user_stats (user_id)")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS daily_department_stats (
+            day DATE NOT NULL,
+            department VARCHAR NOT NULL,
+            shoutouts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, department)
+        )
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS daily_reaction_stats (
+            day DATE NOT NULL,
+            reaction_type VARCHAR NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, reaction_type)
+        )
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION rollup_shoutouts() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO daily_user_stats AS d (day, user_id, sent)
+                SELECT (created_at AT TIME ZONE 'UTC')::date, author_id, -count(*) FROM old_rows
+                GROUP BY 1, 2 ORDER BY 1, 2
+                ON CONFLICT (day, user_id) DO UPDATE SET sent = d.sent + EXCLUDED.sent;
+                INSERT INTO daily_department_stats AS d (day, department, shoutouts)
+                SELECT (o.created_at AT TIME ZONE 'UTC')::date, coalesce(u.department, ''), -count(*)
+                FROM old_rows o JOIN users u ON u.id = o.author_id
+                GROUP BY 1, 2 ORDER BY 1, 2
+                ON CONFLICT (day, department) DO UPDATE SET shoutouts = d.shoutouts + EXCLUDED.shoutouts;
+            END IF;
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO daily_user_stats AS d (day, user_id, sent)
+                SELECT (created_at AT TIME ZONE 'UTC')::date, author_id, count(*) FROM new_rows
+                GROUP BY 1, 2 ORDER BY 1, 2
+                ON CONFLICT (day, user_id) DO UPDATE SET sent = d.sent + EXCLUDED.sent;
+                INSERT INTO daily_department_stats AS d (day, department, shoutouts)
+                SELECT (n.created_at AT TIME ZONE 'UTC')::date, coalesce(u.department, ''), count(*)
+                FROM new_rows n JOIN users u ON u.id = n.author_id
+                GROUP BY 1, 2 ORDER BY 1, 2
+                ON CONFLICT (day, department) DO UPDATE SET shoutouts = d.shoutouts + EXCLUDED.shoutouts;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION rollup_shoutout_recipients() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO daily_user_stats AS d (day, user_id, received)
+                SELECT (s.created_at AT TIME ZONE 'UTC')::date, o.user_id, -count(*)
+                FROM old_rows o JOIN shoutouts s ON s.id = o.shoutout_id
+                GROUP BY 1, 2 ORDER BY 1, 2
+                ON CONFLICT (day, user_id) DO UPDATE SET received = d.received + EXCLUDED.received;
+            END IF;
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO daily_user_stats AS d (day, user_id, received)
+                SELECT (s.created_at AT TIME ZONE 'UTC')::date, n.user_id, count(*)
+                FROM new_rows n JOIN shoutouts s ON s.id = n.shoutout_id
+                GROUP BY 1, 2 ORDER BY 1, 2
+                ON CONFLICT (day, user_id) DO UPDATE SET received = d.received + EXCLUDED.received;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION rollup_reactions() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO daily_reaction_stats AS d (day, reaction_type, total)
+                SELECT (created_at AT TIME ZONE 'UTC')::date, reaction_type::text, -count(*) FROM old_rows
+                GROUP BY 1, 2 ORDER BY 1, 2
+                ON CONFLICT (day, reaction_type) DO UPDATE SET total = d.total + EXCLUDED.total;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO daily_reaction_stats AS d (day, reaction_type, total)
+                SELECT (created_at AT TIME ZONE 'UTC')::date, reaction_type::text, count(*) FROM new_rows
+                GROUP BY 1, 2 ORDER BY 1, 2
+                ON CONFLICT (day, reaction_type) DO UPDATE SET total = d.total + EXCLUDED.total;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table, event in TRIGGERS:
+        op.execute(
+            f"CREATE OR REPLACE TRIGGER {table}_rollup_{event.lower()} "
+            f"AFTER {event} ON {table} REFERENCING {TRANSITION_TABLES[event]} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION rollup_{table}()"
+        )
+    # history is filled by scripts/backfill_rollups.py, in batches, after the upgrade
+
+
+def downgrade():
+    for table, event in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_rollup_{event.lower()} ON {table}")
+    for table in ('shoutouts', 'shoutout_recipients', 'reactions'):
+        op.execute(f"DROP FUNCTION IF EXISTS rollup_{table}()")
+    for table in ('daily_user_stats', 'daily_department_stats', 'daily_reaction_stats'):
+        op.execute(f"DROP TABLE IF EXISTS {table}")
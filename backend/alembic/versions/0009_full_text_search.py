@@ -0,0 +1,42 @@
+"""full text search
+
+Revision ID: 0009_full_text_search
+Revises: 0008_daily_rollups
+Create Date: 2026-10-18 14:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0009_full_text_search'
+down_revision = '0008_daily_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # stored generated columns: adding them rewrites each table once, under an exclusive lock
+    op.execute("""
+        ALTER TABLE shoutouts ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (setweight(to_tsvector('english', coalesce(message, '')), 'A')) STORED
+    """)
+    op.execute("""
+        ALTER TABLE comments ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (setweight(to_tsvector('english', coalesce(content, '')), 'B')) STORED
+    """)
+    # the GIN builds are the slow part; CONCURRENTLY keeps the tables writable meanwhile
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_shoutouts_search_vector "
+            "ON shoutouts USING gin (search_vector)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_comments_search_vector "
+            "ON comments USING gin (search_vector)"
+        )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_comments_search_vector")
+    op.execute("DROP INDEX IF EXISTS ix_shoutouts_search_vector")
+    op.execute("ALTER TABLE comments DROP COLUMN IF EXISTS search_vector")
+    op.execute("ALTER TABLE shoutouts DROP COLUMN IF EXISTS search_vector")
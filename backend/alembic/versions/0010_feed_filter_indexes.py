@@ -0,0 +1,32 @@
+"""feed filter indexes
+
+Revision ID: 0010_feed_filter_indexes
+Revises: 0009_full_text_search
+Create Date: 2026-10-18 15:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0010_feed_filter_indexes'
+down_revision = '0009_full_text_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        # department filter: department -> author ids without touching the users heap
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_department_id ON users (department, id)")
+        # sender filter in feed order, with date ranges and keyset pages
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_shoutouts_author_id_created_at_id "
+            "ON shoutouts (author_id, created_at DESC, id DESC)"
+        )
+        # its leading column makes the single-column index redundant
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_shoutouts_author_id")
+
+
+def downgrade():
+    op.execute("CREATE INDEX IF NOT EXISTS ix_shoutouts_author_id ON shoutouts (author_id)")
+    op.execute("DROP INDEX IF EXISTS ix_shoutouts_author_id_created_at_id")
+    op.execute("DROP INDEX IF EXISTS ix_users_department_id")
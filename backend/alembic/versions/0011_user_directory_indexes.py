@@ -0,0 +1,29 @@
+"""user directory prefix indexes
+
+Revision ID: 0011_user_directory_indexes
+Revises: 0010_feed_filter_indexes
+Create Date: 2026-10-18 18:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0011_user_directory_indexes'
+down_revision = '0010_feed_filter_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        # byte-order keys: `lower(name) LIKE 'ab%'` becomes a range scan that is already in page order;
+        # the picker's columns are included so the search never visits the heap
+        for column in ("name", "email"):
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_{column}_prefix "
+                f'ON users ((lower({column}) COLLATE "C"), id) INCLUDE (name, email, department)'
+            )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_users_email_prefix")
+    op.execute("DROP INDEX IF EXISTS ix_users_name_prefix")
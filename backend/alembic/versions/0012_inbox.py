@@ -0,0 +1,38 @@
+"""inbox index and read markers
+
+Revision ID: 0012_inbox
+Revises: 0011_user_directory_indexes
+Create Date: 2026-10-18 20:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0012_inbox'
+down_revision = '0011_user_directory_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'inbox_read_markers' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'inbox_read_markers',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('last_read_shoutout_id', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+    with op.get_context().autocommit_block():
+        # a user's inbox newest first, one page per range scan
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_shoutout_recipients_user_id_shoutout_id "
+            "ON shoutout_recipients (user_id, shoutout_id DESC)"
+        )
+        # its leading column makes the single-column index redundant
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_shoutout_recipients_user_id")
+
+
+def downgrade():
+    op.execute("CREATE INDEX IF NOT EXISTS ix_shoutout_recipients_user_id ON shoutout_recipients (user_id)")
+    op.execute("DROP INDEX IF EXISTS ix_shoutout_recipients_user_id_shoutout_id")
+    op.execute("DROP TABLE IF EXISTS inbox_read_markers")
@@ -0,0 +1,34 @@
+"""replies must be on their parent's shoutout
+
+Revision ID: 0013_comment_parent_fk
+Revises: 0012_inbox
+Create Date: 2026-10-18 22:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0013_comment_parent_fk'
+down_revision = '0012_inbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        # the target of the foreign key below (id alone is already unique)
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_comments_id_shoutout_id ON comments (id, shoutout_id)"
+        )
+    foreign_keys = {fk['name'] for fk in sa.inspect(op.get_bind()).get_foreign_keys('comments')}
+    if 'fk_comments_parent_same_shoutout' not in foreign_keys:
+        # NOT VALID: new rows are checked right away, existing ones are not scanned under the lock
+        op.execute(
+            "ALTER TABLE comments ADD CONSTRAINT fk_comments_parent_same_shoutout "
+            "FOREIGN KEY (parent_id, shoutout_id) REFERENCES comments (id, shoutout_id) NOT VALID"
+        )
+
+
+def downgrade():
+    op.execute("ALTER TABLE comments DROP CONSTRAINT IF EXISTS fk_comments_parent_same_shoutout")
+    op.execute("DROP INDEX IF EXISTS ux_comments_id_shoutout_id")
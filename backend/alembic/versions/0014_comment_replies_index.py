@@ -0,0 +1,29 @@
+"""replies in thread order
+
+Revision ID: 0014_comment_replies_index
+Revises: 0013_comment_parent_fk
+Create Date: 2026-10-18 23:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0014_comment_replies_index'
+down_revision = '0013_comment_parent_fk'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        # the first N replies of a comment in one index range, however many it has
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_comments_parent_id_created_at_id "
+            "ON comments (parent_id, created_at, id)"
+        )
+        # its leading column makes the single-column index redundant
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_comments_parent_id")
+
+
+def downgrade():
+    op.execute("CREATE INDEX IF NOT EXISTS ix_comments_parent_id ON comments (parent_id)")
+    op.execute("DROP INDEX IF EXISTS ix_comments_parent_id_created_at_id")
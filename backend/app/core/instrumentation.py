@@ -0,0 +1,267 @@
+"""Per-request timing: latency, database time and statement counts per route.
+
+`InstrumentationMiddleware` times every HTTP request and keeps a
+`RequestStats` for it in a context variable. Cursor events on the engine add
+each statement's time to whichever request is running it, so database time
+and statement count come out per request without threading anything through
+the handlers. Everything is aggregated per route template (`/shoutouts/{id}`,
+not the raw path) into fixed-bucket histograms and rendered in the
+Prometheus text format by `render_prometheus()`.
+
+With `PROFILING_ENABLED=true`, a request sent with an `X-Profile` header runs
+under pyinstrument (an optional dependency) and the profile is returned in
+place of the response: HTML for `X-Profile: html`, text otherwise.
+"""
+import contextvars
+import logging
+import math
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED = "<unmatched>"  # one label for every 404, so scanners cannot blow up the series count
+
+
+class RequestStats:
+    """Database work done on behalf of the current request."""
+
+    __slots__ = ("method", "path", "route", "db_seconds", "statements")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path  # without the query string, so the stream's `?token=` never reaches logs or metrics
+        self.route = UNMATCHED  # known once routing has run
+        self.db_seconds = 0.0
+        self.statements = 0
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for bound, n in zip(self.buckets + (math.inf,), self.counts):
+            running += n
+            yield bound, running
+
+
+class Metrics:
+    """Request metrics for one worker process."""
+
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.db_time: Dict[Tuple[str, str], Histogram] = {}
+        self.statements: Dict[Tuple[str, str], Histogram] = {}
+        self.in_flight = 0
+
+    def record(self, stats: RequestStats, status: int, seconds: float) -> None:
+        key = (stats.method, stats.route)
+        self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+        if key not in self.latency:
+            self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.db_time[key] = Histogram(LATENCY_BUCKETS)
+            self.statements[key] = Histogram(STATEMENT_BUCKETS)
+        self.latency[key].observe(seconds)
+        self.db_time[key].observe(stats.db_seconds)
+        self.statements[key].observe(stats.statements)
+
+
+metrics = Metrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is None or context is None:
+        return
+    stats.db_seconds += time.perf_counter() - getattr(context, "_started_at", time.perf_counter())
+    stats.statements += 1
+
+
+def instrument_engine(sync_engine) -> None:
+    """Attribute statement time on `sync_engine` to the request running it."""
+    if not event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_template(scope) -> str:
+    """The path template of the route that handled the request."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    endpoint = scope.get("endpoint")
+    router = scope.get("router")
+    if endpoint is None or router is None:
+        return UNMATCHED
+    for candidate in router.routes:
+        if getattr(candidate, "endpoint", None) is endpoint:
+            return candidate.path
+    return UNMATCHED
+
+
+class InstrumentationMiddleware:
+    """Pure ASGI middleware (unlike BaseHTTPMiddleware it leaves streaming responses alone)."""
+
+    def __init__(self, app, profiling: bool = False):
+        self.app = app
+        self.profiling = profiling
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if self.profiling:
+            profile = _header(scope, b"x-profile")
+            if profile is not None:
+                return await _profiled(self.app, scope, receive, send, html=profile == b"html")
+
+        stats = RequestStats(scope["method"], scope["path"])
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            current_request.reset(token)
+            stats.route = _route_template(scope)
+            metrics.record(stats, status, time.perf_counter() - start)
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.strip().lower()
+    return None
+
+
+async def _profiled(app, scope, receive, send, html: bool):
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        logger.warning("X-Profile ignored: pyinstrument is not installed")
+        return await app(scope, receive, send)
+
+    status = 500
+
+    async def discard(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    try:
+        await app(scope, receive, discard)
+    finally:
+        profiler.stop()
+
+    if html:
+        body, content_type = profiler.output_html().encode(), b"text/html; charset=utf-8"
+    else:
+        body, content_type = profiler.output_text(unicode=True).encode(), b"text/plain; charset=utf-8"
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", str(len(body)).encode()),
+            (b"x-profiled-status", str(status).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == math.inf else repr(float(value))
+
+
+def _histogram_lines(name: str, help_text: str, series: Dict[Tuple[str, str], Histogram]):
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} histogram"
+    for (method, route), hist in sorted(series.items()):
+        for bound, count in hist.cumulative():
+            yield f"{name}_bucket{_labels(method=method, route=route, le=_bound(bound))} {count}"
+        yield f"{name}_sum{_labels(method=method, route=route)} {hist.total}"
+        yield f"{name}_count{_labels(method=method, route=route)} {hist.count}"
+
+
+def _gauges(prefix: str, values: dict):
+    """Numeric leaves of a stats dict (as served on /metrics) as untyped gauges."""
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            yield from _gauges(name, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"# TYPE {name} gauge"
+            yield f"{name} {value}"
+
+
+def render_prometheus(extra: Optional[Dict[str, dict]] = None) -> str:
+    """The request metrics, plus any `extra` stats sections, in the Prometheus text format."""
+    lines = [
+        "# HELP bragboard_http_requests_total HTTP requests by route and status.",
+        "# TYPE bragboard_http_requests_total counter",
+    ]
+    for (method, route, status), count in sorted(metrics.requests.items()):
+        lines.append(f"bragboard_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+    lines += [
+        "# HELP bragboard_http_requests_in_flight HTTP requests being handled right now.",
+        "# TYPE bragboard_http_requests_in_flight gauge",
+        f"bragboard_http_requests_in_flight {metrics.in_flight}",
+    ]
+    lines += _histogram_lines(
+        "bragboard_http_request_duration_seconds", "Time to handle a request.", metrics.latency
+    )
+    lines += _histogram_lines(
+        "bragboard_http_request_db_seconds", "Time spent in database statements per request.", metrics.db_time
+    )
+    lines += _histogram_lines(
+        "bragboard_http_request_db_statements", "Database statements executed per request.", metrics.statements
+    )
+    for section, values in (extra or {}).items():
+        lines += _gauges(f"bragboard_{section}", values)
+    return "\n".join(lines) + "\n"
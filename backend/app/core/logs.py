@@ -0,0 +1,124 @@
+"""Structured logging that never blocks the event loop.
+
+Handlers on the `app` logger only put records on a queue; a
+`QueueListener` thread formats them (one JSON object per line by default)
+and writes them out. Fields passed with `extra=` end up in the JSON, and
+records logged while a request is running carry its method and route.
+
+Access-log lines (uvicorn's, also used under gunicorn) have their `token=`
+query parameters blanked out.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+from .instrumentation import current_request
+
+# attributes every LogRecord has; anything else came in through `extra=`
+_STANDARD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+_ACCESS_LOGGERS = ("uvicorn.access", "gunicorn.access")
+_TOKEN_PARAM = re.compile(r"([?&]token=)[^&\s\"]*")
+
+
+def redact_tokens(value):
+    """`value` with `token=` query parameters blanked out, if it is a string."""
+    return _TOKEN_PARAM.sub(r"\1[redacted]", value) if isinstance(value, str) else value
+
+
+class RedactTokensFilter(logging.Filter):
+    """Blank `?token=` out of access-log lines (the URL is in the args: a tuple for uvicorn, a dict for gunicorn)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = redact_tokens(record.msg)
+        if isinstance(record.args, dict):
+            record.args = {k: redact_tokens(v) for k, v in record.args.items()}
+        elif isinstance(record.args, tuple):
+            record.args = tuple(redact_tokens(v) for v in record.args)
+        return True
+
+
+_redact_filter = RedactTokensFilter()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((k, v) for k, v in vars(record).items() if k not in _STANDARD)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Tag records with the request they were logged from (runs on the caller's side of the queue)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        stats = current_request.get()
+        if stats is not None:
+            record.method = stats.method
+            record.path = stats.path
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the stock prepare() pastes the traceback into the message; keep it apart for the JSON
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def start_logging(level: str = "INFO", fmt: str = "json") -> None:
+    """Route the `app` loggers through a queue to stderr. Idempotent."""
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler()
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger("app")
+    root.setLevel(level.upper())
+    root.addHandler(handler)
+    root.propagate = False
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    for name in _ACCESS_LOGGERS:
+        logging.getLogger(name).addFilter(_redact_filter)
+
+
+def stop_logging() -> None:
+    """Flush queued records and detach the queue handler."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    for name in _ACCESS_LOGGERS:
+        logging.getLogger(name).removeFilter(_redact_filter)
+    root = logging.getLogger("app")
+    for handler in list(root.handlers):
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
+    root.propagate = True
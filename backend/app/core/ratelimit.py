@@ -0,0 +1,183 @@
+"""Token-bucket rate limiting for the password endpoints and writes.
+
+Each rule in `RATE_LIMITS` (e.g. `"login": "10/minute burst 5"`) is a
+bucket of `burst` tokens refilled at 10 per minute. A request takes one
+token from the bucket of its rule and key: the client address for the auth
+endpoints, the user for authenticated writes. With the bucket empty it is
+answered 429 with a `Retry-After` of when the next token arrives.
+
+Buckets live in process memory by default, so every worker counts on its
+own; `RATE_LIMIT_BACKEND=redis` keeps them at REDIS_URL (one script call
+per request) so a limit holds across workers. If the backend fails the
+request is let through.
+"""
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from fastapi import Depends, HTTPException, Request
+
+from ..database import settings
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RULE = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)(?:\s+burst\s+(\d+))?\s*$")
+
+
+class Limit:
+    __slots__ = ("rate", "burst")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate  # tokens per second
+        self.burst = burst  # bucket size
+
+    @classmethod
+    def parse(cls, text: str) -> "Limit":
+        """`"10/minute"`, or `"10/minute burst 20"`; the burst defaults to the count."""
+        match = _RULE.match(text.lower())
+        if not match or int(match.group(1)) == 0:
+            raise ValueError(f"invalid rate limit {text!r}, use e.g. '10/minute' or '10/minute burst 20'")
+        count, period, burst = match.groups()
+        return cls(int(count) / _PERIODS[period], int(burst) if burst else int(count))
+
+    def __repr__(self) -> str:
+        return f"Limit(rate={self.rate:g}/s, burst={self.burst})"
+
+
+class MemoryBackend:
+    """Per-worker buckets, least recently used dropped past `maxsize` (a dropped bucket starts full again)."""
+
+    def __init__(self, maxsize: int, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, limit: Limit) -> float:
+        """Take a token; 0 if there was one, else the seconds until there is."""
+        now = self.clock()
+        tokens, updated = self._buckets.get(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "buckets": len(self._buckets), "maxsize": self.maxsize}
+
+
+# refill, take and store in one atomic step; a bucket expires once it would be full again
+_TAKE = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """Buckets shared by all workers on Redis (or anything speaking its protocol and Lua)."""
+
+    def __init__(self, client, prefix: str = "bragboard:ratelimit:", clock: Callable[[], float] = time.time):
+        self.client = client
+        self.prefix = prefix
+        self.clock = clock
+        self._take = client.register_script(_TAKE)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:  # optional dependency
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the 'redis' package") from e
+        return cls(redis.from_url(url))
+
+    async def take(self, key: str, limit: Limit) -> float:
+        wait = await self._take(keys=[self.prefix + key], args=[limit.rate, limit.burst, self.clock()])
+        return float(wait)
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class RateLimiter:
+    def __init__(self, backend, rules: Dict[str, Limit], enabled: bool = True):
+        self.backend = backend
+        self.rules = rules
+        self.enabled = enabled
+        self.rejected: Dict[str, int] = {}
+
+    async def check(self, rule: str, key: str) -> None:
+        """Take a token for `key` under `rule`, or raise 429. Rules not configured are unlimited."""
+        limit = self.rules.get(rule)
+        if limit is None or not self.enabled:
+            return
+        try:
+            wait = await self.backend.take(f"{rule}:{key}", limit)
+        except Exception:
+            logger.exception("rate limit check failed for %s, letting the request through", rule)
+            return
+        if wait > 0:
+            self.rejected[rule] = self.rejected.get(rule, 0) + 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, slow down",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, **self.backend.stats(), "rejected": dict(self.rejected)}
+
+
+def per_ip(rule: str):
+    """Dependency limiting a route under `rule` per client address.
+
+    Behind a proxy, run the server with `--proxy-headers` so the address is
+    the client's rather than the proxy's.
+    """
+    async def dependency(request: Request) -> None:
+        await limiter.check(rule, request.client.host if request.client else "unknown")
+
+    return dependency
+
+
+def per_user(rule: str, current_user: Callable):
+    """Dependency limiting a route under `rule` per authenticated user (`current_user` is resolved once per request)."""
+    async def dependency(current=Depends(current_user)) -> None:
+        await limiter.check(rule, f"user:{current.id}")
+
+    return dependency
+
+
+def _create_limiter() -> RateLimiter:
+    rules = {rule: Limit.parse(text) for rule, text in settings.RATE_LIMITS.items() if text}
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        backend = RedisBackend.from_url(settings.REDIS_URL)
+    else:
+        backend = MemoryBackend(settings.RATE_LIMIT_MEMORY_SIZE)
+    return RateLimiter(backend, rules, enabled=settings.RATE_LIMIT_ENABLED)
+
+
+limiter = _create_limiter()
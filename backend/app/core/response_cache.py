@@ -0,0 +1,168 @@
+import hashlib
+import itertools
+import json
+import logging
+import time
+from typing import Any, Iterable, Optional
+
+from ..database import settings
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """Per-worker backend: a `TTLCache` for entries plus a dict of generations.
+
+    Writes handled by another worker do not bump this worker's generations, so
+    with several workers stale pages live for up to `ttl` seconds; use the
+    Redis backend when that matters.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize, ttl)
+        self._generations: dict = {}  # namespace -> (generation, bumped at)
+        self._sequence = itertools.count(1)
+        self._forget_after = 2 * ttl
+        self._sweep_at = 1024
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: Any) -> None:
+        self._entries.set(key, value)
+
+    async def generations(self, namespaces: Iterable[str]) -> list:
+        oldest = time.monotonic() - self._forget_after
+        values = []
+        for ns in namespaces:
+            generation, bumped_at = self._generations.get(ns, (0, 0.0))
+            values.append(generation if bumped_at > oldest else 0)
+        return values
+
+    async def bump(self, namespace: str) -> None:
+        if self._forget_after <= 0:
+            return
+        now = time.monotonic()
+        self._generations[namespace] = (next(self._sequence), now)
+        if len(self._generations) >= self._sweep_at:
+            oldest = now - self._forget_after
+            self._generations = {ns: g for ns, g in self._generations.items() if g[1] > oldest}
+            self._sweep_at = max(1024, 2 * len(self._generations))
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "namespaces": len(self._generations), **self._entries.stats()}
+
+
+class RedisBackend:
+    """Shared backend on Redis (or anything speaking its protocol).
+
+    Entries are JSON with an expiry of `ttl`; the size bound and LRU eviction
+    are the server's (`maxmemory` + `maxmemory-policy allkeys-lru`).
+    Generations are shared, so a bump in one worker is seen by all.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "bragboard:cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float) -> "RedisBackend":
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:  # optional dependency
+            raise RuntimeError("FEED_CACHE_BACKEND=redis needs the 'redis' package") from e
+        return cls(redis.from_url(url), ttl)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        await self.client.set(self.prefix + key, json.dumps(value), px=int(self.ttl * 1000))
+
+    async def generations(self, namespaces: Iterable[str]) -> list:
+        values = await self.client.mget([f"{self.prefix}gen:{ns}" for ns in namespaces])
+        return [int(v) if v is not None else 0 for v in values]
+
+    async def bump(self, namespace: str) -> None:
+        if self.ttl <= 0:
+            return
+        generation = await self.client.incr(f"{self.prefix}gen-sequence")
+        await self.client.set(f"{self.prefix}gen:{namespace}", generation, px=int(2 * self.ttl * 1000))
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "ttl_seconds": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+class ResponseCache:
+    """Caches rendered responses under a key built from the request parameters
+    and the current generation of every namespace the response depends on.
+
+    Nothing is ever deleted on write: `invalidate(namespace)` bumps the
+    generation, so later lookups build new keys and old entries age out.
+    Entries are dicts (`body`, `etag`, `headers`) so both backends can store them.
+
+    Generations come from one increasing sequence and are forgotten (read as
+    0) once unbumped for twice the entry TTL. By then every entry built under
+    them has expired, and a later bump never reuses a value. So per-item
+    namespaces such as `shoutout:<id>` cost nothing once they go quiet.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def key(self, name: str, params: dict, depends_on: Iterable[str]) -> str:
+        depends_on = list(depends_on)
+        generations = await self.backend.generations(depends_on)
+        normalized = json.dumps(params, sort_keys=True, default=str, separators=(",", ":"))
+        stamp = ",".join(f"{ns}={gen}" for ns, gen in zip(depends_on, generations))
+        return f"{name}:{hashlib.sha1(f'{normalized}|{stamp}'.encode()).hexdigest()}"
+
+    async def get(self, key: str) -> Optional[dict]:
+        try:
+            return await self.backend.get(key)
+        except Exception:
+            logger.exception("response cache read failed")
+            return None
+
+    async def set(self, key: str, body: bytes, headers: Optional[dict] = None) -> dict:
+        entry = {
+            "body": body.decode(),
+            "etag": '"%s"' % hashlib.sha1(body).hexdigest()[:20],
+            "headers": headers or {},
+        }
+        try:
+            await self.backend.set(key, entry)
+        except Exception:
+            logger.exception("response cache write failed")
+        return entry
+
+    async def invalidate(self, *namespaces: str) -> None:
+        """Bump `namespaces`; failures are logged, never raised into the request."""
+        for ns in namespaces:
+            try:
+                await self.backend.bump(ns)
+            except Exception:
+                logger.exception("response cache invalidation failed for %s", ns)
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+def _create_backend():
+    if settings.FEED_CACHE_BACKEND == "redis":
+        return RedisBackend.from_url(settings.REDIS_URL, settings.FEED_CACHE_TTL_SECONDS)
+    return MemoryBackend(settings.FEED_CACHE_SIZE, settings.FEED_CACHE_TTL_SECONDS)
+
+
+feed_cache = ResponseCache(_create_backend())
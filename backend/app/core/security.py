@@ -1,9 +1,13 @@
 import os
+import asyncio
 import hashlib
 import hmac
 import base64
+import secrets
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Callable, Optional, Tuple
 from jose import jwt
 
 from ..database import Settings
@@ -33,6 +37,96 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+class KdfPoolBusy(Exception):
+    """Raised when more password hashes are queued than `KDF_MAX_PENDING`."""
+
+
+class KdfPool:
+    """Bounded pool running the password KDF off the event loop.
+
+    `hashlib.pbkdf2_hmac` releases the GIL, so a thread pool gives real
+    parallelism; a process pool is available for interpreters where it does
+    not. At most `size` hashes run at once, at most `max_pending` wait, and
+    anything beyond that is rejected instead of queueing without bound.
+    """
+
+    def __init__(self, size: int, max_pending: int, kind: str = "thread"):
+        self.size = size
+        self.max_pending = max_pending
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.size)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="kdf")
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        if self.size <= 0:
+            return fn(*args)
+        if self.pending >= self.size + self.max_pending:
+            self.rejected += 1
+            raise KdfPoolBusy()
+
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            started, result = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _timed_call, fn, *args
+            )
+        finally:
+            self.pending -= 1
+        wait = max(0.0, started - submitted)
+        self.completed += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "size": self.size,
+            "max_pending": self.max_pending,
+            "running": min(self.pending, self.size),
+            "queued": max(0, self.pending - self.size),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _timed_call(fn: Callable, *args):
+    # runs in the worker; perf_counter is system-wide so the submit/start delta is the queue wait
+    return time.perf_counter(), fn(*args)
+
+
+kdf_pool = KdfPool(settings.KDF_POOL_SIZE, settings.KDF_MAX_PENDING, settings.KDF_POOL_KIND)
+
+
+async def hash_password_async(password: str) -> str:
+    """`get_password_hash` on the KDF pool; use this from request handlers."""
+    return await kdf_pool.run(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """`verify_password` on the KDF pool; use this from request handlers."""
+    return await kdf_pool.run(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(subject: Any) -> str:
     expires_delta = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", settings.ACCESS_TOKEN_EXPIRE_MINUTES)))
     to_encode = {"sub": str(subject), "exp": datetime.utcnow() + expires_delta}
@@ -40,6 +134,13 @@ def create_access_token(subject: Any) -> str:
     return encoded_jwt
 
 
+def create_stream_token(subject: Any) -> str:
+    """Short-lived token that only opens the event stream (it travels in a URL, so it may end up in logs)."""
+    expires_delta = timedelta(seconds=settings.STREAM_TOKEN_EXPIRE_SECONDS)
+    to_encode = {"sub": str(subject), "scope": "stream", "exp": datetime.utcnow() + expires_delta}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
+
+
 def create_refresh_token(subject: Any) -> str:
     expires_delta = timedelta(days=int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", settings.REFRESH_TOKEN_EXPIRE_DAYS)))
     to_encode = {"sub": str(subject), "exp": datetime.utcnow() + expires_delta}
@@ -47,5 +148,37 @@ def create_refresh_token(subject: Any) -> str:
     return encoded_jwt
 
 
+def hash_refresh_token(verifier: str) -> str:
+    """Keyed digest of the secret half of a refresh token.
+
+    Refresh tokens are 256-bit random values, so a single HMAC is enough; the
+    slow password KDF would only add CPU cost to every refresh.
+    """
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), verifier.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def new_refresh_token() -> Tuple[str, str, str]:
+    """Return `(raw_token, selector, token_hash)` for a fresh opaque refresh token.
+
+    The raw token handed to the client is `<selector>.<verifier>`: the selector
+    is stored in clear in an indexed column to find the row, the verifier only
+    as `hash_refresh_token(verifier)`.
+    """
+    selector = secrets.token_urlsafe(12)
+    verifier = secrets.token_urlsafe(32)
+    return f"{selector}.{verifier}", selector, hash_refresh_token(verifier)
+
+
+def split_refresh_token(raw_token: str) -> Tuple[str, str]:
+    selector, sep, verifier = raw_token.partition(".")
+    if not sep or not selector or not verifier:
+        raise ValueError("malformed refresh token")
+    return selector, verifier
+
+
+def verify_refresh_token(verifier: str, token_hash: str) -> bool:
+    return hmac.compare_digest(hash_refresh_token(verifier), token_hash)
+
+
 def decode_token(token: str) -> dict:
     return jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
@@ -1,7 +1,15 @@
-from typing import List, Optional
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, delete
-from .models import User, ShoutOut, ShoutOutRecipient, Reaction, Comment, ReactionTypeEnum
+from sqlalchemy import select, func, delete, insert, update, tuple_, or_, literal, literal_column, any_, bindparam, union_all, text, inspect, Integer, String, Date, Float
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from .models import (
+    User, ShoutOut, ShoutOutRecipient, InboxReadMarker, Reaction, Comment, ReactionTypeEnum,
+    DailyUserStats, DailyDepartmentStats, DailyReactionStats,
+)
 
 
 async def get_users(session: AsyncSession) -> List[User]:
@@ -9,77 +17,528 @@ async def get_users(session: AsyncSession) -> List[User]:
     return result.scalars().all()
 
 
-async def create_user(session: AsyncSession, email: str, name: Optional[str] = None) -> User:
-    user = User(email=email, name=name)
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
+async def estimate_user_count(session: AsyncSession) -> int:
+    """
+    Planner estimate of the number of users, from `pg_class.reltuples` (kept
+    current by autovacuum/ANALYZE): no table scan. Falls back to an exact
+    count when the table has never been analyzed.
+    """
+    estimate = (await session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+        {"table": User.__tablename__},
+    )).scalar()
+    if estimate is None or estimate < 0:
+        estimate = (await session.execute(select(func.count()).select_from(User))).scalar()
+    return estimate
+
+
+def _like_prefix(prefix: str) -> str:
+    """`prefix%` for LIKE, with the wildcards in `prefix` matched literally."""
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def directory_query(
+    prefix: str,
+    limit: int = 20,
+    department: Optional[str] = None,
+    exclude_id: Optional[int] = None,
+    after: Optional[Tuple[str, int]] = None,
+):
+    """
+    Users whose name or email starts with `prefix` (case-insensitive), as
+    `(id, name, email, department, key)` rows ordered by `(key, id)`.
+
+    `key` is what matched: the lowercased name, or the lowercased email for
+    users matched on email only, so every user has exactly one position and
+    keyset pages (`after` = the last row's `(key, id)`) never repeat anyone.
+    Each half is an index-only scan of its prefix index
+    (`ix_users_name_prefix`, `ix_users_email_prefix`) in page order that
+    stops after `limit` rows.
+    """
+    pattern = _like_prefix(prefix.lower())
+    name_key = func.lower(User.name).collate("C")
+    email_key = func.lower(User.email).collate("C")
+
+    def half(key, *where):
+        q = select(User.id, User.name, User.email, User.department, key.label("key")).where(
+            key.like(pattern, escape="\\"), *where
+        )
+        if department:
+            q = q.where(User.department == department)
+        if exclude_id is not None:
+            q = q.where(User.id != exclude_id)
+        if after:
+            q = q.where(tuple_(key, User.id) > tuple_(*after))
+        return q.order_by(key, User.id).limit(limit)
+
+    by_name = half(name_key)
+    by_email = half(email_key, or_(User.name.is_(None), ~name_key.like(pattern, escape="\\")))
+    both = union_all(by_name, by_email).subquery()
+    return select(both).order_by(both.c.key, both.c.id).limit(limit)
+
+
+async def search_directory(session: AsyncSession, prefix: str, **params) -> List[tuple]:
+    """Run `directory_query`; rows carry only the columns a recipient picker needs."""
+    result = await session.execute(directory_query(prefix, **params))
+    return result.all()
+
+
+async def _insert_returning(session: AsyncSession, entity, **values):
+    """
+    INSERT one row and load it as `entity` from the INSERT's RETURNING
+    clause, server defaults (ids, timestamps, counters) included, so no
+    refresh SELECT is needed afterwards. Deferred columns are left out.
+    """
+    columns = [
+        column
+        for prop in inspect(entity).column_attrs
+        if not prop.deferred
+        for column in prop.columns
+    ]
+    stmt = insert(entity).values(**values).returning(*columns)
+    result = await session.execute(select(entity).from_statement(stmt).execution_options(populate_existing=True))
+    return result.scalar_one()
+
+
+async def create_user(
+    session: AsyncSession,
+    email: str,
+    name: Optional[str] = None,
+    password_hash: Optional[str] = None,
+    department: Optional[str] = None,
+    commit: bool = True,
+) -> User:
+    """Insert a user; one statement. With `commit=False` the caller commits."""
+    user = await _insert_returning(
+        session, User, email=email, name=name, password_hash=password_hash, department=department
+    )
+    if commit:
+        await session.commit()
     return user
 
 
-async def create_shoutout(session: AsyncSession, author_id: int, message: str, recipient_ids: Optional[List[int]] = None) -> ShoutOut:
-    if recipient_ids is None:
-        recipient_ids = []
-    shout = ShoutOut(author_id=author_id, message=message)
-    session.add(shout)
-    await session.flush()
+class InvalidRecipients(ValueError):
+    def __init__(self, ids):
+        self.ids = set(ids)
+        super().__init__(f"Invalid recipient IDs: {self.ids}")
 
-    # attach recipients
-    for rid in recipient_ids:
-        r = ShoutOutRecipient(shoutout_id=shout.id, user_id=rid)
-        session.add(r)
 
-    await session.commit()
-    await session.refresh(shout)
+async def add_recipients(
+    session: AsyncSession,
+    shoutout_id: int,
+    recipient_ids: List[int],
+    departments: Optional[List[str]] = None,
+    author_id: Optional[int] = None,
+) -> List[User]:
+    """Tag users on a shoutout and return the tagged users.
+
+    `recipient_ids` are tagged individually; `departments` tags every member of
+    those departments except `author_id`. Expansion, validation and insert
+    happen in a single statement:
+    `WITH inserted AS (INSERT ... SELECT FROM users WHERE id = ANY(:ids) OR
+    department = ANY(:departments) RETURNING user_id) SELECT users ... JOIN inserted`,
+    so unknown ids are simply not inserted and show up as missing from the result.
+    """
+    if not recipient_ids and not departments:
+        return []
+    targets = User.id == any_(bindparam("recipient_ids", recipient_ids, type_=ARRAY(Integer)))
+    if departments:
+        in_departments = User.department == any_(bindparam("departments", departments, type_=ARRAY(String)))
+        if author_id is not None:
+            in_departments = in_departments & (User.id != author_id)
+        targets = targets | in_departments
+    inserted = (
+        insert(ShoutOutRecipient)
+        .from_select(["shoutout_id", "user_id"], select(literal(shoutout_id, Integer), User.id).where(targets))
+        .returning(ShoutOutRecipient.user_id)
+        .cte("inserted")
+    )
+    result = await session.execute(select(User).join(inserted, inserted.c.user_id == User.id))
+    return result.scalars().all()
+
+
+async def create_shoutout(
+    session: AsyncSession,
+    author_id: int,
+    message: str,
+    recipient_ids: Optional[List[int]] = None,
+    recipient_departments: Optional[List[str]] = None,
+    commit: bool = True,
+) -> ShoutOut:
+    """Create a shoutout with its recipients loaded on `shout.recipients`.
+
+    Two statements: the INSERT (returning the row) and the recipients
+    INSERT ... SELECT. With `commit=False` the caller commits.
+
+    Raises `InvalidRecipients` if any id is not a user. With `commit=True`
+    the session is rolled back first; with `commit=False` the two inserts
+    run in a savepoint and only that is rolled back, so the caller's
+    earlier work in the transaction survives.
+    """
+    recipient_ids = list(dict.fromkeys(recipient_ids or []))
+    departments = list(dict.fromkeys(recipient_departments or []))
+
+    async def insert() -> Tuple[ShoutOut, List[User]]:
+        shout = await _insert_returning(session, ShoutOut, author_id=author_id, message=message)
+        recipients = await add_recipients(session, shout.id, recipient_ids, departments, author_id=author_id)
+        missing = set(recipient_ids) - {u.id for u in recipients}
+        if missing:
+            raise InvalidRecipients(missing)
+        return shout, recipients
+
+    if commit:
+        try:
+            shout, recipients = await insert()
+        except InvalidRecipients:
+            await session.rollback()
+            raise
+        await session.commit()
+    else:
+        async with session.begin_nested():
+            shout, recipients = await insert()
+    set_committed_value(shout, "recipients", recipients)
     return shout
 
 
-async def list_shoutouts(session: AsyncSession, limit: int = 20, offset: int = 0) -> List[ShoutOut]:
-    q = await session.execute(select(ShoutOut).order_by(ShoutOut.created_at.desc()).limit(limit).offset(offset))
-    return q.scalars().all()
+def feed_query(
+    limit: int = 20,
+    offset: int = 0,
+    department: Optional[str] = None,
+    sender_id: Optional[int] = None,
+    from_dt: Optional[datetime] = None,
+    to_dt: Optional[datetime] = None,
+    before: Optional[Tuple[datetime, int]] = None,
+):
+    """The SELECT behind `list_shoutouts`, without its eager loads.
 
+    Each filter combination is served by an index (tests/test_query_plans.py):
+    no filter or dates walk `ix_shoutouts_created_at_id`, a sender walks
+    `ix_shoutouts_author_id_created_at_id`, a department finds its authors
+    through `ix_users_department_id`.
+    """
+    q = select(ShoutOut).order_by(ShoutOut.created_at.desc(), ShoutOut.id.desc())
 
-# Reactions
-async def add_reaction(session: AsyncSession, shoutout_id: int, user_id: int, reaction_type: str) -> Reaction:
-    # Remove existing reaction by this user on this shoutout
-    await session.execute(
-        delete(Reaction).where(
-            Reaction.shoutout_id == shoutout_id,
-            Reaction.user_id == user_id
-        )
+    if department:
+        q = q.join(User, ShoutOut.author_id == User.id).where(User.department == department)
+    if sender_id:
+        q = q.where(ShoutOut.author_id == sender_id)
+    if from_dt:
+        q = q.where(ShoutOut.created_at >= from_dt)
+    if to_dt:
+        q = q.where(ShoutOut.created_at <= to_dt)
+    if before:
+        q = q.where(tuple_(ShoutOut.created_at, ShoutOut.id) < tuple_(*before))
+    elif offset:
+        q = q.offset(offset)
+
+    return q.limit(limit)
+
+
+async def list_shoutouts(session: AsyncSession, **params) -> List[ShoutOut]:
+    """Return a page of the feed with `author` and `recipients` already loaded.
+
+    Takes the filters of `feed_query`. Authors and recipients are fetched with
+    one batched SELECT each, so a page costs three statements regardless of
+    its size.
+
+    Pass `before=(created_at, id)` of the last row seen to page by keyset
+    instead of `offset`; it walks `ix_shoutouts_created_at_id` and stays
+    stable while new shoutouts are posted.
+    """
+    q = feed_query(**params).options(selectinload(ShoutOut.author), selectinload(ShoutOut.recipients))
+    result = await session.execute(q)
+    return result.scalars().all()
+
+
+def inbox_query(user_id: int, limit: int = 20, before: Optional[int] = None):
+    """
+    Shoutouts tagging `user_id`, newest (highest id) first, `before` the
+    last id of the previous page. The page of ids comes from one range scan
+    of `ix_shoutout_recipients_user_id_shoutout_id`, so its cost does not
+    grow with the feed or the inbox.
+    """
+    page = select(ShoutOutRecipient.shoutout_id).where(ShoutOutRecipient.user_id == user_id)
+    if before:
+        page = page.where(ShoutOutRecipient.shoutout_id < before)
+    page = page.order_by(ShoutOutRecipient.shoutout_id.desc()).limit(limit).subquery()
+    return select(ShoutOut).join(page, page.c.shoutout_id == ShoutOut.id).order_by(ShoutOut.id.desc())
+
+
+async def get_inbox(session: AsyncSession, user_id: int, limit: int = 20, before: Optional[int] = None) -> List[ShoutOut]:
+    """A page of `inbox_query` with `author` and `recipients` loaded."""
+    q = inbox_query(user_id, limit, before).options(
+        selectinload(ShoutOut.author), selectinload(ShoutOut.recipients)
+    )
+    return (await session.execute(q)).scalars().all()
+
+
+async def get_inbox_state(session: AsyncSession, user_id: int, cap: int = 99) -> Tuple[int, int]:
+    """
+    `(last_read_shoutout_id, unread)` for `user_id` in one statement.
+
+    Unread shoutouts are counted up to `cap + 1` only, so a long-neglected
+    inbox costs no more than a page or so; the caller shows "99+".
+    """
+    marker = (
+        select(InboxReadMarker.last_read_shoutout_id)
+        .where(InboxReadMarker.user_id == user_id)
+        .scalar_subquery()
+    )
+    last_read = func.coalesce(marker, 0)
+    unread = (
+        select(ShoutOutRecipient.shoutout_id)
+        .where(ShoutOutRecipient.user_id == user_id, ShoutOutRecipient.shoutout_id > last_read)
+        .limit(cap + 1)
+        .subquery()
+    )
+    row = (await session.execute(select(last_read, select(func.count()).select_from(unread).scalar_subquery()))).one()
+    return row[0], row[1]
+
+
+async def mark_inbox_read(
+    session: AsyncSession, user_id: int, up_to: Optional[int] = None, commit: bool = True
+) -> int:
+    """
+    Move the user's read marker forward to `up_to` (default: their newest
+    tagged shoutout); it never moves back. Returns the marker.
+    """
+    if up_to is None:
+        up_to = (await session.execute(
+            select(func.coalesce(func.max(ShoutOutRecipient.shoutout_id), 0)).where(ShoutOutRecipient.user_id == user_id)
+        )).scalar()
+    stmt = pg_insert(InboxReadMarker).values(user_id=user_id, last_read_shoutout_id=up_to)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[InboxReadMarker.user_id],
+        set_={
+            "last_read_shoutout_id": func.greatest(
+                InboxReadMarker.last_read_shoutout_id, stmt.excluded.last_read_shoutout_id
+            ),
+            "updated_at": func.now(),
+        },
+    ).returning(InboxReadMarker.last_read_shoutout_id)
+    marker = (await session.execute(stmt)).scalar()
+    if commit:
+        await session.commit()
+    return marker
+
+
+async def search_shoutouts(
+    session: AsyncSession,
+    query: str,
+    limit: int = 20,
+    department: Optional[str] = None,
+    sender_id: Optional[int] = None,
+    from_dt: Optional[datetime] = None,
+    to_dt: Optional[datetime] = None,
+    after: Optional[Tuple[float, int]] = None,
+    max_candidates: int = 5000,
+) -> List[Tuple[ShoutOut, float]]:
+    """Full-text search over shoutout messages and their comments, best match first.
+
+    `query` uses web search syntax ("quoted phrases", or, -excluded). A
+    shoutout scores the best rank of its message and comments; comment hits
+    are weighted lower.
+
+    Only the `max_candidates` newest matching shoutouts and comments are
+    ranked. Rare terms come straight from the GIN indexes; for a term in
+    most rows Postgres walks the primary key backwards instead and stops
+    early, so the cost stays bounded rather than growing with the table.
+
+    Pass `after=(rank, id)` of the last row seen for the next page.
+    """
+    tsquery = func.websearch_to_tsquery(literal_column("'english'"), query)  # same config as the indexed columns
+
+    filters = []
+    if department:
+        filters.append(ShoutOut.author_id.in_(select(User.id).where(User.department == department)))
+    if sender_id:
+        filters.append(ShoutOut.author_id == sender_id)
+    if from_dt:
+        filters.append(ShoutOut.created_at >= from_dt)
+    if to_dt:
+        filters.append(ShoutOut.created_at <= to_dt)
+
+    shoutout_hits = (
+        select(ShoutOut.id)
+        .where(ShoutOut.search_vector.op("@@")(tsquery), *filters)
+        .order_by(ShoutOut.id.desc())
+        .limit(max_candidates)
     )
-    
-    # Add new reaction
-    reaction = Reaction(
+    comment_hits = (
+        select(Comment.id)
+        .where(Comment.search_vector.op("@@")(tsquery))
+        .order_by(Comment.id.desc())
+        .limit(max_candidates)
+    )
+    if filters:
+        comment_hits = comment_hits.join(ShoutOut, ShoutOut.id == Comment.shoutout_id).where(*filters)
+
+    # rank only the candidates, after the LIMITs
+    matches = union_all(
+        select(ShoutOut.id.label("shoutout_id"), func.ts_rank(ShoutOut.search_vector, tsquery).label("rank"))
+        .where(ShoutOut.id.in_(shoutout_hits.scalar_subquery())),
+        select(Comment.shoutout_id, func.ts_rank(Comment.search_vector, tsquery))
+        .where(Comment.id.in_(comment_hits.scalar_subquery())),
+    ).subquery()
+    ranked = (
+        select(matches.c.shoutout_id, func.max(matches.c.rank).label("rank"))
+        .group_by(matches.c.shoutout_id)
+        .subquery()
+    )
+    rank = ranked.c.rank.cast(Float)
+    page = select(ranked.c.shoutout_id, rank.label("rank")).order_by(rank.desc(), ranked.c.shoutout_id.desc())
+    if after:
+        page = page.where(tuple_(rank, ranked.c.shoutout_id) < tuple_(*after))
+    page = page.limit(limit).subquery()
+
+    # the best plan depends on how common the terms are, which a generic plan
+    # for the cached prepared statement cannot know (5x slower for common terms)
+    await session.execute(text("SET LOCAL plan_cache_mode = force_custom_plan"))
+    result = await session.execute(
+        select(ShoutOut, page.c.rank)
+        .join(page, page.c.shoutout_id == ShoutOut.id)
+        .options(selectinload(ShoutOut.author), selectinload(ShoutOut.recipients))
+        .order_by(page.c.rank.desc(), ShoutOut.id.desc())
+    )
+    return result.all()
+
+
+# Reactions
+async def add_reaction(
+    session: AsyncSession, shoutout_id: int, user_id: int, reaction_type: str, commit: bool = True
+) -> Reaction:
+    """Set the user's reaction on a shoutout, replacing any previous one.
+
+    A single `INSERT ... ON CONFLICT (shoutout_id, user_id) DO UPDATE`, so
+    concurrent clicks cannot create duplicates; the counters on `shoutouts`
+    follow through the reactions_maintain_counts trigger. A shoutout that
+    does not exist raises `IntegrityError` (foreign key).
+    """
+    stmt = pg_insert(Reaction).values(
         shoutout_id=shoutout_id,
         user_id=user_id,
-        reaction_type=ReactionTypeEnum[reaction_type]
+        reaction_type=ReactionTypeEnum[reaction_type],
     )
-    session.add(reaction)
-    await session.commit()
-    await session.refresh(reaction)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_reactions_shoutout_user",
+        set_={"reaction_type": stmt.excluded.reaction_type, "created_at": func.now()},
+    ).returning(Reaction)
+    result = await session.execute(
+        select(Reaction).from_statement(stmt).execution_options(populate_existing=True)
+    )
+    reaction = result.scalar_one()
+    if commit:
+        await session.commit()
     return reaction
 
 
-async def remove_reaction(session: AsyncSession, shoutout_id: int, user_id: int) -> bool:
+async def remove_reaction(session: AsyncSession, shoutout_id: int, user_id: int, commit: bool = True) -> bool:
     result = await session.execute(
         delete(Reaction).where(
             Reaction.shoutout_id == shoutout_id,
             Reaction.user_id == user_id
         )
     )
-    await session.commit()
+    if commit:
+        await session.commit()
     return result.rowcount > 0
 
 
+_REACTION_COUNT_COLUMNS = {t.value: getattr(ShoutOut, f"{t.value}_count") for t in ReactionTypeEnum}
+
+
+def _counts_from_row(row) -> Dict[str, int]:
+    # only reaction types that have been used, as the GROUP BY version returned
+    return {t: n for t, n in zip(_REACTION_COUNT_COLUMNS, row) if n}
+
+
+def reaction_counts(shout: ShoutOut) -> Dict[str, int]:
+    """Reaction counts of an already loaded shoutout, no query needed."""
+    return _counts_from_row([getattr(shout, col.key) for col in _REACTION_COUNT_COLUMNS.values()])
+
+
 async def get_reaction_counts(session: AsyncSession, shoutout_id: int) -> dict:
     result = await session.execute(
-        select(Reaction.reaction_type, func.count(Reaction.id))
-        .where(Reaction.shoutout_id == shoutout_id)
-        .group_by(Reaction.reaction_type)
+        select(*_REACTION_COUNT_COLUMNS.values()).where(ShoutOut.id == shoutout_id)
+    )
+    row = result.first()
+    return _counts_from_row(row) if row else {}
+
+
+async def get_reaction_counts_for(session: AsyncSession, shoutout_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """`get_reaction_counts` for a whole page of shoutouts in one primary-key lookup."""
+    if not shoutout_ids:
+        return {}
+    result = await session.execute(
+        select(ShoutOut.id, *_REACTION_COUNT_COLUMNS.values()).where(ShoutOut.id.in_(shoutout_ids))
+    )
+    return {row[0]: _counts_from_row(row[1:]) for row in result}
+
+
+async def get_live_context(session: AsyncSession, shoutout_id: int) -> Tuple[Optional[str], Dict[str, int]]:
+    """Author department and reaction counts of a shoutout, for live events."""
+    result = await session.execute(
+        select(User.department, *_REACTION_COUNT_COLUMNS.values())
+        .join(ShoutOut, ShoutOut.author_id == User.id)
+        .where(ShoutOut.id == shoutout_id)
+    )
+    row = result.first()
+    if row is None:
+        return None, {}
+    return row[0], _counts_from_row(row[1:])
+
+
+async def reconcile_reaction_counts(session: AsyncSession, start_id: int, end_id: int) -> int:
+    """Recompute the counters of shoutouts with `start_id <= id < end_id`.
+
+    The batch's shoutout rows are locked first, so reaction writes in flight
+    (whose trigger holds the row until they commit) finish before the counts
+    are taken, and later ones wait and apply their +1/-1 to the corrected
+    value. Counting first would let the UPDATE overwrite a concurrent change
+    with a stale count.
+
+    Returns how many shoutouts had drifted and were corrected.
+    """
+    await session.execute(
+        select(ShoutOut.id)
+        .where(ShoutOut.id >= start_id, ShoutOut.id < end_id)
+        .order_by(ShoutOut.id)
+        .with_for_update()
+    )
+    r = Reaction.__table__
+    actual = (
+        select(
+            ShoutOut.id.label("id"),
+            *[
+                func.count(r.c.id).filter(r.c.reaction_type == t).label(f"{t.value}_count")
+                for t in ReactionTypeEnum
+            ],
+        )
+        .select_from(ShoutOut.__table__.outerjoin(r, r.c.shoutout_id == ShoutOut.id))
+        .where(ShoutOut.id >= start_id, ShoutOut.id < end_id)
+        .group_by(ShoutOut.id)
+        .subquery()
+    )
+    drifted = [col != actual.c[col.key] for col in _REACTION_COUNT_COLUMNS.values()]
+    result = await session.execute(
+        update(ShoutOut)
+        .where(ShoutOut.id == actual.c.id)
+        .where(or_(*drifted))
+        .values({col.key: actual.c[col.key] for col in _REACTION_COUNT_COLUMNS.values()})
+        .execution_options(synchronize_session=False)
     )
-    counts = {row[0].value: row[1] for row in result}
-    return counts
+    await session.commit()
+    return result.rowcount
+
+
+async def get_user_reactions_for(session: AsyncSession, shoutout_ids: List[int], user_id: int) -> Dict[int, str]:
+    if not shoutout_ids:
+        return {}
+    result = await session.execute(
+        select(Reaction.shoutout_id, Reaction.reaction_type)
+        .where(Reaction.shoutout_id.in_(shoutout_ids), Reaction.user_id == user_id)
+    )
+    return {shoutout_id: reaction_type.value for shoutout_id, reaction_type in result}
 
 
 async def get_user_reaction(session: AsyncSession, shoutout_id: int, user_id: int) -> Optional[str]:
@@ -92,16 +551,30 @@ async def get_user_reaction(session: AsyncSession, shoutout_id: int, user_id: in
 
 
 # Comments
-async def add_comment(session: AsyncSession, shoutout_id: int, user_id: int, content: str, parent_id: Optional[int] = None) -> Comment:
-    comment = Comment(
-        shoutout_id=shoutout_id,
-        user_id=user_id,
-        content=content,
-        parent_id=parent_id
+def violated_constraint(error: IntegrityError) -> Optional[str]:
+    """Name of the constraint behind an `IntegrityError` from asyncpg, if it reports one."""
+    return getattr(error.orig.__cause__, "constraint_name", None)
+
+
+async def add_comment(
+    session: AsyncSession,
+    shoutout_id: int,
+    user_id: int,
+    content: str,
+    parent_id: Optional[int] = None,
+    commit: bool = True,
+) -> Comment:
+    """Insert a comment; one statement. With `commit=False` the caller commits.
+
+    A shoutout that does not exist, or a parent that is not a comment on
+    it, raises `IntegrityError` (foreign keys); `violated_constraint` tells
+    which.
+    """
+    comment = await _insert_returning(
+        session, Comment, shoutout_id=shoutout_id, user_id=user_id, content=content, parent_id=parent_id
     )
-    session.add(comment)
-    await session.commit()
-    await session.refresh(comment)
+    if commit:
+        await session.commit()
     return comment
 
 
@@ -109,18 +582,281 @@ async def get_comments(session: AsyncSession, shoutout_id: int) -> List[Comment]
     result = await session.execute(
         select(Comment)
         .where(Comment.shoutout_id == shoutout_id)
+        .options(selectinload(Comment.author))
         .order_by(Comment.created_at.asc())
     )
     return result.scalars().all()
 
 
-async def delete_comment(session: AsyncSession, comment_id: int, user_id: int) -> bool:
-    """Delete a comment if the user is the author"""
+_THREAD_LEVELS = """
+WITH RECURSIVE levels (depth, ids, budget) AS (
+    SELECT 0, ARRAY(
+        SELECT id FROM comments
+        WHERE shoutout_id = :shoutout_id AND parent_id IS NULL {after}
+        ORDER BY created_at, id
+        LIMIT :limit
+    ), CAST(:max_replies AS integer)
+  UNION ALL
+    SELECT l.depth + 1, next.ids, l.budget - cardinality(next.ids)
+    FROM levels l
+    CROSS JOIN LATERAL (
+        SELECT ARRAY(
+            SELECT c.id
+            FROM unnest(l.ids) AS p (id)
+            CROSS JOIN LATERAL (
+                SELECT id, created_at FROM comments
+                WHERE parent_id = p.id
+                ORDER BY created_at, id
+                LIMIT l.budget
+            ) c
+            ORDER BY c.created_at, c.id
+            LIMIT l.budget
+        ) AS ids
+    ) next
+    WHERE l.depth < :max_depth AND l.budget > 0 AND cardinality(l.ids) > 0
+)
+SELECT t.id, l.depth, t.position
+FROM levels l, unnest(l.ids) WITH ORDINALITY AS t (id, position)
+"""
+
+
+def comment_thread_query(
+    shoutout_id: int,
+    limit: int = 20,
+    after: Optional[Tuple[datetime, int]] = None,
+    max_depth: int = 5,
+    max_replies: int = 200,
+):
+    """The SELECT behind `get_comment_thread`, without its eager loads.
+
+    The recursive CTE goes down one level per step and carries what is left
+    of the `max_replies` budget: each step reads at most `budget` replies of
+    every comment on the level above (one range of
+    `ix_comments_parent_id_created_at_id` each), keeps the first `budget` of
+    them in time order and stops once the budget is spent. A thread costs
+    what is returned, not its size (tests/test_query_plans.py).
+    """
+    params = {"shoutout_id": shoutout_id, "limit": limit, "max_depth": max_depth, "max_replies": max_replies}
+    after_clause = ""
+    if after:
+        after_clause = "AND (created_at, id) > (:after_created_at, :after_id)"
+        params.update(after_created_at=after[0], after_id=after[1])
+    thread = (
+        text(_THREAD_LEVELS.format(after=after_clause))
+        .bindparams(**params)
+        .columns(id=Integer, depth=Integer, position=Integer)
+        .cte("thread")
+    )
+    return (
+        select(Comment, thread.c.depth)
+        .join(thread, thread.c.id == Comment.id)
+        .order_by(thread.c.depth, thread.c.position)
+    )
+
+
+async def get_comment_thread(
+    session: AsyncSession,
+    shoutout_id: int,
+    limit: int = 20,
+    after: Optional[Tuple[datetime, int]] = None,
+    max_depth: int = 5,
+    max_replies: int = 200,
+) -> List[Tuple[Comment, int]]:
+    """A page of top-level comments plus their replies, as `(comment, depth)`.
+
+    The `limit` top-level comments after the `after=(created_at, id)` keyset,
+    then their replies at most `max_depth` levels deep. Rows come back
+    breadth-first (ordered by depth, then time), so every reply's parent
+    precedes it, and the walk stops after `max_replies` replies, dropping the
+    deepest, newest ones first (see `comment_thread_query`). Authors are
+    batch-loaded.
+    """
     result = await session.execute(
-        delete(Comment).where(
-            Comment.id == comment_id,
-            Comment.user_id == user_id
+        comment_thread_query(shoutout_id, limit, after, max_depth, max_replies).options(selectinload(Comment.author))
+    )
+    return result.all()
+
+
+async def get_comment_counts_for(session: AsyncSession, shoutout_ids: List[int]) -> Dict[int, int]:
+    if not shoutout_ids:
+        return {}
+    result = await session.execute(
+        select(Comment.shoutout_id, func.count(Comment.id))
+        .where(Comment.shoutout_id.in_(shoutout_ids))
+        .group_by(Comment.shoutout_id)
+    )
+    return dict(result.all())
+
+
+async def get_comment_previews(session: AsyncSession, shoutout_ids: List[int], per_shoutout: int = 3) -> Dict[int, List[Comment]]:
+    """Latest `per_shoutout` comments of each shoutout, with authors loaded.
+
+    One windowed query ranks comments within each shoutout, so the cost does
+    not depend on how many comments a popular shoutout has beyond the index
+    lookup.
+    """
+    if not shoutout_ids or per_shoutout <= 0:
+        return {}
+    ranked = (
+        select(
+            Comment.id,
+            func.row_number()
+            .over(partition_by=Comment.shoutout_id, order_by=(Comment.created_at.desc(), Comment.id.desc()))
+            .label("rn"),
         )
+        .where(Comment.shoutout_id.in_(shoutout_ids))
+        .subquery()
     )
-    await session.commit()
+    result = await session.execute(
+        select(Comment)
+        .join(ranked, ranked.c.id == Comment.id)
+        .where(ranked.c.rn <= per_shoutout)
+        .options(selectinload(Comment.author))
+        .order_by(Comment.shoutout_id, ranked.c.rn)
+    )
+    previews: Dict[int, List[Comment]] = {}
+    for comment in result.scalars():
+        previews.setdefault(comment.shoutout_id, []).append(comment)
+    return previews
+
+
+async def delete_comment(
+    session: AsyncSession, comment_id: int, user_id: int, shoutout_id: Optional[int] = None, commit: bool = True
+) -> bool:
+    """Delete a comment if the user is the author (and it is on `shoutout_id`, when given)"""
+    conditions = [Comment.id == comment_id, Comment.user_id == user_id]
+    if shoutout_id is not None:
+        conditions.append(Comment.shoutout_id == shoutout_id)
+    result = await session.execute(delete(Comment).where(*conditions))
+    if commit:
+        await session.commit()
     return result.rowcount > 0
+
+
+# --- analytics rollups -----------------------------------------------------
+
+def _utc_day(column):
+    # the same expression the rollup triggers use; 'UTC' is inlined so GROUP BY matches the select list
+    return func.timezone(literal_column("'UTC'"), column).cast(Date)
+
+
+def _day_range(first_day: date, last_day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(first_day, time.min, tzinfo=timezone.utc)
+    return start, datetime.combine(last_day + timedelta(days=1), time.min, tzinfo=timezone.utc)
+
+
+async def rebuild_rollups(session: AsyncSession, first_day: date, last_day: date) -> int:
+    """Recompute the daily rollups for `first_day..last_day` (UTC, inclusive)
+    from the base tables, in one transaction. Returns the number of rollup rows written.
+
+    Safe while the app is writing: the rollup tables are locked EXCLUSIVE for
+    the transaction first (in the order the triggers write them), so writers
+    already in flight finish before the delete and later ones wait in their
+    triggers until the commit. A base row is thus either seen by the rebuild or
+    added by its trigger afterwards, never both. Keep the ranges short.
+    """
+    start, end = _day_range(first_day, last_day)
+    await session.execute(text(
+        "LOCK TABLE daily_user_stats, daily_department_stats, daily_reaction_stats IN EXCLUSIVE MODE"
+    ))
+    for model in (DailyUserStats, DailyDepartmentStats, DailyReactionStats):
+        await session.execute(delete(model).where(model.day >= first_day, model.day <= last_day))
+
+    def upsert(model, columns, rows, counter):
+        stmt = pg_insert(model).from_select(columns, rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[c for c in model.__table__.primary_key.columns],
+            set_={counter: getattr(model, counter) + getattr(stmt.excluded, counter)},
+        )
+
+    day = _utc_day(ShoutOut.created_at)
+    department = func.coalesce(User.department, literal_column("''"))
+    in_range = (ShoutOut.created_at >= start, ShoutOut.created_at < end)
+    statements = [
+        upsert(
+            DailyUserStats, ["day", "user_id", "sent"],
+            select(day, ShoutOut.author_id, func.count()).where(*in_range).group_by(day, ShoutOut.author_id),
+            "sent",
+        ),
+        upsert(
+            DailyUserStats, ["day", "user_id", "received"],
+            select(day, ShoutOutRecipient.user_id, func.count())
+            .select_from(ShoutOutRecipient)
+            .join(ShoutOut, ShoutOut.id == ShoutOutRecipient.shoutout_id)
+            .where(*in_range)
+            .group_by(day, ShoutOutRecipient.user_id),
+            "received",
+        ),
+        upsert(
+            DailyDepartmentStats, ["day", "department", "shoutouts"],
+            select(day, department, func.count())
+            .join(User, User.id == ShoutOut.author_id)
+            .where(*in_range)
+            .group_by(day, department),
+            "shoutouts",
+        ),
+    ]
+    reaction_day = _utc_day(Reaction.created_at)
+    reaction_type = Reaction.reaction_type.cast(String)
+    statements.append(upsert(
+        DailyReactionStats, ["day", "reaction_type", "total"],
+        select(reaction_day, reaction_type, func.count())
+        .where(Reaction.created_at >= start, Reaction.created_at < end)
+        .group_by(reaction_day, reaction_type),
+        "total",
+    ))
+    written = 0
+    for stmt in statements:
+        written += (await session.execute(stmt)).rowcount
+    await session.commit()
+    return written
+
+
+async def get_top_users(
+    session: AsyncSession,
+    metric: str,
+    first_day: date,
+    last_day: date,
+    limit: int = 10,
+    department: Optional[str] = None,
+) -> List[Tuple[User, int]]:
+    """Users with the most shoutouts `"sent"` or `"received"` in the window."""
+    total = func.sum(getattr(DailyUserStats, metric)).label("total")
+    q = (
+        select(User, total)
+        .join(DailyUserStats, DailyUserStats.user_id == User.id)
+        .where(DailyUserStats.day >= first_day, DailyUserStats.day <= last_day)
+        .group_by(User.id)
+        .having(total > 0)
+        .order_by(total.desc(), User.id)
+        .limit(limit)
+    )
+    if department:
+        q = q.where(User.department == department)
+    result = await session.execute(q)
+    return result.all()
+
+
+async def get_department_volume(session: AsyncSession, first_day: date, last_day: date) -> List[Tuple[Optional[str], int]]:
+    total = func.sum(DailyDepartmentStats.shoutouts).label("total")
+    result = await session.execute(
+        select(DailyDepartmentStats.department, total)
+        .where(DailyDepartmentStats.day >= first_day, DailyDepartmentStats.day <= last_day)
+        .group_by(DailyDepartmentStats.department)
+        .having(total > 0)
+        .order_by(total.desc(), DailyDepartmentStats.department)
+    )
+    return [(department or None, count) for department, count in result]
+
+
+async def get_daily_reaction_totals(session: AsyncSession, first_day: date, last_day: date) -> Dict[date, Dict[str, int]]:
+    """Per-day reaction counts by type, oldest day first; days without reactions are left out."""
+    result = await session.execute(
+        select(DailyReactionStats.day, DailyReactionStats.reaction_type, DailyReactionStats.total)
+        .where(DailyReactionStats.day >= first_day, DailyReactionStats.day <= last_day, DailyReactionStats.total != 0)
+        .order_by(DailyReactionStats.day, DailyReactionStats.reaction_type)
+    )
+    daily: Dict[date, Dict[str, int]] = {}
+    for day, reaction_type, total in result:
+        daily.setdefault(day, {})[reaction_type] = total
+    return daily
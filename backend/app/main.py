@@ -1,14 +1,29 @@
+import asyncio
+
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import engine, Base, get_session
-from .crud import get_users, create_user
+from .database import engine, AsyncSessionLocal, get_session, pool_stats, settings
+from .core import security
+from .core.instrumentation import InstrumentationMiddleware, instrument_engine, render_prometheus
+from .core.logs import start_logging, stop_logging
+from .core.cache import user_cache
+from .core.ratelimit import limiter
+from .core.response_cache import feed_cache
+from .crud import create_user, estimate_user_count
 from .routers import auth as auth_router
 from .routers import users as users_router
 from .routers import shoutouts as shoutouts_router
+from .routers import stream as stream_router
+from .routers import admin as admin_router
+from . import realtime
 
 app = FastAPI(title="Bragboard API - Dev")
+app.add_middleware(InstrumentationMiddleware, profiling=settings.PROFILING_ENABLED)
+instrument_engine(engine.sync_engine)
 
 
 class UserCreate(BaseModel):
@@ -18,18 +33,76 @@ class UserCreate(BaseModel):
 
 @app.on_event("startup")
 async def on_startup():
-    # create tables if they don't exist (development convenience)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # the schema is Alembic's job (`alembic upgrade head` before starting), not every worker's on boot
+    start_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+    await realtime.hub.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await realtime.hub.stop()
+    security.kdf_pool.shutdown()
+    stop_logging()
+
+
+@app.exception_handler(security.KdfPoolBusy)
+async def kdf_pool_busy_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, retry shortly"}, headers={"Retry-After": "1"})
+
+
+def _component_stats() -> dict:
+    return {
+        "db_pool": pool_stats(),
+        "kdf_pool": security.kdf_pool.stats(),
+        "realtime": realtime.hub.stats(),
+        "user_cache": user_cache.stats(),
+        "feed_cache": feed_cache.stats(),
+        "rate_limit": limiter.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    return _component_stats()
+
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Per-route request, database time and statement histograms plus the /metrics gauges, for scraping."""
+    return PlainTextResponse(render_prometheus(_component_stats()), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/health")
-async def health(session: AsyncSession = Depends(get_session)):
+async def health():
+    """Liveness: the process is up and serving. Touches nothing, so it is safe to probe often."""
+    return {"status": "ok"}
+
+
+async def _check_database() -> int:
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("SELECT 1"))
+        return await estimate_user_count(session)
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: a pooled connection answers `SELECT 1` within
+    READY_TIMEOUT_SECONDS. Answers 503 otherwise, or when the pool is
+    exhausted, so the orchestrator stops routing to this worker until it
+    recovers.
+    """
+    pool = pool_stats()
+    body = {"status": "ready", "database": "ok", "db_pool": pool}
     try:
-        users = await get_users(session)
-        return {"status": "ok", "users_count": len(users)}
+        body["users_estimate"] = await asyncio.wait_for(_check_database(), settings.READY_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        body.update(status="unavailable", database="timeout")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        body.update(status="unavailable", database=f"error: {e.__class__.__name__}")
+    if pool["checked_out"] >= pool["size"] + pool["max_overflow"]:
+        body.update(status="unavailable", db_pool={**pool, "exhausted": True})
+    return JSONResponse(status_code=200 if body["status"] == "ready" else 503, content=body)
 
 
 @app.post("/users")
@@ -44,3 +117,5 @@ async def post_user(payload: UserCreate, session: AsyncSession = Depends(get_ses
 app.include_router(auth_router.router)
 app.include_router(users_router.router)
 app.include_router(shoutouts_router.router)
+app.include_router(stream_router.router)
+app.include_router(admin_router.router)
@@ -1,5 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, Enum, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, func, Enum, ForeignKey, ForeignKeyConstraint, Text, Index, UniqueConstraint, Computed
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from .database import Base
+from .core.cache import user_cache
 import enum
 
 
@@ -19,12 +23,31 @@ class User(Base):
     role = Column(Enum(RoleEnum), default=RoleEnum.employee, nullable=False)
     joined_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # department filters resolve to author ids from the index alone
+        Index("ix_users_department_id", "department", "id"),
+        # directory prefix search: byte-order ("C") keys serve both `LIKE 'abc%'` and keyset order;
+        # the included columns make it an index-only scan
+        Index("ix_users_name_prefix", func.lower(name).collate("C"), id,
+              postgresql_include=["name", "email", "department"]),
+        Index("ix_users_email_prefix", func.lower(email).collate("C"), id,
+              postgresql_include=["name", "email", "department"]),
+    )
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False, index=True)
+    # public half of the `<selector>.<verifier>` token, used to find the row
+    selector = Column(String, nullable=True, unique=True, index=True)
     token_hash = Column(String, nullable=False)
     revoked = Column(Integer, nullable=False, server_default="0")
     expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -35,9 +58,30 @@ class ShoutOut(Base):
     __tablename__ = "shoutouts"
 
     id = Column(Integer, primary_key=True, index=True)
-    author_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     message = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # per-type reaction counters, maintained by the reactions_maintain_counts trigger
+    like_count = Column(Integer, nullable=False, server_default="0")
+    clap_count = Column(Integer, nullable=False, server_default="0")
+    star_count = Column(Integer, nullable=False, server_default="0")
+    # full-text search document, computed by Postgres; never loaded, only queried
+    search_vector = deferred(
+        Column(TSVECTOR, Computed("setweight(to_tsvector('english', coalesce(message, '')), 'A')", persisted=True)),
+        raiseload=True,
+    )
+
+    # read-only relationships used by the feed; load them with selectinload()
+    author = relationship("User", lazy="raise")
+    recipients = relationship("User", secondary="shoutout_recipients", viewonly=True, lazy="raise")
+
+    __table_args__ = (
+        # keyset pagination of the feed: ORDER BY created_at DESC, id DESC
+        Index("ix_shoutouts_created_at_id", created_at.desc(), id.desc()),
+        # one author's shoutouts in feed order (sender filter, date ranges, keyset); also serves author_id lookups
+        Index("ix_shoutouts_author_id_created_at_id", author_id, created_at.desc(), id.desc()),
+        Index("ix_shoutouts_search_vector", search_vector, postgresql_using="gin"),
+    )
 
 
 class ShoutOutRecipient(Base):
@@ -45,7 +89,21 @@ class ShoutOutRecipient(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     shoutout_id = Column(Integer, ForeignKey("shoutouts.id"), nullable=False, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    __table_args__ = (
+        # a user's inbox, newest first: one range scan per page; also serves user_id lookups
+        Index("ix_shoutout_recipients_user_id_shoutout_id", user_id, shoutout_id.desc()),
+    )
+
+
+class InboxReadMarker(Base):
+    """How far a user has read their inbox: shoutouts tagging them with a higher id are unread."""
+    __tablename__ = "inbox_read_markers"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    last_read_shoutout_id = Column(Integer, nullable=False, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class ReactionTypeEnum(str, enum.Enum):
@@ -63,6 +121,11 @@ class Reaction(Base):
     reaction_type = Column(Enum(ReactionTypeEnum), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # one reaction per user per shoutout; add_reaction upserts on it
+    __table_args__ = (UniqueConstraint("shoutout_id", "user_id", name="uq_reactions_shoutout_user"),)
+    # shoutouts.{like,clap,star}_count follow this table through the
+    # reactions_maintain_counts trigger (migration 0006)
+
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -70,7 +133,62 @@ class Comment(Base):
     id = Column(Integer, primary_key=True, index=True)
     shoutout_id = Column(Integer, ForeignKey("shoutouts.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True, index=True)  # For nesting
+    parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)  # For nesting
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # weighted below shoutout messages ('B' vs 'A') so message hits rank first
+    search_vector = deferred(
+        Column(TSVECTOR, Computed("setweight(to_tsvector('english', coalesce(content, '')), 'B')", persisted=True)),
+        raiseload=True,
+    )
+
+    author = relationship("User", lazy="raise")
+
+    __table_args__ = (
+        # top-level comments of a shoutout in thread order, for the comment tree pages
+        Index(
+            "ix_comments_roots",
+            "shoutout_id", "created_at", "id",
+            postgresql_where=parent_id.is_(None),
+        ),
+        Index("ix_comments_search_vector", search_vector, postgresql_using="gin"),
+        # replies of a comment in thread order (migration 0014)
+        Index("ix_comments_parent_id_created_at_id", "parent_id", "created_at", "id"),
+        # a reply is on its parent's shoutout (migration 0013)
+        Index("ux_comments_id_shoutout_id", "id", "shoutout_id", unique=True),
+        ForeignKeyConstraint(
+            ["parent_id", "shoutout_id"], ["comments.id", "comments.shoutout_id"],
+            name="fk_comments_parent_same_shoutout",
+        ),
+    )
+
+
+# Daily rollups for the admin analytics (routers/admin.py). Days are UTC dates.
+# They are kept in step by statement-level triggers installed by migration 0008,
+# in the writing transaction; scripts/backfill_rollups.py recomputes them from
+# the base tables.
+
+class DailyUserStats(Base):
+    __tablename__ = "daily_user_stats"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, primary_key=True, index=True)
+    sent = Column(Integer, nullable=False, server_default="0")  # shoutouts authored
+    received = Column(Integer, nullable=False, server_default="0")  # times tagged as a recipient
+
+
+class DailyDepartmentStats(Base):
+    __tablename__ = "daily_department_stats"
+
+    day = Column(Date, primary_key=True)
+    department = Column(String, primary_key=True)  # author's department when posting; '' for none
+    shoutouts = Column(Integer, nullable=False, server_default="0")
+
+
+class DailyReactionStats(Base):
+    __tablename__ = "daily_reaction_stats"
+
+    day = Column(Date, primary_key=True)  # day the reaction was (last) set
+    reaction_type = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, server_default="0")
@@ -0,0 +1,68 @@
+"""Opaque keyset cursors shared by the paginated endpoints."""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last row of a page into an opaque token."""
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ...]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list):
+            raise ValueError("cursor must encode a list")
+        return tuple(values)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def decode_feed_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a `(created_at, id)` cursor as issued by the shoutout feeds."""
+    values = decode_cursor(cursor)
+    try:
+        created_at, row_id = values
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    """Decode a `(rank, id)` cursor as issued by the shoutout search."""
+    values = decode_cursor(cursor)
+    try:
+        rank, row_id = values
+        return float(rank), int(row_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def decode_inbox_cursor(cursor: str) -> int:
+    """Decode a `(shoutout id,)` cursor as issued by the inbox."""
+    values = decode_cursor(cursor)
+    try:
+        (row_id,) = values
+        return int(row_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def decode_directory_cursor(cursor: str) -> Tuple[str, int]:
+    """Decode a `(match key, id)` cursor as issued by the user directory search."""
+    values = decode_cursor(cursor)
+    try:
+        key, row_id = values
+        if not isinstance(key, str):
+            raise ValueError("key must be a string")
+        return key, int(row_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
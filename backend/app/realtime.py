@@ -0,0 +1,259 @@
+"""In-process pub/sub hub feeding the live event stream.
+
+Writers publish small JSON events (`shoutout.created`, `reaction.updated`,
+...). Each event goes to the `all` topic and to `department:<name>` of the
+shoutout's author; subscribers listen to one or more topics through a bounded
+queue. A subscriber whose queue fills up is evicted rather than slowing the
+publisher down or buffering without limit.
+
+With `REALTIME_BACKEND=postgres` events travel through Postgres
+LISTEN/NOTIFY, so a write handled by one uvicorn worker reaches subscribers
+connected to every other worker.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Iterable, Optional, Set
+
+from .database import settings
+
+logger = logging.getLogger(__name__)
+
+EVICTED = {"type": "evicted"}
+
+
+def event_topics(event: dict) -> Iterable[str]:
+    yield "all"
+    if event.get("department"):
+        yield f"department:{event['department']}"
+
+
+class Subscription:
+    def __init__(self, hub: "Hub", topics: Set[str], maxsize: int):
+        self.hub = hub
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.evicted = False
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.evicted = 0
+
+    @property
+    def has_listeners(self) -> bool:
+        return bool(self._topics)
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        sub = Subscription(self, set(topics), self.queue_size)
+        for topic in sub.topics:
+            self._topics.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        for topic in sub.topics:
+            subs = self._topics.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._topics[topic]
+
+    def dispatch(self, event: dict) -> None:
+        """Deliver an event to local subscribers without ever blocking."""
+        targets: Set[Subscription] = set()
+        for topic in event_topics(event):
+            targets |= self._topics.get(topic, set())
+        for sub in targets:
+            try:
+                sub.queue.put_nowait(event)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self._evict(sub)
+
+    def _evict(self, sub: Subscription) -> None:
+        # slow consumer: drop its backlog and leave only the eviction notice
+        self.unsubscribe(sub)
+        sub.evicted = True
+        self.evicted += 1
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(EVICTED)
+
+    async def publish(self, event: dict) -> None:
+        self.published += 1
+        self.dispatch(event)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "local",
+            "topics": len(self._topics),
+            "subscribers": len({sub for subs in self._topics.values() for sub in subs}),
+            "published": self.published,
+            "delivered": self.delivered,
+            "evicted": self.evicted,
+        }
+
+
+class PostgresHub(Hub):
+    """Hub whose events are broadcast to every worker through LISTEN/NOTIFY.
+
+    The hub holds one connection of its own, outside the pool: it LISTENs on
+    it and sends every NOTIFY over it (one at a time; a NOTIFY is a single
+    short statement). When the connection drops it is reopened, retrying
+    with exponential backoff; events published meanwhile are dropped, like
+    those of an evicted subscriber.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        channel: str,
+        dsn: str,
+        min_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        health_check_seconds: float = 30.0,
+        connect_timeout: float = 5.0,
+    ):
+        super().__init__(queue_size)
+        self.channel = channel
+        self.dsn = dsn
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.health_check_seconds = health_check_seconds
+        self.connect_timeout = connect_timeout
+        self.reconnects = 0
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._connected = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def has_listeners(self) -> bool:
+        # subscribers may be connected to another worker
+        return True
+
+    async def start(self) -> None:
+        """Start listening; returns once the first connection is up, or after
+        `connect_timeout` with the connection still being retried behind."""
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "realtime connection not up after %.1fs; starting without live events until it is",
+                self.connect_timeout,
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _connect(self):
+        import asyncpg
+
+        delay = self.min_backoff
+        while True:
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                await conn.add_listener(self.channel, self._on_notify)
+                return conn
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning("realtime connection failed (%s), retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+    async def _run(self) -> None:
+        while True:
+            conn = await self._connect()
+            lost = asyncio.Event()
+            conn.add_termination_listener(lambda _: lost.set())
+            self._conn = conn
+            self._connected.set()
+            try:
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=self.health_check_seconds)
+                    except asyncio.TimeoutError:
+                        # a peer that vanished without closing the socket is only noticed by using it
+                        try:
+                            async with self._lock:
+                                await conn.execute("SELECT 1", timeout=self.health_check_seconds)
+                        except Exception:
+                            break
+            finally:
+                self._connected.clear()
+                self._conn = None
+                conn.terminate()
+            self.reconnects += 1
+            logger.warning("realtime connection lost, reconnecting")
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            self.dispatch(json.loads(payload))
+        except ValueError:
+            logger.warning("dropping malformed realtime payload on %s", channel)
+
+    async def publish(self, event: dict) -> None:
+        # NOTIFY payloads are limited to 8000 bytes; events carry ids and counters only
+        self.published += 1
+        conn = self._conn
+        if conn is None:
+            raise ConnectionError("realtime connection is down")
+        async with self._lock:
+            await conn.execute("SELECT pg_notify($1, $2)", self.channel, json.dumps(event))
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "backend": "postgres",
+            "connected": self._conn is not None,
+            "reconnects": self.reconnects,
+        }
+
+
+def _create_hub() -> Hub:
+    if settings.REALTIME_BACKEND == "postgres":
+        dsn = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+        return PostgresHub(
+            settings.REALTIME_QUEUE_SIZE,
+            settings.REALTIME_CHANNEL,
+            dsn,
+            connect_timeout=settings.REALTIME_CONNECT_TIMEOUT_SECONDS,
+        )
+    return Hub(settings.REALTIME_QUEUE_SIZE)
+
+
+hub = _create_hub()
+
+
+async def publish(event: dict) -> None:
+    """Publish an event; failures are logged, never raised into the request."""
+    try:
+        await hub.publish(event)
+    except Exception:
+        logger.exception("failed to publish realtime event %s", event.get("type"))
+
+
+def topics_for(department: Optional[str]) -> Set[str]:
+    return {f"department:{department}"} if department else {"all"}
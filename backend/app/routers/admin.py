@@ -0,0 +1,80 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_session
+from .. import schemas, crud
+from ..routers.auth import require_admin
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+def analytics_window(
+    from_date: date | None = None,
+    to_date: date | None = None,
+    days: int = Query(30, ge=1, le=366),
+) -> tuple:
+    """
+    The (first_day, last_day) window, both inclusive, in UTC days.
+
+    Defaults to the last `days` days up to `to_date` (today by default);
+    `from_date` overrides the start.
+    """
+    last_day = to_date or datetime.now(timezone.utc).date()
+    first_day = from_date or last_day - timedelta(days=days - 1)
+    if first_day > last_day:
+        raise HTTPException(status_code=400, detail="from_date must not be after to_date")
+    return first_day, last_day
+
+
+@router.get("/analytics/top-senders", response_model=List[schemas.UserTotal])
+async def top_senders(
+    window: tuple = Depends(analytics_window),
+    limit: int = Query(10, ge=1, le=100),
+    department: str | None = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """Users who sent the most shoutouts in the window."""
+    rows = await crud.get_top_users(session, "sent", *window, limit=limit, department=department)
+    return [{"user": user, "total": total} for user, total in rows]
+
+
+@router.get("/analytics/top-recipients", response_model=List[schemas.UserTotal])
+async def top_recipients(
+    window: tuple = Depends(analytics_window),
+    limit: int = Query(10, ge=1, le=100),
+    department: str | None = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """Users tagged in the most shoutouts in the window."""
+    rows = await crud.get_top_users(session, "received", *window, limit=limit, department=department)
+    return [{"user": user, "total": total} for user, total in rows]
+
+
+@router.get("/analytics/departments", response_model=List[schemas.DepartmentVolume])
+async def department_volume(
+    window: tuple = Depends(analytics_window),
+    session: AsyncSession = Depends(get_session),
+):
+    """Shoutouts posted per author department in the window, busiest first."""
+    rows = await crud.get_department_volume(session, *window)
+    return [{"department": department, "shoutouts": count} for department, count in rows]
+
+
+@router.get("/analytics/reactions", response_model=schemas.ReactionTotalsOut)
+async def reaction_totals(
+    window: tuple = Depends(analytics_window),
+    session: AsyncSession = Depends(get_session),
+):
+    """Reactions by type over the window, in total and per day."""
+    daily = await crud.get_daily_reaction_totals(session, *window)
+    totals: dict = {}
+    for counts in daily.values():
+        for reaction_type, count in counts.items():
+            totals[reaction_type] = totals.get(reaction_type, 0) + count
+    return {
+        "totals": totals,
+        "daily": [{"day": day, "reactions": counts} for day, counts in daily.items()],
+    }
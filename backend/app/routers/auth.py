@@ -1,78 +1,83 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from fastapi.security import OAuth2PasswordRequestForm
 
 from ..database import get_session
-from .. import models, schemas
+from .. import crud, models, schemas
 from datetime import datetime, timedelta, timezone
-import secrets
 from ..core import security
+from ..core.cache import user_cache
+from ..core.ratelimit import per_ip
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/register", response_model=schemas.UserOut)
+@router.post("/register", response_model=schemas.UserOut, dependencies=[Depends(per_ip("register"))])
 async def register(payload: schemas.UserCreate, session: AsyncSession = Depends(get_session)):
-    # check exists
-    q = await session.execute(select(models.User).where(models.User.email == payload.email))
-    existing = q.scalar_one_or_none()
-    if existing:
+    hashed = await security.hash_password_async(payload.password)
+    # the unique index on email decides duplicates (no racy SELECT first)
+    try:
+        return await crud.create_user(
+            session, payload.email, name=payload.name, password_hash=hashed, department=payload.department
+        )
+    except IntegrityError:
+        await session.rollback()
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed = security.get_password_hash(payload.password)
-    user = models.User(email=payload.email, name=payload.name, password_hash=hashed, department=payload.department)
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
-    return user
+
+async def _issue_refresh_token(session: AsyncSession, user_id: int) -> str:
+    """Create an opaque refresh token for `user_id`; only its digest is stored."""
+    raw_rt, selector, rt_hash = security.new_refresh_token()
+    expires = datetime.now(timezone.utc) + timedelta(days=int(security.settings.REFRESH_TOKEN_EXPIRE_DAYS))
+    session.add(models.RefreshToken(user_id=user_id, selector=selector, token_hash=rt_hash, expires_at=expires))
+    return raw_rt
 
 
-@router.post("/login", response_model=schemas.Token)
+@router.post("/login", response_model=schemas.Token, dependencies=[Depends(per_ip("login"))])
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_session)):
     q = await session.execute(select(models.User).where(models.User.email == form_data.username))
     user = q.scalar_one_or_none()
-    if not user or not security.verify_password(form_data.password, user.password_hash):
+    if not user or not await security.verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     # create access token (JWT)
     access = security.create_access_token(user.id)
 
-    # create opaque refresh token, store hashed value in DB
-    raw_rt = secrets.token_urlsafe(32)
-    rt_hash = security.get_password_hash(raw_rt)
-    expires = datetime.now(timezone.utc) + timedelta(days=int(security.settings.REFRESH_TOKEN_EXPIRE_DAYS))
-    rt = models.RefreshToken(user_id=user.id, token_hash=rt_hash, expires_at=expires)
-    session.add(rt)
+    raw_rt = await _issue_refresh_token(session, user.id)
     await session.commit()
-    await session.refresh(rt)
 
     return {"access_token": access, "refresh_token": raw_rt, "token_type": "bearer"}
 
 
-@router.post("/refresh", response_model=schemas.Token)
+@router.post("/refresh", response_model=schemas.Token, dependencies=[Depends(per_ip("refresh"))])
 async def refresh(body: dict, session: AsyncSession = Depends(get_session)):
     # Expect a JSON body {"refresh_token": "..."}
     rt = body.get("refresh_token") if isinstance(body, dict) else None
     if not rt:
         raise HTTPException(status_code=400, detail="Missing refresh token")
 
-    # find candidate refresh tokens that are not revoked and not expired for any user
-    q = await session.execute(select(models.RefreshToken).where(models.RefreshToken.revoked == 0))
-    candidates = q.scalars().all()
-    matched = None
-    for cand in candidates:
-        # check expiry
-        if cand.expires_at and cand.expires_at < datetime.now(timezone.utc):
-            continue
-        try:
-            if security.verify_password(rt, cand.token_hash):
-                matched = cand
-                break
-        except Exception:
-            continue
-
-    if not matched:
+    try:
+        selector, verifier = security.split_refresh_token(rt)
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    # one indexed lookup; FOR UPDATE so two concurrent refreshes cannot both rotate the same token
+    q = await session.execute(
+        select(models.RefreshToken)
+        .where(models.RefreshToken.selector == selector)
+        .with_for_update()
+    )
+    matched = q.scalar_one_or_none()
+    if (
+        not matched
+        or matched.revoked
+        or (matched.expires_at and matched.expires_at < datetime.now(timezone.utc))
+        or not security.verify_refresh_token(verifier, matched.token_hash)
+    ):
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
     # load user
@@ -83,13 +88,8 @@ async def refresh(body: dict, session: AsyncSession = Depends(get_session)):
 
     # rotate: revoke old token and issue new opaque token
     matched.revoked = 1
-    raw_rt = secrets.token_urlsafe(32)
-    rt_hash = security.get_password_hash(raw_rt)
-    expires = datetime.now(timezone.utc) + timedelta(days=int(security.settings.REFRESH_TOKEN_EXPIRE_DAYS))
-    new_rt = models.RefreshToken(user_id=user.id, token_hash=rt_hash, expires_at=expires)
-    session.add(new_rt)
+    raw_rt = await _issue_refresh_token(session, user.id)
     await session.commit()
-    await session.refresh(new_rt)
 
     access = security.create_access_token(user.id)
     return {"access_token": access, "refresh_token": raw_rt, "token_type": "bearer"}
@@ -101,17 +101,43 @@ from fastapi.security import OAuth2PasswordBearer
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)):
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)) -> schemas.UserOut:
+    """
+    Resolve the bearer token to a read-only `UserOut` snapshot.
+
+    Snapshots are served from `user_cache` for a few seconds, so a warm user
+    costs no query; updates through the ORM invalidate the entry.
+    """
+    return await user_for_token(token, session)
+
+
+async def user_for_token(token: str, session: AsyncSession, scope: Optional[str] = None) -> schemas.UserOut:
+    """`get_current_user` for a token whose `scope` claim must be `scope` (None: an access token)."""
     try:
         data = security.decode_token(token)
         user_id = int(data.get("sub"))
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if data.get("scope") != scope:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
     q = await session.execute(select(models.User).where(models.User.id == user_id))
     user = q.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    snapshot = schemas.UserOut.from_orm(user)
+    user_cache.set(user_id, snapshot)
+    return snapshot
+
+
+async def require_admin(current=Depends(get_current_user)) -> schemas.UserOut:
+    if current.role != models.RoleEnum.admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current
 
 
 @router.get("/users/me", response_model=schemas.UserOut)
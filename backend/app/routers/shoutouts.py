@@ -1,160 +1,403 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError, parse_obj_as
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List
 
-from ..database import get_session
+from ..database import get_session, settings
 from .. import models, schemas, crud
+from ..pagination import InvalidCursor, decode_feed_cursor, decode_inbox_cursor, decode_search_cursor, encode_cursor
+from .. import realtime
+from ..core.ratelimit import per_user
+from ..core.response_cache import feed_cache
 from ..routers.auth import get_current_user
 
 router = APIRouter(prefix="/shoutouts", tags=["shoutouts"])
+logger = logging.getLogger(__name__)
+
+
+def _limited(rule: str) -> list:
+    """Route dependencies applying the `rule` rate limit per user."""
+    return [Depends(per_user(rule, get_current_user))]
+
+
+def _shoutout_namespace(shoutout_id: int) -> str:
+    """`feed_cache` namespace of one shoutout's reactions and comments."""
+    return f"shoutout:{shoutout_id}"
 
 
-@router.post("", response_model=schemas.ShoutOutOut)
+async def _publish_live(session: AsyncSession, event_type: str, shoutout_id: int, with_counts: bool = False, **data):
+    """Push a change on `shoutout_id` to live subscribers (after the write committed)."""
+    if not realtime.hub.has_listeners:
+        return
+    department, counts = await crud.get_live_context(session, shoutout_id)
+    event = {"type": event_type, "shoutout_id": shoutout_id, "department": department, **data}
+    if with_counts:
+        event["reactions"] = counts
+    await realtime.publish(event)
+
+
+@router.post("", response_model=schemas.ShoutOutOut, dependencies=_limited("shoutouts"))
 async def create_shoutout(
     payload: schemas.ShoutOutCreate,
     session: AsyncSession = Depends(get_session),
     current=Depends(get_current_user)
 ):
     """
-    Create a new shoutout with optional recipient tagging.
+    Create a new shoutout with optional recipient tagging, by user id
+    (`recipient_ids`) and/or whole departments (`recipient_departments`).
     """
     try:
-        recipient_ids = payload.recipient_ids or []
-
-        # Validate recipients exist
-        if recipient_ids:
-            q = await session.execute(
-                select(models.User).where(models.User.id.in_(recipient_ids))
-            )
-            recipients = q.scalars().all()
-            
-            # Verify all recipients were found
-            found_ids = {r.id for r in recipients}
-            invalid_ids = set(recipient_ids) - found_ids
-            if invalid_ids:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Invalid recipient IDs: {invalid_ids}"
-                )
-        else:
-            recipients = []
-
-        # Create shoutout
         shout = await crud.create_shoutout(
             session,
             author_id=int(current.id),
             message=payload.message,
-            recipient_ids=recipient_ids
+            recipient_ids=payload.recipient_ids or [],
+            recipient_departments=payload.recipient_departments or []
+        )
+
+        logger.info(
+            "shoutout created",
+            extra={"user_id": current.id, "shoutout_id": shout.id, "recipients": len(shout.recipients)},
         )
 
-        print(f"[CREATE_SHOUTOUT] User {current.id} created shoutout {shout.id} for {len(recipients)} recipients")
+        await realtime.publish({
+            "type": "shoutout.created",
+            "shoutout_id": shout.id,
+            "author_id": int(current.id),
+            "department": current.department,
+        })
+        await feed_cache.invalidate("shoutouts")
 
         return {
             "id": shout.id,
             "message": shout.message,
             "created_at": shout.created_at,
             "author": current,
-            "recipients": recipients
+            "recipients": shout.recipients
         }
 
-    except HTTPException:
-        raise
+    except crud.InvalidRecipients as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"[CREATE_SHOUTOUT] Error: {str(e)}")
+        logger.exception("create shoutout failed", extra={"user_id": current.id})
         raise HTTPException(status_code=400, detail=f"Failed to create shoutout: {str(e)}")
 
 
-@router.get("", response_model=List[schemas.ShoutOutOut])
-async def get_shoutouts(
-    limit: int = 50,
-    offset: int = 0,
+def feed_filters(
     department: str | None = None,
     sender_id: int | None = None,
     from_date: str | None = None,
     to_date: str | None = None,
-    session: AsyncSession = Depends(get_session),
-    current=Depends(get_current_user)
-):
+) -> dict:
     """
-    Get shoutouts with optional filters:
+    Filters shared by the feed and search endpoints:
     - department: filter by author's department
     - sender_id: filter by specific author
     - from_date: filter shoutouts from this date (ISO format: YYYY-MM-DD)
     - to_date: filter shoutouts until this date (ISO format: YYYY-MM-DD)
     """
+    from datetime import datetime
+
+    from_dt = None
+    if from_date:
+        try:
+            from_dt = datetime.fromisoformat(from_date)
+        except ValueError:
+            pass  # ignore invalid date format
+
+    to_dt = None
+    if to_date:
+        try:
+            # Extend to the end of the day to include the entire to_date
+            to_dt = datetime.fromisoformat(to_date).replace(hour=23, minute=59, second=59)
+        except ValueError:
+            pass  # ignore invalid date format
+
+    return {
+        "department": department,
+        "sender_id": sender_id,
+        "from_dt": from_dt,
+        "to_dt": to_dt,
+    }
+
+
+def feed_params(
+    limit: int = 50,
+    offset: int = 0,
+    cursor: str | None = None,
+    filters: dict = Depends(feed_filters),
+) -> dict:
+    """
+    Query parameters shared by the feed endpoints, parsed into keyword
+    arguments for `crud.list_shoutouts`: the `feed_filters` plus
+    - cursor: `X-Next-Cursor` of the previous page (takes precedence over offset)
+    """
     try:
-        from datetime import datetime
-        
-        q = select(models.ShoutOut).order_by(models.ShoutOut.created_at.desc())
-
-        # Filter by author's department
-        if department:
-            q = q.join(models.User, models.ShoutOut.author_id == models.User.id).where(
-                models.User.department == department
-            )
-
-        # Filter by specific sender
-        if sender_id:
-            q = q.where(models.ShoutOut.author_id == sender_id)
-
-        # Filter by date range
-        if from_date:
-            try:
-                from_dt = datetime.fromisoformat(from_date)
-                q = q.where(models.ShoutOut.created_at >= from_dt)
-            except ValueError:
-                pass  # ignore invalid date format
-        
-        if to_date:
-            try:
-                to_dt = datetime.fromisoformat(to_date)
-                # Add one day to include the entire to_date
-                to_dt = to_dt.replace(hour=23, minute=59, second=59)
-                q = q.where(models.ShoutOut.created_at <= to_dt)
-            except ValueError:
-                pass  # ignore invalid date format
-
-        # Apply pagination
-        q = q.limit(limit).offset(offset)
-
-        result = await session.execute(q)
-        shoutouts = result.scalars().all()
-
-        response = []
-
-        for s in shoutouts:
-            # Load author
-            aq = await session.execute(
-                select(models.User).where(models.User.id == s.author_id)
-            )
-            author = aq.scalar_one_or_none()
-
-            # Load recipients
-            rq = await session.execute(
-                select(models.User)
-                .join(models.ShoutOutRecipient)
-                .where(models.ShoutOutRecipient.shoutout_id == s.id)
-            )
-            recipients = rq.scalars().all()
-
-            if author:  # Only include if author exists
-                response.append({
-                    "id": s.id,
-                    "message": s.message,
-                    "created_at": s.created_at,
-                    "author": author,
-                    "recipients": recipients
-                })
-
-        return response
+        before = decode_feed_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"limit": limit, "offset": offset, **filters, "before": before}
+
+
+async def _load_feed_page(session: AsyncSession, params: dict) -> tuple:
+    """Return the page and the headers to send with it (`X-Next-Cursor`)."""
+    shoutouts = await crud.list_shoutouts(session, **params)
+    headers = {}
+    if len(shoutouts) == params["limit"]:
+        last = shoutouts[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+    return shoutouts, headers
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag in tags or "*" in tags
+
+
+async def _cached_response(request: Request, key: str, render) -> Response:
+    """
+    Serve `key` from `feed_cache`, rendering it with `render()` on a miss.
+
+    `render` returns the payload (already validated against the response
+    schema) and its headers. A matching `If-None-Match` gets a bodyless 304.
+    """
+    entry = await feed_cache.get(key)
+    if entry is None:
+        payload, headers = await render()
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        entry = await feed_cache.set(key, body, headers)
+    headers = {**entry["headers"], "ETag": entry["etag"], "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+
+@router.get("", response_model=List[schemas.ShoutOutOut])
+async def get_shoutouts(
+    request: Request,
+    params: dict = Depends(feed_params),
+    session: AsyncSession = Depends(get_session),
+    current=Depends(get_current_user)
+):
+    """
+    Get shoutouts, newest first, filtered as described in `feed_params`.
+
+    Pagination: a full page carries an `X-Next-Cursor` header; pass it back as
+    `cursor` to get the next page.
+
+    The page is the same for every caller, so it is served from `feed_cache`
+    until a shoutout is created; send the `ETag` back as `If-None-Match` to
+    get a 304 while nothing changed.
+    """
+    async def render():
+        shoutouts, headers = await _load_feed_page(session, params)
+        rows = [
+            {
+                "id": s.id,
+                "message": s.message,
+                "created_at": s.created_at,
+                "author": s.author,
+                "recipients": s.recipients,
+            }
+            for s in shoutouts
+        ]
+        return parse_obj_as(List[schemas.ShoutOutOut], rows), headers
+
+    try:
+        key = await feed_cache.key("shoutouts", params, depends_on=("shoutouts",))
+        return await _cached_response(request, key, render)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/feed", response_model=List[schemas.ShoutOutWithReactionsAndComments])
+async def get_enriched_feed(
+    request: Request,
+    params: dict = Depends(feed_params),
+    comments_preview: int = Query(3, ge=0, le=20),
+    session: AsyncSession = Depends(get_session),
+    current=Depends(get_current_user)
+):
+    """
+    Same page as `GET /shoutouts`, with each card's reaction counts, the
+    caller's own reaction, the comment count and the latest
+    `comments_preview` comments, so a feed render needs a single request.
+
+    Cached per caller (the page carries their own reaction) until a
+    shoutout is created or a reaction or comment is written on one of the
+    cards shown; `ETag` works as on `GET /shoutouts`. Which cards a page
+    shows is cached on its own, so the key can name them without a query.
+    """
+    page = None
+
+    async def render():
+        shoutouts, headers = page or await _load_feed_page(session, params)
+        ids = [s.id for s in shoutouts]
+
+        user_reactions = await crud.get_user_reactions_for(session, ids, int(current.id))
+        comment_counts = await crud.get_comment_counts_for(session, ids)
+        previews = await crud.get_comment_previews(session, ids, comments_preview) if comments_preview else {}
+
+        rows = [
+            {
+                "id": s.id,
+                "message": s.message,
+                "created_at": s.created_at,
+                "author": s.author,
+                "recipients": s.recipients,
+                "reactions": crud.reaction_counts(s),
+                "user_reaction": user_reactions.get(s.id),
+                "comment_count": comment_counts.get(s.id, 0),
+                "comments": [_comment_out(c) for c in previews.get(s.id, [])],
+            }
+            for s in shoutouts
+        ]
+        return parse_obj_as(List[schemas.ShoutOutWithReactionsAndComments], rows), headers
+
+    try:
+        ids_key = await feed_cache.key("feed-ids", params, depends_on=("shoutouts",))
+        ids_entry = await feed_cache.get(ids_key)
+        if ids_entry is None:
+            page = await _load_feed_page(session, params)
+            ids = [s.id for s in page[0]]
+            await feed_cache.set(ids_key, json.dumps(ids).encode())
+        else:
+            ids = json.loads(ids_entry["body"])
+
+        key = await feed_cache.key(
+            "feed",
+            {**params, "user_id": int(current.id), "comments_preview": comments_preview},
+            depends_on=("shoutouts", *map(_shoutout_namespace, ids)),
+        )
+        return await _cached_response(request, key, render)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/search", response_model=List[schemas.ShoutOutSearchHit])
+async def search_shoutouts(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    filters: dict = Depends(feed_filters),
+    session: AsyncSession = Depends(get_session),
+    current=Depends(get_current_user)
+):
+    """
+    Search shoutout messages and comments, best match first.
+
+    `q` accepts web search syntax: `"exact phrase"`, `or`, `-exclude`.
+    Combines with the `feed_filters`. A full page carries an `X-Next-Cursor`
+    header; pass it back as `cursor` for the next page. Very common terms are
+    ranked among their `SEARCH_MAX_CANDIDATES` newest matches only.
+    """
+    try:
+        after = decode_search_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    hits = await crud.search_shoutouts(
+        session, q, limit=limit, after=after, max_candidates=settings.SEARCH_MAX_CANDIDATES, **filters
+    )
+    if len(hits) == limit:
+        last, last_rank = hits[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last_rank, last.id)
+    return [
+        {
+            "id": s.id,
+            "message": s.message,
+            "created_at": s.created_at,
+            "author": s.author,
+            "recipients": s.recipients,
+            "rank": rank,
+        }
+        for s, rank in hits
+    ]
+
+
+INBOX_UNREAD_CAP = 99
+
+
+@router.get("/inbox", response_model=schemas.InboxOut)
+async def get_inbox(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_session),
+    current=Depends(get_current_user)
+):
+    """
+    Shoutouts the caller was tagged in, newest first, each flagged `unread`
+    if it is newer than their read marker, plus the unread total (capped at
+    99; `unread_capped` says there are more). Pass `next_cursor` back as
+    `cursor` for the next page. A page costs the same however large the
+    inbox or the global feed gets.
+    """
+    try:
+        before = decode_inbox_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    user_id = int(current.id)
+    last_read, unread = await crud.get_inbox_state(session, user_id, cap=INBOX_UNREAD_CAP)
+    shoutouts = await crud.get_inbox(session, user_id, limit=limit, before=before)
+    return {
+        "items": [
+            {
+                "id": s.id,
+                "message": s.message,
+                "created_at": s.created_at,
+                "author": s.author,
+                "recipients": s.recipients,
+                "unread": s.id > last_read,
+            }
+            for s in shoutouts
+        ],
+        "unread": min(unread, INBOX_UNREAD_CAP),
+        "unread_capped": unread > INBOX_UNREAD_CAP,
+        "last_read_shoutout_id": last_read,
+        "next_cursor": encode_cursor(shoutouts[-1].id) if len(shoutouts) == limit else None,
+    }
+
+
+@router.post("/inbox/read")
+async def mark_inbox_read(
+    payload: schemas.InboxReadIn | None = None,
+    session: AsyncSession = Depends(get_session),
+    current=Depends(get_current_user)
+):
+    """Mark the inbox read up to `up_to` (default: all of it). The marker only ever moves forward."""
+    marker = await crud.mark_inbox_read(session, int(current.id), up_to=payload.up_to if payload else None)
+    return {"last_read_shoutout_id": marker}
+
+
+def _comment_out(comment: models.Comment) -> dict:
+    return {
+        "id": comment.id,
+        "shoutout_id": comment.shoutout_id,
+        "user_id": comment.user_id,
+        "parent_id": comment.parent_id,
+        "content": comment.content,
+        "created_at": comment.created_at,
+        "updated_at": comment.updated_at,
+        "author": comment.author,
+    }
+
+
 # Reaction endpoints
-@router.post("/{shoutout_id}/reactions", response_model=schemas.ReactionOut)
+@router.post("/{shoutout_id}/reactions", response_model=schemas.ReactionOut, dependencies=_limited("reactions"))
 async def add_reaction_to_shoutout(
     shoutout_id: int,
     payload: schemas.ReactionCreate,
@@ -162,23 +405,26 @@ async def add_reaction_to_shoutout(
     current=Depends(get_current_user)
 ):
     """Add or update a reaction to a shoutout"""
-    # Verify shoutout exists
-    result = await session.execute(
-        select(models.ShoutOut).where(models.ShoutOut.id == shoutout_id)
-    )
-    if not result.scalar_one_or_none():
+    # no existence check up front: the foreign key rejects an unknown shoutout
+    try:
+        reaction = await crud.add_reaction(
+            session,
+            shoutout_id=shoutout_id,
+            user_id=int(current.id),
+            reaction_type=payload.reaction_type
+        )
+    except IntegrityError:
+        await session.rollback()
         raise HTTPException(status_code=404, detail="Shoutout not found")
-    
-    reaction = await crud.add_reaction(
-        session, 
-        shoutout_id=shoutout_id, 
-        user_id=int(current.id), 
-        reaction_type=payload.reaction_type
+    await _publish_live(
+        session, "reaction.updated", shoutout_id, with_counts=True,
+        user_id=int(current.id), reaction_type=payload.reaction_type,
     )
+    await feed_cache.invalidate(_shoutout_namespace(shoutout_id))
     return reaction
 
 
-@router.delete("/{shoutout_id}/reactions")
+@router.delete("/{shoutout_id}/reactions", dependencies=_limited("reactions"))
 async def remove_reaction_from_shoutout(
     shoutout_id: int,
     session: AsyncSession = Depends(get_session),
@@ -188,9 +434,50 @@ async def remove_reaction_from_shoutout(
     removed = await crud.remove_reaction(session, shoutout_id, int(current.id))
     if not removed:
         raise HTTPException(status_code=404, detail="Reaction not found")
+    await _publish_live(session, "reaction.removed", shoutout_id, with_counts=True, user_id=int(current.id))
+    await feed_cache.invalidate(_shoutout_namespace(shoutout_id))
     return {"message": "Reaction removed"}
 
 
+async def _reaction_summaries(session: AsyncSession, ids: List[int], user_id: int) -> dict:
+    ids = list(dict.fromkeys(ids))
+    counts = await crud.get_reaction_counts_for(session, ids)
+    mine = await crud.get_user_reactions_for(session, list(counts), user_id)
+    return {
+        shoutout_id: {"reactions": counts[shoutout_id], "user_reaction": mine.get(shoutout_id)}
+        for shoutout_id in ids
+        if shoutout_id in counts
+    }
+
+
+@router.get("/reactions", response_model=Dict[int, schemas.ReactionSummary])
+async def get_reactions_batch(
+    ids: List[str] = Query(..., description="shoutout ids, comma-separated and/or repeated"),
+    session: AsyncSession = Depends(get_session),
+    current=Depends(get_current_user)
+):
+    """
+    `GET /shoutouts/{id}/reactions` for up to 200 shoutouts at once, keyed by
+    id; unknown ids are left out. Two statements whatever the number of ids.
+    Use `POST /shoutouts/reactions` when the list is too long for a URL.
+    """
+    try:
+        payload = schemas.ReactionsBatchIn(ids=[part for value in ids for part in value.split(",") if part.strip()])
+    except ValidationError as e:
+        raise RequestValidationError(e.raw_errors)
+    return await _reaction_summaries(session, payload.ids, int(current.id))
+
+
+@router.post("/reactions", response_model=Dict[int, schemas.ReactionSummary])
+async def post_reactions_batch(
+    payload: schemas.ReactionsBatchIn,
+    session: AsyncSession = Depends(get_session),
+    current=Depends(get_current_user)
+):
+    """Same as `GET /shoutouts/reactions`, with the ids in a JSON body: `{"ids": [1, 2, 3]}`."""
+    return await _reaction_summaries(session, payload.ids, int(current.id))
+
+
 @router.get("/{shoutout_id}/reactions")
 async def get_shoutout_reactions(
     shoutout_id: int,
@@ -207,7 +494,7 @@ async def get_shoutout_reactions(
 
 
 # Comment endpoints
-@router.post("/{shoutout_id}/comments", response_model=schemas.CommentOut)
+@router.post("/{shoutout_id}/comments", response_model=schemas.CommentOut, dependencies=_limited("comments"))
 async def add_comment_to_shoutout(
     shoutout_id: int,
     payload: schemas.CommentCreate,
@@ -215,35 +502,29 @@ async def add_comment_to_shoutout(
     current=Depends(get_current_user)
 ):
     """Add a comment to a shoutout"""
-    # Verify shoutout exists
-    result = await session.execute(
-        select(models.ShoutOut).where(models.ShoutOut.id == shoutout_id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Shoutout not found")
-    
-    # If parent_id is provided, verify parent comment exists
-    if payload.parent_id:
-        parent_result = await session.execute(
-            select(models.Comment).where(models.Comment.id == payload.parent_id)
+    try:
+        comment = await crud.add_comment(
+            session,
+            shoutout_id=shoutout_id,
+            user_id=int(current.id),
+            content=payload.content,
+            parent_id=payload.parent_id
         )
-        if not parent_result.scalar_one_or_none():
+    except IntegrityError as e:
+        await session.rollback()
+        # the foreign keys stand in for existence checks
+        if crud.violated_constraint(e) == "comments_shoutout_id_fkey":
+            raise HTTPException(status_code=404, detail="Shoutout not found")
+        if crud.violated_constraint(e) in ("comments_parent_id_fkey", "fk_comments_parent_same_shoutout"):
             raise HTTPException(status_code=404, detail="Parent comment not found")
-    
-    comment = await crud.add_comment(
-        session,
-        shoutout_id=shoutout_id,
-        user_id=int(current.id),
-        content=payload.content,
-        parent_id=payload.parent_id
-    )
-    
-    # Load author
-    author_result = await session.execute(
-        select(models.User).where(models.User.id == comment.user_id)
+        raise
+
+    await _publish_live(
+        session, "comment.created", shoutout_id,
+        comment_id=comment.id, parent_id=comment.parent_id, user_id=comment.user_id,
     )
-    author = author_result.scalar_one()
-    
+    await feed_cache.invalidate(_shoutout_namespace(shoutout_id))
+
     return {
         "id": comment.id,
         "shoutout_id": comment.shoutout_id,
@@ -252,7 +533,7 @@ async def add_comment_to_shoutout(
         "content": comment.content,
         "created_at": comment.created_at,
         "updated_at": comment.updated_at,
-        "author": author
+        "author": current
     }
 
 
@@ -264,27 +545,61 @@ async def get_shoutout_comments(
 ):
     """Get all comments for a shoutout"""
     comments = await crud.get_comments(session, shoutout_id)
-    
-    response = []
-    for comment in comments:
-        # Load author for each comment
-        author_result = await session.execute(
-            select(models.User).where(models.User.id == comment.user_id)
-        )
-        author = author_result.scalar_one()
-        
-        response.append({
-            "id": comment.id,
-            "shoutout_id": comment.shoutout_id,
-            "user_id": comment.user_id,
-            "parent_id": comment.parent_id,
-            "content": comment.content,
-            "created_at": comment.created_at,
-            "updated_at": comment.updated_at,
-            "author": author
-        })
-    
-    return response
+    return [_comment_out(c) for c in comments]
+
+
+@router.get("/{shoutout_id}/comments/tree", response_model=schemas.CommentTreeOut)
+async def get_shoutout_comment_tree(
+    shoutout_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    max_depth: int = Query(5, ge=0, le=20),
+    max_replies: int = Query(200, ge=0, le=1000),
+    session: AsyncSession = Depends(get_session),
+    current=Depends(get_current_user)
+):
+    """
+    Get a page of top-level comments with their replies nested under them.
+
+    - limit: top-level comments per page, oldest first
+    - cursor: `next_cursor` of the previous page
+    - max_depth: reply levels to include below each top-level comment
+    - max_replies: cap on replies returned for the whole page (the deepest,
+      newest are dropped first); `truncated` is set when it was hit
+    """
+    try:
+        after = decode_feed_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # one reply more than asked for tells whether the cap was hit
+    rows = await crud.get_comment_thread(
+        session, shoutout_id, limit=limit, after=after, max_depth=max_depth, max_replies=max_replies + 1
+    )
+    truncated = sum(1 for _, depth in rows if depth > 0) > max_replies
+    if truncated:
+        rows = rows[:-1]
+
+    nodes = {}
+    roots = []
+    for comment, depth in rows:
+        node = {**_comment_out(comment), "replies": []}
+        nodes[comment.id] = node
+        if depth == 0:
+            roots.append(node)
+        elif comment.parent_id in nodes:
+            nodes[comment.parent_id]["replies"].append(node)
+
+    next_cursor = None
+    if len(roots) == limit:
+        last = roots[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+
+    return {
+        "comments": roots,
+        "next_cursor": next_cursor,
+        "truncated": truncated,
+    }
 
 
 @router.delete("/{shoutout_id}/comments/{comment_id}")
@@ -295,7 +610,9 @@ async def delete_comment_from_shoutout(
     current=Depends(get_current_user)
 ):
     """Delete a comment (only the author can delete)"""
-    deleted = await crud.delete_comment(session, comment_id, int(current.id))
+    deleted = await crud.delete_comment(session, comment_id, int(current.id), shoutout_id=shoutout_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Comment not found or unauthorized")
+    await _publish_live(session, "comment.deleted", shoutout_id, comment_id=comment_id)
+    await feed_cache.invalidate(_shoutout_namespace(shoutout_id))
     return {"message": "Comment deleted"}
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core import security
+from ..database import get_session, settings
+from .. import realtime
+from .auth import get_current_user, user_for_token
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+KEEPALIVE_SECONDS = 15
+
+
+@router.post("/token")
+async def create_stream_token(current=Depends(get_current_user)):
+    """
+    A token for `GET /stream?token=`, valid for `expires_in` seconds and for
+    nothing else: unlike the access token it is harmless once it has ended up
+    in an access log or browser history. Fetch a new one to reconnect.
+    """
+    return {"token": security.create_stream_token(current.id), "expires_in": settings.STREAM_TOKEN_EXPIRE_SECONDS}
+
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    department: str | None = None,
+    token: str | None = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Server-Sent Events stream of feed changes (`shoutout.created`,
+    `reaction.updated`, `reaction.removed`, `comment.created`,
+    `comment.deleted`), optionally limited to one author department.
+
+    EventSource cannot set headers, so instead of an `Authorization: Bearer`
+    header it may pass `?token=` from `POST /stream/token` (never the access
+    token, which would end up in access logs). A client that falls too far
+    behind receives an `evicted` event and should reconnect.
+    """
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        await user_for_token(auth[7:], session)
+    elif token:
+        await user_for_token(token, session, scope="stream")
+    else:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    # don't hold a pooled connection for the lifetime of the stream
+    await session.close()
+
+    sub = realtime.hub.subscribe(realtime.topics_for(department))
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(sub.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                if event is realtime.EVICTED:
+                    break
+        finally:
+            sub.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,14 +1,17 @@
+import logging
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from ..database import get_session
-from .. import models, schemas
+from .. import models, schemas, crud
+from ..pagination import InvalidCursor, decode_directory_cursor, encode_cursor
 from .auth import get_current_user
 
 router = APIRouter(prefix="/users", tags=["users"])
+logger = logging.getLogger(__name__)
 
 @router.get("", response_model=List[schemas.UserOut])
 async def list_users(
@@ -33,14 +36,45 @@ async def list_users(
         result = await session.execute(q)
         users = result.scalars().all()
 
-        print(f"[LIST_USERS] Found {len(users)} users (dept={department}, current_user_id={current_user.id})")
+        logger.debug(
+            "listed users", extra={"count": len(users), "department": department, "user_id": current_user.id}
+        )
         return users
     
     except Exception as e:
-        print(f"[LIST_USERS] Error: {str(e)}")
+        logger.exception("list users failed", extra={"department": department, "user_id": current_user.id})
         raise HTTPException(status_code=500, detail=f"Failed to list users: {str(e)}")
 
 
+@router.get("/search", response_model=List[schemas.UserSummary])
+async def search_users(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    department: str | None = None,
+    limit: int = Query(20, ge=1, le=50),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_session),
+    current_user=Depends(get_current_user)
+):
+    """
+    Typeahead for recipient pickers: users whose name or email starts with
+    `q` (case-insensitive), alphabetically by what matched, excluding the
+    current user. A full page carries an `X-Next-Cursor` header; pass it back
+    as `cursor` for the next page.
+    """
+    try:
+        after = decode_directory_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = await crud.search_directory(
+        session, q, limit=limit, department=department, exclude_id=int(current_user.id), after=after
+    )
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].key, rows[-1].id)
+    return [dict(row._mapping) for row in rows]
+
+
 @router.get("/me", response_model=schemas.UserOut)
 async def read_me(current=Depends(get_current_user)):
     return current
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, conlist
 from typing import Literal, List
-from datetime import datetime
+from datetime import date, datetime
 
 
 class UserCreate(BaseModel):
@@ -22,6 +22,14 @@ class UserOut(BaseModel):
         orm_mode = True
 
 
+class UserSummary(BaseModel):
+    """The few columns a recipient picker shows."""
+    id: int
+    name: str | None
+    email: str
+    department: str | None
+
+
 class Token(BaseModel):
     access_token: str
     refresh_token: str
@@ -37,6 +45,8 @@ class TokenData(BaseModel):
 class ShoutOutCreate(BaseModel):
     message: str
     recipient_ids: list[int] | None = []
+    # tag everyone in these departments (except the author), expanded server-side
+    recipient_departments: list[str] | None = []
 
 
 class ShoutOutOut(BaseModel):
@@ -50,10 +60,42 @@ class ShoutOutOut(BaseModel):
         from_attributes = True
 
 
+class ShoutOutSearchHit(ShoutOutOut):
+    rank: float
+
+
+class InboxItem(ShoutOutOut):
+    unread: bool
+
+
+class InboxOut(BaseModel):
+    items: List[InboxItem]
+    unread: int  # capped: see unread_capped
+    unread_capped: bool = False  # more than `unread` are unread ("99+")
+    last_read_shoutout_id: int
+    next_cursor: str | None = None
+
+
+class InboxReadIn(BaseModel):
+    up_to: int | None = None  # newest shoutout id to mark read; default: everything so far
+
+
 class ReactionCreate(BaseModel):
     reaction_type: Literal["like", "clap", "star"]
 
 
+MAX_BATCH_IDS = 200
+
+
+class ReactionsBatchIn(BaseModel):
+    ids: conlist(int, min_items=1, max_items=MAX_BATCH_IDS)
+
+
+class ReactionSummary(BaseModel):
+    reactions: dict[str, int]
+    user_reaction: str | None
+
+
 class ReactionOut(BaseModel):
     id: int
     shoutout_id: int
@@ -63,6 +105,7 @@ class ReactionOut(BaseModel):
 
     class Config:
         from_attributes = True
+        orm_mode = True
 
 
 class CommentCreate(BaseModel):
@@ -84,6 +127,19 @@ class CommentOut(BaseModel):
         from_attributes = True
 
 
+class CommentNode(CommentOut):
+    replies: List["CommentNode"] = []
+
+
+CommentNode.update_forward_refs()
+
+
+class CommentTreeOut(BaseModel):
+    comments: List[CommentNode]
+    next_cursor: str | None = None
+    truncated: bool = False  # replies beyond max_replies were left out
+
+
 class ShoutOutWithReactionsAndComments(BaseModel):
     id: int
     message: str
@@ -92,8 +148,29 @@ class ShoutOutWithReactionsAndComments(BaseModel):
     recipients: List[UserOut]
     reactions: dict[str, int]  # {"like": 5, "clap": 3, "star": 2}
     user_reaction: str | None  # Current user's reaction if any
-    comments: List[CommentOut]
+    comment_count: int = 0
+    comments: List[CommentOut]  # latest comments, newest first (a preview when listed in the feed)
 
     class Config:
         from_attributes = True
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True
+
+
+class UserTotal(BaseModel):
+    user: UserOut
+    total: int
+
+
+class DepartmentVolume(BaseModel):
+    department: str | None
+    shoutouts: int
+
+
+class ReactionDay(BaseModel):
+    day: date
+    reactions: dict[str, int]
+
+
+class ReactionTotalsOut(BaseModel):
+    totals: dict[str, int]
+    daily: List[ReactionDay]
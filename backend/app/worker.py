@@ -0,0 +1,11 @@
+"""gunicorn worker class for the production launcher (see `gunicorn.conf.py`).
+
+Kept apart from the app so the gunicorn master can import it without
+importing the app (and creating an engine) before the workers fork.
+"""
+from uvicorn.workers import UvicornWorker
+
+
+class UvloopWorker(UvicornWorker):
+    # explicit rather than "auto", so a missing uvloop/httptools fails at boot instead of silently running slower
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
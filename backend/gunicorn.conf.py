@@ -0,0 +1,59 @@
+"""Production launcher: gunicorn managing uvicorn workers on uvloop and httptools.
+
+    alembic upgrade head && gunicorn app.main:app
+
+gunicorn reads this file from the working directory. Every worker is a
+separate process that imports the app after the fork, so each one has its
+own event loop, engine and connection pool (DB_POOL_SIZE + DB_MAX_OVERFLOW
+connections per worker: size them so that times WEB_CONCURRENCY stays under
+the server's max_connections). The schema is not touched here; run the
+migrations before starting.
+
+Environment:
+    WEB_CONCURRENCY   workers (default: one per CPU available to the process)
+    BIND              address to listen on (default 0.0.0.0:8000)
+    FORWARDED_ALLOW_IPS  proxies trusted for X-Forwarded-For (default 127.0.0.1)
+"""
+import os
+import sys
+
+
+def _cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # honours container cpusets
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+worker_class = "app.worker.UvloopWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY") or _cpus())
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+# the app is imported in each worker, never in the master: a pool or loop created before fork would be shared
+preload_app = False
+keepalive = 5
+timeout = 60
+graceful_timeout = 30
+# request logs come from the app (JSON, with timings); gunicorn only reports worker lifecycle
+accesslog = None
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+
+
+def on_starting(server):
+    # one password-hashing thread per worker: with a worker per core, more would only fight over the cores
+    if server.cfg.workers > 1:
+        os.environ.setdefault("KDF_POOL_SIZE", "1")
+
+
+def when_ready(server):
+    if server.cfg.workers > 1 and os.environ.get("REALTIME_BACKEND", "local") == "local":
+        server.log.warning(
+            "%d workers with REALTIME_BACKEND=local: live events only reach clients of the worker that "
+            "handled the write; set REALTIME_BACKEND=postgres", server.cfg.workers
+        )
+
+
+def post_fork(server, worker):
+    # with --preload the engine was created in the master; drop the inherited connections, keep the pool
+    if "app.database" in sys.modules:
+        sys.modules["app.database"].engine.sync_engine.dispose(close=False)
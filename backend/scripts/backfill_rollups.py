@@ -0,0 +1,46 @@
+"""Recompute the daily analytics rollups from shoutouts, recipients and reactions.
+
+The rollups are kept in step by triggers; run this once after migration 0008
+to fill in history, and again after bulk imports or manual data fixes. Days
+are rebuilt in batches of `--days-per-batch`, one transaction each, so no batch
+holds locks for long. Safe to run while the app is writing: each batch locks
+the rollup tables, so writes wait for it (and are counted exactly once).
+
+    python -m scripts.backfill_rollups --since 2024-01-01 --days-per-batch 7
+"""
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from app import crud, models
+from app.database import AsyncSessionLocal
+
+
+async def backfill(since, until, days_per_batch):
+    async with AsyncSessionLocal() as session:
+        if since is None:
+            first = (await session.execute(select(func.min(models.ShoutOut.created_at)))).scalar()
+            if first is None:
+                print("No shoutouts yet, nothing to backfill.")
+                return
+            since = first.astimezone(timezone.utc).date()
+        until = until or datetime.now(timezone.utc).date()
+
+        written = 0
+        day = since
+        while day <= until:
+            last = min(day + timedelta(days=days_per_batch - 1), until)
+            written += await crud.rebuild_rollups(session, day, last)
+            day = last + timedelta(days=1)
+    print(f"Rebuilt rollups for {since}..{until}: {written} rows written.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=date.fromisoformat, help="first day (UTC); default: the first shoutout")
+    parser.add_argument("--until", type=date.fromisoformat, help="last day (UTC); default: today")
+    parser.add_argument("--days-per-batch", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.since, args.until, args.days_per_batch))
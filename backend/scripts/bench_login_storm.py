@@ -0,0 +1,64 @@
+"""Feed latency during a login storm.
+
+Runs feed readers and login clients concurrently against a running backend
+and reports feed p50/p95/p99 and login throughput. Compare the KDF running
+inline on the event loop with the worker pool by restarting the server:
+
+    KDF_POOL_SIZE=0 uvicorn app.main:app --port 8000   # before
+    uvicorn app.main:app --port 8000                   # after
+    python -m scripts.bench_login_storm --duration 15 --logins 8
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from scripts.benchutil import PASSWORD, ensure_user, summarize
+
+
+async def feed_reader(client, headers, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        r = await client.get("/shoutouts", params={"limit": 20}, headers=headers)
+        if r.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(r.status_code)
+
+
+async def login_storm(client, email, deadline, counts):
+    while time.perf_counter() < deadline:
+        r = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+        counts[r.status_code] = counts.get(r.status_code, 0) + 1
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.readers + args.logins + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        token = await ensure_user(client, "bench-reader@example.com")
+        await ensure_user(client, "bench-storm@example.com")
+        headers = {"Authorization": f"Bearer {token}"}
+
+        latencies, errors, login_counts = [], [], {}
+        deadline = time.perf_counter() + args.duration
+        tasks = [feed_reader(client, headers, deadline, latencies, errors) for _ in range(args.readers)]
+        tasks += [login_storm(client, "bench-storm@example.com", deadline, login_counts) for _ in range(args.logins)]
+        await asyncio.gather(*tasks)
+
+        metrics = await client.get("/metrics")
+
+    print(f"feed requests: {len(latencies)} ok, {len(errors)} failed over {args.duration}s")
+    print(f"feed latency: {summarize(latencies)}")
+    print(f"logins: {login_counts} ({sum(login_counts.values()) / args.duration:.1f}/s)")
+    if metrics.status_code == 200:
+        print(f"kdf pool: {metrics.json().get('kdf_pool')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--logins", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
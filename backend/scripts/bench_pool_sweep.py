@@ -0,0 +1,60 @@
+"""Sweep connection pool sizes against the feed endpoint.
+
+For every pool size a fresh backend is started with DB_POOL_SIZE set (and no
+overflow, so the pool size is the real limit), hammered with concurrent
+`GET /shoutouts` clients, and its throughput, latency and pool wait reported.
+
+    python -m scripts.bench_pool_sweep --sizes 1 2 5 10 20 --clients 32
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from scripts.benchutil import ensure_user, serve, summarize
+
+
+async def hammer(base_url, clients, duration):
+    limits = httpx.Limits(max_connections=clients + 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        token = await ensure_user(client, "bench-reader@example.com")
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies, errors = [], 0
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                r = await client.get("/shoutouts", params={"limit": 50}, headers=headers)
+                if r.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        pool = (await client.get("/metrics")).json().get("db_pool", {})
+    return latencies, errors, pool
+
+
+def main(args):
+    for size in args.sizes:
+        env = {"DB_POOL_SIZE": str(size), "DB_MAX_OVERFLOW": "0", "DB_POOL_TIMEOUT": str(args.pool_timeout)}
+        with serve(args.port, env) as base_url:
+            latencies, errors, pool = asyncio.run(hammer(base_url, args.clients, args.duration))
+        print(
+            f"pool_size={size:<3} {len(latencies) / args.duration:7.1f} req/s  errors={errors:<4} "
+            f"{summarize(latencies)}  pool_wait_max={pool.get('wait_seconds_max', 0) * 1000:.1f}ms "
+            f"timeouts={pool.get('timeouts', 0)}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 5, 10, 20])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--pool-timeout", type=float, default=30.0)
+    parser.add_argument("--port", type=int, default=8010)
+    main(parser.parse_args())
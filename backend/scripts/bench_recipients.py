@@ -0,0 +1,60 @@
+"""Latency of POST /shoutouts by number of tagged recipients.
+
+Creates the recipient users directly in the database (one executemany) if
+they are missing, then posts shoutouts tagging 1, 50 and 1000 of them
+against a running backend.
+
+    python -m scripts.bench_recipients --counts 1 50 1000 --repeat 20
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import insert, select
+
+from app import models
+from app.core import security
+from app.database import AsyncSessionLocal
+from scripts.benchutil import PASSWORD, ensure_user, summarize
+
+
+async def ensure_recipients(n):
+    emails = [f"bench-recipient-{i}@example.com" for i in range(n)]
+    async with AsyncSessionLocal() as session:
+        existing = set((await session.execute(select(models.User.email).where(models.User.email.in_(emails)))).scalars())
+        missing = [e for e in emails if e not in existing]
+        if missing:
+            pw = security.get_password_hash(PASSWORD)
+            await session.execute(
+                insert(models.User),
+                [{"email": e, "name": e.split("@")[0], "password_hash": pw, "department": "Bench"} for e in missing],
+            )
+            await session.commit()
+        result = await session.execute(select(models.User.id).where(models.User.email.in_(emails)))
+        return list(result.scalars())
+
+
+async def main(args):
+    ids = await ensure_recipients(max(args.counts))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        token = await ensure_user(client, "bench-author@example.com")
+        headers = {"Authorization": f"Bearer {token}"}
+        for n in args.counts:
+            latencies = []
+            for i in range(args.repeat):
+                start = time.perf_counter()
+                r = await client.post(
+                    "/shoutouts", json={"message": f"bench {n} #{i}", "recipient_ids": ids[:n]}, headers=headers
+                )
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            print(f"recipients={n:<5} {summarize(latencies)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 50, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
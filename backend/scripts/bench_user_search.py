@@ -0,0 +1,81 @@
+"""Latency of GET /users/search (recipient typeahead) against GET /users.
+
+Run against a database with a realistic directory, e.g. 100k users from
+`scripts.generate_data`. Prefixes are taken from existing names and emails,
+from one letter (thousands of matches) to a nearly unique one:
+
+    python -m scripts.bench_user_search --repeat 50
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import func, select
+
+from app import models
+from app.database import AsyncSessionLocal
+from scripts.benchutil import ensure_user, summarize
+
+
+async def sample_user():
+    async with AsyncSessionLocal() as session:
+        count = (await session.execute(select(func.count()).select_from(models.User))).scalar()
+        row = (await session.execute(
+            select(models.User.name, models.User.email)
+            .where(models.User.name.is_not(None))
+            .order_by(models.User.id)
+            .offset(count // 2)
+            .limit(1)
+        )).one()
+        return count, row.name, row.email
+
+
+async def timed(client, url, params, headers, repeat, next_page=True):
+    first, second = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        r = await client.get(url, params=params, headers=headers)
+        r.raise_for_status()
+        first.append(time.perf_counter() - start)
+        cursor = r.headers.get("X-Next-Cursor")
+        if next_page and cursor:
+            start = time.perf_counter()
+            (await client.get(url, params={**params, "cursor": cursor}, headers=headers)).raise_for_status()
+            second.append(time.perf_counter() - start)
+    return first, second, len(r.json())
+
+
+async def main(args):
+    count, name, email = await sample_user()
+    cases = [
+        ("1 letter", {"q": name[:1]}),
+        ("3 letters", {"q": name[:3]}),
+        ("full first name", {"q": name.split()[0]}),
+        ("full name", {"q": name}),
+        ("email prefix", {"q": email.split("@")[0][:-2]}),
+        ("no match", {"q": "zzzq"}),
+    ]
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        token = await ensure_user(client, "bench-directory@example.com")
+        headers = {"Authorization": f"Bearer {token}"}
+        print(f"{count} users; sample user {name!r} <{email}>")
+        for label, params in cases:
+            first, second, rows = await timed(
+                client, "/users/search", {**params, "limit": args.limit}, headers, args.repeat
+            )
+            print(f"{label:<16} q={params['q']!r:<24} {rows:>3} rows  first page: {summarize(first)}")
+            if second:
+                print(f"{'':<46}  next page:  {summarize(second)}")
+        if args.compare_list:
+            full, _, rows = await timed(client, "/users", {}, headers, max(1, args.repeat // 10), next_page=False)
+            print(f"GET /users (everyone, {rows} rows): {summarize(full)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--compare-list", action="store_true", help="also time the full GET /users listing")
+    asyncio.run(main(parser.parse_args()))
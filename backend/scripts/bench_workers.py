@@ -0,0 +1,73 @@
+"""Throughput of the production launcher at 1, 2, 4 and 8 workers.
+
+For every worker count a fresh gunicorn (`gunicorn.conf.py`, uvicorn workers
+on uvloop) is started and driven with the `scripts.loadtest` traffic mix.
+The connection budget is split between the workers (each has its own pool),
+so every run uses the same number of Postgres connections. The load comes
+from `--processes` generator processes so the client is not the bottleneck;
+run it on a machine with cores to spare for them.
+
+    python -m scripts.bench_workers --workers 1 2 4 8 --users 64 --duration 30
+"""
+import argparse
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.benchutil import serve
+from scripts.loadtest import DEFAULT_MIX, Stats, mix_entry, run
+
+
+def _generate(base_url, users, duration, mix, seed, first_user):
+    return asyncio.run(run(base_url, users, duration, mix, seed=seed, first_user=first_user))
+
+
+def load(base_url, args, mix):
+    """Run the mix from `args.processes` processes at once; returns the merged stats and the longest run."""
+    share = max(1, args.users // args.processes)
+    with ProcessPoolExecutor(args.processes) as pool:
+        futures = [
+            pool.submit(_generate, base_url, share, args.duration, mix, args.seed + p, p * share)
+            for p in range(args.processes)
+        ]
+        results = [f.result() for f in futures]
+    stats = Stats()
+    for part, _ in results:
+        stats.merge(part)
+    return stats, max(elapsed for _, elapsed in results)
+
+
+def main(args):
+    mix = dict(args.mix) if args.mix else DEFAULT_MIX
+    print(f"{os.cpu_count()} CPUs, {args.users} users, mix {mix}")
+    baseline = None
+    for workers in args.workers:
+        env = {
+            "DB_POOL_SIZE": str(max(1, args.connections // workers)),
+            "DB_MAX_OVERFLOW": "0",
+            "REALTIME_BACKEND": "postgres" if workers > 1 else "local",
+            "LOG_LEVEL": "WARNING",
+        }
+        with serve(args.port, env, workers=workers) as base_url:
+            stats, elapsed = load(base_url, args, mix)
+        total = sum(len(samples) for samples in stats.latencies.values())
+        throughput = total / elapsed
+        baseline = baseline or throughput
+        print(f"\n== {workers} worker(s), pool {env['DB_POOL_SIZE']} each: "
+              f"{throughput:.1f} req/s ({throughput / baseline:.2f}x)")
+        stats.report(elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--users", type=int, default=64, help="virtual users, split between the processes")
+    parser.add_argument("--processes", type=int, default=4, help="load generator processes")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--connections", type=int, default=40, help="database connections shared by all workers")
+    parser.add_argument(
+        "--mix", nargs="*", type=mix_entry, help="action weights, e.g. feed=60 react=20 comment=10 post=5 login=5"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8011)
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+"""Helpers shared by the benchmark scripts."""
+import contextlib
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+PASSWORD = "bench-password"
+
+# words for synthetic messages, most common first
+VOCABULARY = (
+    "great work team launch thanks help release customer support review design fix shipped "
+    "demo feedback sprint project deadline mentor quality effort idea bug incident report "
+    "migration onboarding docs testing deploy rollback metrics dashboard roadmap hiring "
+    "interview pairing refactor security audit latency cache database query index backup "
+    "outage pager weekend holiday presentation workshop training budget contract vendor "
+    "partner sales marketing campaign newsletter survey analytics pipeline model experiment "
+    "prototype accessibility translation localization payroll benefits office relocation "
+    "hackathon coffee lunch celebration anniversary promotion award kudos milestone"
+).split()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(seconds) -> str:
+    """One-line p50/p95/p99/mean summary of latencies given in seconds."""
+    ms = [x * 1000 for x in seconds]
+    if not ms:
+        return "no samples"
+    return (
+        f"p50={percentile(ms, 50):.1f}ms p95={percentile(ms, 95):.1f}ms "
+        f"p99={percentile(ms, 99):.1f}ms mean={statistics.mean(ms):.1f}ms"
+    )
+
+
+async def ensure_user(client, email, department=None):
+    """Register `email` if needed and return its access token."""
+    await client.post(
+        "/auth/register",
+        json={"email": email, "password": PASSWORD, "name": email.split("@")[0], "department": department},
+    )
+    r = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    r.raise_for_status()
+    return r.json()["access_token"]
+
+
+@contextlib.contextmanager
+def serve(port, env=None, args=(), workers=None):
+    """Run the backend in a subprocess for the duration of the block (rate limits off unless `env` says otherwise).
+
+    A single uvicorn process by default; with `workers`, the production launcher
+    (gunicorn with `gunicorn.conf.py`) running that many workers.
+    """
+    if workers is None:
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning", *args]
+    else:
+        cmd = [
+            sys.executable, "-m", "gunicorn", "app.main:app", "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers), "--log-level", "warning", *args,
+        ]
+    proc = subprocess.Popen(cmd, env={"RATE_LIMIT_ENABLED": "false", **os.environ, **(env or {})})
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.time() > deadline or proc.poll() is not None:
+                raise RuntimeError(f"backend on port {port} did not start")
+            time.sleep(0.2)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
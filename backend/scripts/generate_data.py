@@ -0,0 +1,240 @@
+"""Bulk synthetic data for performance work: users, shoutouts, recipients,
+reactions and comments with skewed, roughly realistic distributions.
+
+- departments have Zipf-like sizes; a few users post most of the shoutouts
+- most shoutouts tag 1-3 people, mostly from the author's own department
+- reactions and comments cluster on a minority of popular shoutouts;
+  about one comment in five is a reply
+- shoutouts are spread over the last `--days` days, ids in time order
+
+Rows go in with COPY (or `--method executemany`, for comparison) in batches
+of `--batch-size` shoutouts. The script assigns ids itself, so nothing else
+may write to the database while it runs. Generated users log in with
+`scripts.benchutil.PASSWORD`; their emails start with `--prefix`.
+
+Triggers (counters, rollups, foreign keys) are switched off for the load
+when the database user may do so (`session_replication_role`): the reaction
+counters are written directly and the rollups rebuilt at the end.
+
+    python -m scripts.generate_data --users 100000 --shoutouts 10000000
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+
+from app.core import security
+from app.database import settings
+from scripts.benchutil import PASSWORD, VOCABULARY
+from scripts.backfill_rollups import backfill
+
+REACTION_TYPES = ("like", "clap", "star")
+REACTION_WEIGHTS = (60, 25, 15)
+
+COLUMNS = {
+    "users": ("id", "email", "name", "password_hash", "department", "role", "joined_at"),
+    "shoutouts": ("id", "author_id", "message", "created_at", "like_count", "clap_count", "star_count"),
+    "shoutout_recipients": ("shoutout_id", "user_id"),
+    "reactions": ("shoutout_id", "user_id", "reaction_type", "created_at"),
+    "comments": ("id", "shoutout_id", "user_id", "parent_id", "content", "created_at"),
+}
+
+
+def geometric(rng, mean):
+    """0, 1, 2, ... with the given mean."""
+    p = 1 / (mean + 1)
+    n = 0
+    while rng.random() > p:
+        n += 1
+    return n
+
+
+def some_time_after(rng, moment, now):
+    """Reactions and comments arrive within hours of the shoutout, rarely days."""
+    return min(moment + timedelta(minutes=rng.expovariate(1 / 600)), now)
+
+
+def message(rng, words):
+    n = rng.randint(6, 24)
+    # squaring skews towards the start of the vocabulary, like real word frequencies
+    return " ".join(words[int(rng.random() ** 2 * len(words))] for _ in range(n))
+
+
+class Population:
+    """Users with their departments and a heavy-tailed posting activity."""
+
+    def __init__(self, rng, user_ids, departments):
+        self.rng = rng
+        self.user_ids = user_ids
+        self.department_of = {}
+        self.members = {d: [] for d in departments}
+        dept_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(departments))))
+        for uid in user_ids:
+            d = departments[bisect.bisect(dept_weights, rng.random() * dept_weights[-1])]
+            self.department_of[uid] = d
+            self.members[d].append(uid)
+        self.members = {d: m for d, m in self.members.items() if m}
+        # Pareto activity: ~20% of users write most shoutouts
+        self.activity = list(itertools.accumulate(rng.paretovariate(1.2) for _ in user_ids))
+
+    def author(self):
+        return self.user_ids[bisect.bisect(self.activity, self.rng.random() * self.activity[-1])]
+
+    def someone(self):
+        return self.rng.choice(self.user_ids)
+
+    def colleague(self, user_id):
+        return self.rng.choice(self.members[self.department_of[user_id]])
+
+
+async def insert_rows(conn, table, rows, method):
+    if not rows:
+        return
+    columns = COLUMNS[table]
+    if method == "copy":
+        await conn.copy_records_to_table(table, records=rows, columns=columns)
+    else:
+        placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+        await conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+
+async def next_id(conn, table):
+    return (await conn.fetchval(f"SELECT coalesce(max(id), 0) FROM {table}")) + 1
+
+
+async def sync_sequence(conn, table):
+    await conn.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 1) FROM {table}))"
+    )
+
+
+async def generate_users(conn, args, rng):
+    first = await next_id(conn, "users")
+    password_hash = security.get_password_hash(PASSWORD)
+    departments = [f"Dept{i:02d}" for i in range(args.departments)]
+    now = datetime.now(timezone.utc)
+    ids = list(range(first, first + args.users))
+    population = Population(rng, ids, departments)
+    for start in range(0, args.users, args.batch_size):
+        rows = [
+            (
+                uid, f"{args.prefix}{uid}@example.com", f"{args.prefix}{uid}", password_hash,
+                population.department_of[uid], "employee", now - timedelta(days=args.days + rng.randint(0, 365)),
+            )
+            for uid in ids[start:start + args.batch_size]
+        ]
+        await insert_rows(conn, "users", rows, args.method)
+    await sync_sequence(conn, "users")
+    return population
+
+
+async def generate_shoutouts(conn, args, rng, population, counters_in_rows):
+    shoutout_id = await next_id(conn, "shoutouts")
+    comment_id = await next_id(conn, "comments")
+    now = datetime.now(timezone.utc)
+    start_time = now - timedelta(days=args.days)
+    step = timedelta(days=args.days) / max(args.shoutouts, 1)
+    totals = dict.fromkeys(COLUMNS, 0)
+
+    for batch_start in range(0, args.shoutouts, args.batch_size):
+        batch = {table: [] for table in COLUMNS if table != "users"}
+        for i in range(batch_start, min(batch_start + args.batch_size, args.shoutouts)):
+            author = population.author()
+            created = start_time + step * i
+
+            recipients = {
+                population.colleague(author) if rng.random() < 0.7 else population.someone()
+                for _ in range(1 + geometric(rng, args.recipients_mean - 1))
+            } - {author}
+            batch["shoutout_recipients"] += [(shoutout_id, uid) for uid in recipients]
+
+            # popularity: most shoutouts get a little, a few get a lot
+            popularity = rng.paretovariate(1.5)
+            reactors = {population.someone() for _ in range(int(geometric(rng, args.reactions_mean) * popularity / 3))}
+            counts = dict.fromkeys(REACTION_TYPES, 0)
+            for uid in reactors:
+                kind = rng.choices(REACTION_TYPES, REACTION_WEIGHTS)[0]
+                counts[kind] += 1
+                batch["reactions"].append((shoutout_id, uid, kind, some_time_after(rng, created, now)))
+
+            thread = []
+            for _ in range(int(geometric(rng, args.comments_mean) * popularity / 3)):
+                parent = rng.choice(thread) if thread and rng.random() < 0.2 else None
+                commenter = population.colleague(author) if rng.random() < 0.5 else population.someone()
+                content = message(rng, VOCABULARY)
+                batch["comments"].append(
+                    (comment_id, shoutout_id, commenter, parent, content, some_time_after(rng, created, now))
+                )
+                thread.append(comment_id)
+                comment_id += 1
+
+            if not counters_in_rows:
+                counts = dict.fromkeys(REACTION_TYPES, 0)  # the trigger counts them
+            batch["shoutouts"].append(
+                (shoutout_id, author, message(rng, VOCABULARY), created, counts["like"], counts["clap"], counts["star"])
+            )
+            shoutout_id += 1
+
+        # comments are inserted in id order, so a reply's parent always exists first
+        for table in ("shoutouts", "shoutout_recipients", "reactions", "comments"):
+            await insert_rows(conn, table, batch[table], args.method)
+            totals[table] += len(batch[table])
+        yield totals
+
+    await sync_sequence(conn, "shoutouts")
+    await sync_sequence(conn, "comments")
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    dsn = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+    conn = await asyncpg.connect(dsn)
+    try:
+        try:
+            await conn.execute("SET session_replication_role = replica")
+            triggers_off = True
+        except asyncpg.InsufficientPrivilegeError:
+            print("Cannot switch triggers off (needs superuser); loading with triggers on, which is slower.")
+            triggers_off = False
+
+        started = time.perf_counter()
+        population = await generate_users(conn, args, rng)
+        print(f"users: {args.users} in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        async for totals in generate_shoutouts(conn, args, rng, population, counters_in_rows=triggers_off):
+            elapsed = time.perf_counter() - started
+            rows = sum(totals.values())
+            print(
+                f"shoutouts: {totals['shoutouts']}/{args.shoutouts}  recipients: {totals['shoutout_recipients']}  "
+                f"reactions: {totals['reactions']}  comments: {totals['comments']}  "
+                f"({elapsed:.0f}s, {rows / elapsed:,.0f} rows/s)"
+            )
+        await conn.execute("ANALYZE")
+    finally:
+        await conn.close()
+
+    if triggers_off and args.shoutouts:
+        now = datetime.now(timezone.utc)
+        await backfill((now - timedelta(days=args.days)).date(), now.date(), days_per_batch=30)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--shoutouts", type=int, default=10_000_000)
+    parser.add_argument("--departments", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365, help="spread shoutouts over this many days")
+    parser.add_argument("--recipients-mean", type=float, default=1.8)
+    parser.add_argument("--reactions-mean", type=float, default=4)
+    parser.add_argument("--comments-mean", type=float, default=1.5)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--method", choices=("copy", "executemany"), default="copy")
+    parser.add_argument("--prefix", default="gen-", help="email prefix of the generated users")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,174 @@
+"""Mixed-traffic load test against a running backend.
+
+Each virtual user logs in once and then loops over a weighted mix of
+actions until `--duration` runs out:
+
+    feed     GET /shoutouts/feed
+    list     GET /shoutouts
+    react    POST /shoutouts/{id}/reactions on a shoutout seen in the feed
+    comment  POST /shoutouts/{id}/comments on a shoutout seen in the feed
+    post     POST /shoutouts tagging someone seen in the feed
+    login    POST /auth/login (a fresh token, as clients do on expiry)
+
+Reports requests, errors, throughput and p50/p95/p99 per action and in total.
+Point it at a database filled by `scripts.generate_data` for realistic feeds,
+and start that backend with RATE_LIMIT_ENABLED=false (every virtual user
+comes from one address, so logins and writes would otherwise hit 429):
+
+    python -m scripts.loadtest --users 50 --duration 60 --mix feed=60 react=20 comment=10 post=5 login=5
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from scripts.benchutil import PASSWORD, ensure_user, summarize
+
+DEFAULT_MIX = {"feed": 60, "list": 10, "react": 15, "comment": 8, "post": 4, "login": 3}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, action, seconds, ok):
+        if ok:
+            self.latencies.setdefault(action, []).append(seconds)
+        else:
+            self.errors[action] = self.errors.get(action, 0) + 1
+
+    def merge(self, other):
+        for action, samples in other.latencies.items():
+            self.latencies.setdefault(action, []).extend(samples)
+        for action, count in other.errors.items():
+            self.errors[action] = self.errors.get(action, 0) + count
+
+    def report(self, duration):
+        print(f"{'action':<8} {'ok':>7} {'errors':>6} {'req/s':>7}  latency")
+        everything = []
+        for action in sorted(set(self.latencies) | set(self.errors)):
+            samples = self.latencies.get(action, [])
+            everything += samples
+            print(
+                f"{action:<8} {len(samples):>7} {self.errors.get(action, 0):>6} "
+                f"{len(samples) / duration:>7.1f}  {summarize(samples)}"
+            )
+        print(
+            f"{'total':<8} {len(everything):>7} {sum(self.errors.values()):>6} "
+            f"{len(everything) / duration:>7.1f}  {summarize(everything)}"
+        )
+
+
+class VirtualUser:
+    def __init__(self, client, email, rng, stats):
+        self.client = client
+        self.email = email
+        self.rng = rng
+        self.stats = stats
+        self.headers = {}
+        self.shoutout_ids = []
+        self.user_ids = []
+
+    async def timed(self, action, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            r = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.TransportError:
+            self.stats.record(action, time.perf_counter() - start, ok=False)
+            return None
+        ok = r.status_code < 400
+        self.stats.record(action, time.perf_counter() - start, ok)
+        return r if ok else None
+
+    async def login(self):
+        r = await self.timed("login", "POST", "/auth/login", data={"username": self.email, "password": PASSWORD})
+        if r is not None:
+            self.headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    async def feed(self):
+        r = await self.timed("feed", "GET", "/shoutouts/feed", params={"limit": 20})
+        if r is not None and r.json():
+            page = r.json()
+            self.shoutout_ids = [s["id"] for s in page]
+            self.user_ids = list({s["author"]["id"] for s in page})
+
+    async def list(self):
+        await self.timed("list", "GET", "/shoutouts", params={"limit": 20})
+
+    async def react(self):
+        if not self.shoutout_ids:
+            return await self.feed()
+        shoutout_id = self.rng.choice(self.shoutout_ids)
+        kind = self.rng.choice(("like", "clap", "star"))
+        await self.timed("react", "POST", f"/shoutouts/{shoutout_id}/reactions", json={"reaction_type": kind})
+
+    async def comment(self):
+        if not self.shoutout_ids:
+            return await self.feed()
+        shoutout_id = self.rng.choice(self.shoutout_ids)
+        await self.timed(
+            "comment", "POST", f"/shoutouts/{shoutout_id}/comments", json={"content": "nice one, load test"}
+        )
+
+    async def post(self):
+        recipients = self.rng.sample(self.user_ids, min(len(self.user_ids), 2))
+        payload = {"message": "thanks for the help, load test", "recipient_ids": recipients}
+        await self.timed("post", "POST", "/shoutouts", json=payload)
+
+    async def run(self, mix, deadline, think):
+        actions, weights = zip(*mix.items())
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(actions, weights)[0])()
+            if think:
+                await asyncio.sleep(self.rng.expovariate(1 / think))
+
+
+def mix_entry(item):
+    action, _, weight = item.partition("=")
+    if action not in DEFAULT_MIX or not weight.isdigit():
+        raise argparse.ArgumentTypeError(f"use e.g. feed=60, with one of {', '.join(DEFAULT_MIX)}")
+    return action, int(weight)
+
+
+async def run(base_url, users, duration, mix=DEFAULT_MIX, think=0.0, seed=1, first_user=0):
+    """Log in `users` virtual users, then run `mix` for `duration` seconds. Returns (stats, elapsed)."""
+    stats = Stats()
+    limits = httpx.Limits(max_connections=users + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        virtual_users = []
+        for i in range(first_user, first_user + users):
+            email = f"loadtest-{i}@example.com"
+            user = VirtualUser(client, email, random.Random(seed + i), stats)
+            user.headers = {"Authorization": f"Bearer {await ensure_user(client, email, department=f'Load{i % 5}')}"}
+            await user.feed()
+            virtual_users.append(user)
+        stats = Stats()  # leave the warm-up out of the numbers
+        for user in virtual_users:
+            user.stats = stats
+
+        started = time.perf_counter()
+        await asyncio.gather(*(u.run(mix, started + duration, think) for u in virtual_users))
+        return stats, time.perf_counter() - started
+
+
+async def main(args):
+    mix = dict(args.mix) if args.mix else DEFAULT_MIX
+    stats, elapsed = await run(args.base_url, args.users, args.duration, mix, args.think, args.seed)
+    print(f"{args.users} users for {elapsed:.1f}s, mix {mix}")
+    stats.report(elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between actions, in seconds")
+    parser.add_argument(
+        "--mix", nargs="*", type=mix_entry, help="action weights, e.g. feed=60 react=20 comment=10 post=5 login=5"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,32 @@
+"""Rebuild the per-type reaction counters on shoutouts from the reactions table.
+
+The counters are kept in step by a trigger; run this after bulk imports or
+manual data fixes. Works through the table in primary-key batches, each one
+a transaction that locks its `--batch-size` shoutout rows before counting,
+so it can run beside live traffic: reactions on a batch being reconciled
+wait for it (one batch's worth of time) instead of being lost.
+
+    python -m scripts.reconcile_reaction_counts --batch-size 10000
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import func, select
+
+from app import crud, models
+from app.database import AsyncSessionLocal
+
+
+async def reconcile(batch_size):
+    async with AsyncSessionLocal() as session:
+        max_id = (await session.execute(select(func.max(models.ShoutOut.id)))).scalar() or 0
+        fixed = 0
+        for start in range(0, max_id + 1, batch_size):
+            fixed += await crud.reconcile_reaction_counts(session, start, start + batch_size)
+    print(f"Reconciled reaction counters up to shoutout {max_id}: {fixed} shoutouts corrected.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    asyncio.run(reconcile(parser.parse_args().batch_size))
@@ -5,7 +5,7 @@ import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.database import AsyncSessionLocal, engine, Base
+from app.database import AsyncSessionLocal
 from app import models
 from app.core import security
 
@@ -22,10 +22,7 @@ SAMPLE_USERS = [
 
 
 async def seed():
-    # ensure tables exist
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
+    # the tables come from `alembic upgrade head`
     async with AsyncSessionLocal() as session:  # type: AsyncSession
         # insert users if they don't exist
         for u in SAMPLE_USERS:
@@ -0,0 +1,84 @@
+import uuid
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+
+from app.core import ratelimit
+from app.main import app
+from app.database import engine
+
+
+class StatementCounter:
+    """Count SQL statements sent to the database while the block runs.
+
+    `round_trips` adds the BEGIN and COMMIT/ROLLBACK each transaction costs.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.transaction_events = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _on_begin(self, conn):
+        self.transaction_events.append("BEGIN")
+
+    def _on_commit(self, conn):
+        self.transaction_events.append("COMMIT")
+
+    def _on_rollback(self, conn):
+        self.transaction_events.append("ROLLBACK")
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def round_trips(self):
+        return len(self.statements) + len(self.transaction_events)
+
+    def __enter__(self):
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine.sync_engine, "begin", self._on_begin)
+        event.listen(engine.sync_engine, "commit", self._on_commit)
+        event.listen(engine.sync_engine, "rollback", self._on_rollback)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine.sync_engine, "before_cursor_execute", self._on_execute)
+        event.remove(engine.sync_engine, "begin", self._on_begin)
+        event.remove(engine.sync_engine, "commit", self._on_commit)
+        event.remove(engine.sync_engine, "rollback", self._on_rollback)
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limits(monkeypatch):
+    # every test client comes from one address and registers users freely; tests of the limiter install their own
+    monkeypatch.setattr(ratelimit.limiter, "enabled", False)
+
+
+@pytest_asyncio.fixture
+async def client():
+    # in-process client; the database schema must already exist (alembic upgrade head)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+    # connections are bound to the per-test event loop
+    await engine.dispose()
+
+
+async def register_and_login(client, department="Engineering"):
+    email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+    r = await client.post(
+        "/auth/register",
+        json={"email": email, "password": "secret", "name": email.split("@")[0], "department": department},
+    )
+    assert r.status_code == 200, r.text
+    user = r.json()
+    r = await client.post("/auth/login", data={"username": email, "password": "secret"})
+    assert r.status_code == 200, r.text
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    return user, headers
@@ -0,0 +1,99 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app import crud, models
+from app.database import AsyncSessionLocal
+from conftest import register_and_login
+
+
+async def make_admin(user_id):
+    async with AsyncSessionLocal() as session:
+        user = await session.get(models.User, user_id)
+        user.role = models.RoleEnum.admin
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_analytics_require_admin(client):
+    _, headers = await register_and_login(client)
+    r = await client.get("/admin/analytics/top-senders", headers=headers)
+    assert r.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_rollups_follow_writes_and_match_a_rebuild(client):
+    department = f"Analytics-{uuid.uuid4().hex[:8]}"
+    admin, admin_headers = await register_and_login(client)
+    await make_admin(admin["id"])
+    sender, sender_headers = await register_and_login(client, department=department)
+    other, other_headers = await register_and_login(client, department=department)
+    recipient, _ = await register_and_login(client, department=department)
+
+    ids = []
+    for headers in (sender_headers, sender_headers, other_headers):
+        r = await client.post(
+            "/shoutouts", json={"message": "rollup", "recipient_ids": [recipient["id"]]}, headers=headers
+        )
+        ids.append(r.json()["id"])
+
+    async def snapshot():
+        params = {"department": department, "days": 1}
+        senders = await client.get("/admin/analytics/top-senders", params=params, headers=admin_headers)
+        recipients = await client.get("/admin/analytics/top-recipients", params=params, headers=admin_headers)
+        departments = await client.get("/admin/analytics/departments", params={"days": 1}, headers=admin_headers)
+        reactions = await client.get("/admin/analytics/reactions", params={"days": 1}, headers=admin_headers)
+        return (
+            [(row["user"]["id"], row["total"]) for row in senders.json()],
+            [(row["user"]["id"], row["total"]) for row in recipients.json()],
+            {row["department"]: row["shoutouts"] for row in departments.json()}.get(department),
+            reactions.json()["totals"],
+        )
+
+    reactions_before = (await snapshot())[3]
+    await client.post(f"/shoutouts/{ids[0]}/reactions", json={"reaction_type": "like"}, headers=other_headers)
+    await client.post(f"/shoutouts/{ids[1]}/reactions", json={"reaction_type": "like"}, headers=other_headers)
+    await client.post(f"/shoutouts/{ids[1]}/reactions", json={"reaction_type": "star"}, headers=other_headers)
+
+    senders, recipients, volume, reactions = await snapshot()
+    assert senders == [(sender["id"], 2), (other["id"], 1)]
+    assert recipients == [(recipient["id"], 3)]
+    assert volume == 3
+    assert reactions.get("like", 0) == reactions_before.get("like", 0) + 1
+    assert reactions.get("star", 0) == reactions_before.get("star", 0) + 1
+
+    # the backfill recomputes exactly what the triggers maintained
+    today = datetime.now(timezone.utc).date()
+    async with AsyncSessionLocal() as session:
+        await crud.rebuild_rollups(session, today, today)
+    assert await snapshot() == (senders, recipients, volume, reactions)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_waits_for_writers_and_counts_them_once(client):
+    department = f"Rebuild-{uuid.uuid4().hex[:8]}"
+    author, headers = await register_and_login(client, department=department)
+    await make_admin(author["id"])
+    today = datetime.now(timezone.utc).date()
+
+    async def sent():
+        params = {"department": department, "days": 1}
+        r = await client.get("/admin/analytics/top-senders", params=params, headers=headers)
+        return [(row["user"]["id"], row["total"]) for row in r.json()]
+
+    # a write in flight: its triggers have written (today, author) but it has not committed
+    async with AsyncSessionLocal() as writer:
+        await crud.create_shoutout(writer, author_id=author["id"], message="in flight", commit=False)
+
+        async def rebuild():
+            async with AsyncSessionLocal() as session:
+                await crud.rebuild_rollups(session, today, today)
+
+        task = asyncio.create_task(rebuild())
+        await asyncio.sleep(0.5)
+        assert not task.done()  # waiting for the writer's lock on the rollups
+        await writer.commit()
+    await task
+    assert await sent() == [(author["id"], 1)]
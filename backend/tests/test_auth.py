@@ -1,5 +1,10 @@
 import httpx
 import pytest
+from sqlalchemy import select
+
+from app import models
+from app.database import AsyncSessionLocal
+from conftest import StatementCounter, register_and_login
 
 
 def test_register_and_login():
@@ -22,3 +27,45 @@ def test_register_and_login():
     assert r3.status_code == 200
     tok2 = r3.json()
     assert "access_token" in tok2 and "refresh_token" in tok2
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation_and_reuse(client):
+    user, _ = await register_and_login(client)
+    r = await client.post("/auth/login", data={"username": user["email"], "password": "secret"})
+    old = r.json()["refresh_token"]
+
+    with StatementCounter() as counter:
+        r = await client.post("/auth/refresh", json={"refresh_token": old})
+    assert r.status_code == 200, r.text
+    # token lookup, user, revoke + insert -- independent of how many sessions exist
+    assert counter.count <= 6
+
+    # the rotated token is revoked, a tampered verifier never matches
+    r = await client.post("/auth/refresh", json={"refresh_token": old})
+    assert r.status_code == 401
+    selector, _, verifier = old.partition(".")
+    r = await client.post("/auth/refresh", json={"refresh_token": f"{selector}.{verifier[::-1]}"})
+    assert r.status_code == 401
+    r = await client.post("/auth/refresh", json={"refresh_token": "no-selector"})
+    assert r.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached_and_invalidated_on_update(client):
+    user, headers = await register_and_login(client, department="Sales")
+    r = await client.get("/auth/users/me", headers=headers)
+    assert r.json()["department"] == "Sales"
+
+    with StatementCounter() as counter:
+        r = await client.get("/auth/users/me", headers=headers)
+    assert r.status_code == 200
+    assert counter.count == 0
+
+    async with AsyncSessionLocal() as session:
+        db_user = (await session.execute(select(models.User).where(models.User.id == user["id"]))).scalar_one()
+        db_user.department = "HR"
+        await session.commit()
+
+    r = await client.get("/auth/users/me", headers=headers)
+    assert r.json()["department"] == "HR"
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+import queue
+import re
+
+import httpx
+import pytest
+
+from app.core import logs
+from app.core.instrumentation import InstrumentationMiddleware, current_request, RequestStats
+from app import main
+from app.main import app
+from conftest import StatementCounter, register_and_login
+
+
+def sample(text, name, **labels):
+    wanted = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+    match = re.search(rf"^{name}{re.escape(wanted)} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else None
+
+
+@pytest.mark.asyncio
+async def test_prometheus_endpoint_reports_per_route_latency_and_db_work(client):
+    _, headers = await register_and_login(client)
+    sid = (await client.post("/shoutouts", json={"message": "timed"}, headers=headers)).json()["id"]
+
+    before = (await client.get("/metrics/prometheus")).text
+    count_before = sample(
+        before, "bragboard_http_requests_total", method="GET", route="/shoutouts/{shoutout_id}/comments", status=200
+    ) or 0
+    for _ in range(3):
+        assert (await client.get(f"/shoutouts/{sid}/comments", headers=headers)).status_code == 200
+    await client.get("/no/such/route")
+
+    r = await client.get("/metrics/prometheus")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    route = {"method": "GET", "route": "/shoutouts/{shoutout_id}/comments"}
+    assert sample(text, "bragboard_http_requests_total", **route, status=200) == count_before + 3
+    # raw paths never become labels
+    assert f"/shoutouts/{sid}/comments" not in text
+    assert sample(text, "bragboard_http_requests_total", method="GET", route="<unmatched>", status=404) >= 1
+    # every call authenticates and loads comments: at least one statement and some database time each
+    assert sample(text, "bragboard_http_request_db_statements_bucket", **route, le="0.0") == 0
+    assert sample(text, "bragboard_http_request_db_seconds_sum", **route) > 0
+    assert sample(text, "bragboard_http_request_duration_seconds_bucket", **route, le="+Inf") == count_before + 3
+    assert sample(text, "bragboard_http_requests_in_flight") == 1  # this scrape
+    assert sample(text, "bragboard_db_pool_size") is not None
+
+
+@pytest.mark.asyncio
+async def test_profile_header_returns_a_profile_when_enabled(client):
+    pytest.importorskip("pyinstrument")
+    _, headers = await register_and_login(client)
+    transport = httpx.ASGITransport(app=InstrumentationMiddleware(app, profiling=True))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as profiled:
+        r = await profiled.get("/shoutouts", headers={**headers, "X-Profile": "1"})
+        assert r.status_code == 200
+        assert r.headers["x-profiled-status"] == "200"
+        assert r.headers["content-type"].startswith("text/plain")
+        assert "list_shoutouts" in r.text
+
+        r = await profiled.get("/shoutouts", headers=headers)
+        assert isinstance(r.json(), list)
+
+    # off by default: the header is ignored
+    r = await client.get("/shoutouts", headers={**headers, "X-Profile": "1"})
+    assert isinstance(r.json(), list)
+
+
+def test_log_records_are_json_with_extras_and_request_context():
+    records = queue.SimpleQueue()
+    handler = logs._QueueHandler(records)
+    handler.addFilter(logs.RequestContextFilter())
+    logger = logging.getLogger("app.tests")
+    logger.addHandler(handler)
+    token = current_request.set(RequestStats("POST", "/shoutouts"))
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("create %s failed", "shoutout", extra={"user_id": 7})
+    finally:
+        current_request.reset(token)
+        logger.removeHandler(handler)
+
+    entry = json.loads(logs.JsonFormatter().format(records.get_nowait()))
+    assert entry["message"] == "create shoutout failed"
+    assert entry["level"] == "ERROR"
+    assert entry["user_id"] == 7
+    assert (entry["method"], entry["path"]) == ("POST", "/shoutouts")
+    assert "ValueError: boom" in entry["exc_info"]
+
+
+def test_access_log_lines_do_not_carry_stream_tokens():
+    record = logging.makeLogRecord({
+        "msg": '%s - "%s %s HTTP/%s" %d',
+        "args": ("10.0.0.1:5000", "GET", "/stream?token=secret.jwt.value&department=HR", "1.1", 200),
+    })
+    assert logs.RedactTokensFilter().filter(record)
+    assert record.getMessage() == '10.0.0.1:5000 - "GET /stream?token=[redacted]&department=HR HTTP/1.1" 200'
+
+
+@pytest.mark.asyncio
+async def test_health_does_no_io_and_ready_checks_the_database(client, monkeypatch):
+    with StatementCounter() as counter:
+        r = await client.get("/health")
+    assert r.status_code == 200 and r.json() == {"status": "ok"}
+    assert counter.count == 0
+
+    r = await client.get("/ready")
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["database"] == "ok"
+    assert isinstance(body["users_estimate"], int)
+    assert "checked_out" in body["db_pool"]
+
+    async def stuck():
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(main, "_check_database", stuck)
+    monkeypatch.setattr(main.settings, "READY_TIMEOUT_SECONDS", 0.05)
+    r = await client.get("/ready")
+    assert r.status_code == 503
+    assert r.json()["database"] == "timeout"
@@ -0,0 +1,162 @@
+"""EXPLAIN checks for the feed filters, the inbox and the user directory search.
+
+Seeds 20k users in 200 departments and 100k shoutouts, a quarter of them
+tagging someone, inside a transaction that is rolled back afterwards
+(ANALYZE included), then asserts that every filter combination of
+`crud.feed_query` and the inbox pages are planned without a sequential scan
+and that `crud.directory_query` reads its prefix indexes only. The comment
+thread walk is run (EXPLAIN ANALYZE) on a thread of 12k replies of its own.
+"""
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from app import crud
+from app.database import engine
+
+USERS = 20_000
+DEPARTMENTS = 200
+SHOUTOUTS = 100_000
+
+
+@pytest_asyncio.fixture
+async def seeded():
+    tag = uuid.uuid4().hex[:8]
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        await conn.execute(
+            text("""
+                INSERT INTO users (email, name, password_hash, department, role)
+                SELECT 'plan-' || g || '-' || :tag || '@example.com',
+                       CASE WHEN g % 2 = 0 THEN 'plan ' ELSE 'member ' END || g, 'x',
+                       'Plan' || :tag || '-' || (g % :departments), 'employee'
+                FROM generate_series(1, :users) g
+            """),
+            {"tag": tag, "users": USERS, "departments": DEPARTMENTS},
+        )
+        await conn.execute(
+            text("""
+                WITH a AS (SELECT array_agg(id) AS ids FROM users WHERE department LIKE 'Plan' || :tag || '-%'),
+                s AS (
+                    INSERT INTO shoutouts (author_id, message, created_at)
+                    SELECT a.ids[1 + g % cardinality(a.ids)], 'plan ' || g, now() - g * interval '1 minute'
+                    FROM generate_series(1, :shoutouts) g, a
+                    RETURNING id
+                )
+                INSERT INTO shoutout_recipients (shoutout_id, user_id)
+                SELECT s.id, a.ids[1 + s.id * 7 % cardinality(a.ids)]
+                FROM s, a
+                WHERE s.id % 4 = 0
+            """),
+            {"tag": tag, "shoutouts": SHOUTOUTS},
+        )
+        await conn.execute(text("ANALYZE users"))
+        await conn.execute(text("ANALYZE shoutouts"))
+        await conn.execute(text("ANALYZE shoutout_recipients"))
+        author_id = (await conn.execute(
+            text("SELECT id FROM users WHERE email = :email"), {"email": f"plan-7-{tag}@example.com"}
+        )).scalar()
+        yield conn, {"department": f"Plan{tag}-7", "sender_id": author_id}
+        await trans.rollback()
+    await engine.dispose()
+
+
+async def explain(conn, stmt, analyze: bool = False) -> str:
+    compiled = stmt.compile(dialect=engine.dialect)
+    params = compiled.construct_params()
+    result = await conn.exec_driver_sql(
+        ("EXPLAIN ANALYZE " if analyze else "EXPLAIN ") + str(compiled),
+        tuple(params[name] for name in compiled.positiontup),
+    )
+    return "\n".join(row[0] for row in result)
+
+
+@pytest.mark.asyncio
+async def test_feed_filters_use_indexes(seeded):
+    conn, values = seeded
+    now = datetime.now(timezone.utc)
+    week = {"from_dt": now - timedelta(days=7), "to_dt": now - timedelta(days=1)}
+    combinations = {
+        "no filter": {},
+        "keyset page": {"before": (now - timedelta(days=3), 0)},
+        "department": {"department": values["department"]},
+        "sender": {"sender_id": values["sender_id"]},
+        "date range": week,
+        "department + date range": {"department": values["department"], **week},
+        "sender + date range": {"sender_id": values["sender_id"], **week},
+        "department + sender": {"department": values["department"], "sender_id": values["sender_id"]},
+        "sender + keyset page": {"sender_id": values["sender_id"], "before": (now - timedelta(days=3), 0)},
+    }
+    for name, params in combinations.items():
+        plan = await explain(conn, crud.feed_query(limit=50, **params))
+        assert "Seq Scan" not in plan, f"{name}:\n{plan}"
+
+
+@pytest.mark.asyncio
+async def test_inbox_pages_use_the_recipient_index(seeded):
+    conn, values = seeded
+    for name, before in {"first page": None, "keyset page": 50_000}.items():
+        plan = await explain(conn, crud.inbox_query(values["sender_id"], limit=20, before=before))
+        assert "Seq Scan" not in plan, f"{name}:\n{plan}"
+        assert "ix_shoutout_recipients_user_id_shoutout_id" in plan, f"{name}:\n{plan}"
+
+
+@pytest.mark.asyncio
+async def test_directory_search_is_index_only(seeded):
+    conn, values = seeded
+    cases = {
+        "short prefix": {"prefix": "p"},
+        "name prefix": {"prefix": "plan 12"},
+        "email prefix": {"prefix": "plan-12"},
+        "keyset page": {"prefix": "plan 1", "after": ("plan 1500", 0)},
+        "department": {"prefix": "plan", "department": values["department"]},
+    }
+    for name, params in cases.items():
+        plan = await explain(conn, crud.directory_query(limit=20, exclude_id=values["sender_id"], **params))
+        assert "Seq Scan" not in plan, f"{name}:\n{plan}"
+        if name != "department":
+            assert plan.count("Index Only Scan using ix_users_") == 2, f"{name}:\n{plan}"
+
+
+@pytest.mark.asyncio
+async def test_comment_thread_walk_stops_at_the_reply_cap():
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        ids = (await conn.execute(text("""
+            WITH u AS (
+                INSERT INTO users (email, name, password_hash, department, role)
+                VALUES ('thread-' || :tag || '@example.com', 'thread', 'x', 'Thread', 'employee') RETURNING id
+            ), s AS (
+                INSERT INTO shoutouts (author_id, message) SELECT id, 'big thread' FROM u RETURNING id, author_id
+            )
+            INSERT INTO comments (shoutout_id, user_id, content) SELECT id, author_id, 'root' FROM s
+            RETURNING shoutout_id, user_id, id
+        """), {"tag": uuid.uuid4().hex[:8]})).one()
+        shoutout_id, user_id, root_id = ids
+        # 2000 replies to the root, and 100 replies to each of the first 100 of them
+        await conn.execute(text("""
+            INSERT INTO comments (shoutout_id, user_id, content, parent_id, created_at)
+            SELECT :shoutout_id, :user_id, 'reply ' || g, :root_id, now() + g * interval '1 second'
+            FROM generate_series(1, 2000) g
+        """), {"shoutout_id": shoutout_id, "user_id": user_id, "root_id": root_id})
+        await conn.execute(text("""
+            INSERT INTO comments (shoutout_id, user_id, content, parent_id)
+            SELECT :shoutout_id, :user_id, 'nested ' || g, p.id
+            FROM (SELECT id FROM comments WHERE parent_id = :root_id ORDER BY created_at LIMIT 100) p,
+                 generate_series(1, 100) g
+        """), {"shoutout_id": shoutout_id, "user_id": user_id, "root_id": root_id})
+        await conn.execute(text("ANALYZE comments"))
+
+        plan = await explain(conn, crud.comment_thread_query(shoutout_id, max_replies=50), analyze=True)
+        # no step of the walk reads more rows than the page holds, although the thread has 12k
+        walk = plan[plan.index("CTE levels"):plan.index("CTE Scan on levels")]
+        rows = [int(n) for n in re.findall(r"actual time=\S+ rows=(\d+)", walk)]
+        assert rows and max(rows) <= 51, plan
+        assert "Seq Scan" not in walk and "ix_comments_parent_id_created_at_id" in walk, plan
+        await trans.rollback()
+    await engine.dispose()
+
@@ -0,0 +1,91 @@
+import pytest
+
+from app.core import ratelimit
+from app.core.ratelimit import Limit, MemoryBackend, RateLimiter, RedisBackend
+from conftest import register_and_login
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_limit_rules_parse():
+    limit = Limit.parse("10/minute burst 20")
+    assert (limit.rate, limit.burst) == (10 / 60, 20)
+    assert Limit.parse(" 5 / second ").burst == 5
+    for bad in ("10", "10/fortnight", "0/minute", "ten/minute"):
+        with pytest.raises(ValueError):
+            Limit.parse(bad)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["memory", "redis"])
+async def test_token_bucket_allows_a_burst_then_refills(kind):
+    clock = Clock()
+    if kind == "memory":
+        backend = MemoryBackend(maxsize=10, clock=clock)
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")  # the backend runs a Lua script
+        backend = RedisBackend(fakeredis.FakeAsyncRedis(), clock=clock)
+    limit = Limit.parse("6/minute burst 3")  # one token every 10 seconds
+
+    assert [await backend.take("k", limit) for _ in range(3)] == [0, 0, 0]
+    assert await backend.take("k", limit) == pytest.approx(10)
+    assert await backend.take("other", limit) == 0  # buckets are per key
+
+    clock.now += 4
+    assert await backend.take("k", limit) == pytest.approx(6)
+    clock.now += 6
+    assert await backend.take("k", limit) == 0
+    clock.now += 3600  # refills up to the burst, never beyond
+    assert [await backend.take("k", limit) for _ in range(4)][-1] > 0
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_drops_least_recently_used_buckets():
+    backend = MemoryBackend(maxsize=2)
+    limit = Limit.parse("1/hour")
+    for key in ("a", "b", "c"):
+        await backend.take(key, limit)
+    assert backend.stats()["buckets"] == 2
+    assert await backend.take("a", limit) == 0  # forgotten, so full again
+    assert await backend.take("c", limit) > 0
+
+
+@pytest.mark.asyncio
+async def test_auth_is_limited_per_address_and_writes_per_user(client, monkeypatch):
+    author, headers = await register_and_login(client)
+    _, other_headers = await register_and_login(client)
+    sid = (await client.post("/shoutouts", json={"message": "limited"}, headers=headers)).json()["id"]
+
+    rules = {"login": Limit.parse("2/minute"), "reactions": Limit.parse("2/minute")}
+    limiter = RateLimiter(MemoryBackend(maxsize=100), rules)
+    monkeypatch.setattr(ratelimit, "limiter", limiter)
+
+    wrong = {"username": author["email"], "password": "wrong"}
+    assert [(await client.post("/auth/login", data=wrong)).status_code for _ in range(2)] == [401, 401]
+    r = await client.post("/auth/login", data={"username": author["email"], "password": "secret"})
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "30"
+    # no rule for register: unlimited
+    assert (await client.post("/auth/register", json={"email": "not-an-email", "password": "x"})).status_code == 422
+
+    url = f"/shoutouts/{sid}/reactions"
+    for kind in ("like", "clap"):
+        assert (await client.post(url, json={"reaction_type": kind}, headers=headers)).status_code == 200
+    r = await client.post(url, json={"reaction_type": "star"}, headers=headers)
+    assert r.status_code == 429 and int(r.headers["Retry-After"]) > 0
+    assert (await client.post(url, json={"reaction_type": "star"}, headers=other_headers)).status_code == 200
+    assert limiter.stats()["rejected"] == {"login": 1, "reactions": 1}
+
+    # a failing backend lets requests through
+    async def broken(key, limit):
+        raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(limiter.backend, "take", broken)
+    assert (await client.post(url, json={"reaction_type": "like"}, headers=headers)).status_code == 200
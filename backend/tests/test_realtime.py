@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import asyncpg
+import pytest
+
+from app import realtime
+from app.database import settings
+from app.main import app
+from conftest import register_and_login
+
+DSN = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+@pytest.mark.asyncio
+async def test_hub_routes_by_department_and_evicts_slow_consumers():
+    hub = realtime.Hub(queue_size=2)
+    everyone = hub.subscribe(realtime.topics_for(None))
+    sales = hub.subscribe(realtime.topics_for("Sales"))
+
+    await hub.publish({"type": "shoutout.created", "shoutout_id": 1, "department": "HR"})
+    await hub.publish({"type": "shoutout.created", "shoutout_id": 2, "department": "Sales"})
+    assert (await sales.get())["shoutout_id"] == 2
+    assert sales.queue.empty()
+
+    # `everyone` never reads: the third event overflows its queue
+    await hub.publish({"type": "shoutout.created", "shoutout_id": 3, "department": "Sales"})
+    assert everyone.evicted
+    assert await everyone.get() is realtime.EVICTED
+    assert hub.stats()["evicted"] == 1
+    assert hub.stats()["subscribers"] == 1
+
+    sales.close()
+    assert not hub.has_listeners
+
+
+@pytest.mark.asyncio
+async def test_writes_publish_live_events(client):
+    author, headers = await register_and_login(client, department="Realtime")
+    sub = realtime.hub.subscribe(realtime.topics_for("Realtime"))
+    try:
+        r = await client.post("/shoutouts", json={"message": "live"}, headers=headers)
+        sid = r.json()["id"]
+        await client.post(f"/shoutouts/{sid}/reactions", json={"reaction_type": "clap"}, headers=headers)
+        await client.post(f"/shoutouts/{sid}/comments", json={"content": "hi"}, headers=headers)
+
+        events = [sub.queue.get_nowait() for _ in range(3)]
+        assert [e["type"] for e in events] == ["shoutout.created", "reaction.updated", "comment.created"]
+        assert events[1]["reactions"] == {"clap": 1}
+        assert all(e["shoutout_id"] == sid for e in events)
+    finally:
+        sub.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_authenticates_by_stream_token_and_delivers_events(client):
+    author, headers = await register_and_login(client, department="Streaming")
+    r = await client.post("/stream/token", headers=headers)
+    assert r.status_code == 200, r.text
+    token = r.json()["token"]
+
+    # the query takes stream tokens only, and they open nothing else
+    for params in ({}, {"token": "not-a-token"}, {"token": headers["Authorization"].split()[1]}):
+        r = await client.get("/stream", params={"department": "Streaming", **params})
+        assert r.status_code == 401
+    r = await client.get("/auth/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 401
+
+    # drive the endpoint directly: the test transport would wait for the endless body
+    sent: asyncio.Queue = asyncio.Queue()
+    disconnect = asyncio.Event()
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/stream", "raw_path": b"/stream", "root_path": "",
+        "query_string": f"department=Streaming&token={token}".encode(),
+        "headers": [(b"host", b"test")], "client": ("127.0.0.1", 50000), "server": ("test", 80),
+    }
+    stream = asyncio.create_task(app(scope, receive, sent.put))
+    try:
+        start = await asyncio.wait_for(sent.get(), timeout=5)
+        assert start["status"] == 200
+        assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+        assert (await asyncio.wait_for(sent.get(), timeout=5))["body"] == b"retry: 3000\n\n"
+
+        r = await client.post("/shoutouts", json={"message": "streamed"}, headers=headers)
+        chunk = (await asyncio.wait_for(sent.get(), timeout=5))["body"].decode()
+        name, data = chunk.strip().split("\n")
+        assert name == "event: shoutout.created"
+        assert json.loads(data.removeprefix("data: "))["shoutout_id"] == r.json()["id"]
+    finally:
+        disconnect.set()
+        await asyncio.wait_for(stream, timeout=5)
+    assert "department:Streaming" not in realtime.hub._topics
+
+
+@pytest.mark.asyncio
+async def test_postgres_hub_broadcasts_through_notify():
+    hub = realtime.PostgresHub(10, "bragboard_events_test", DSN)
+    await hub.start()
+    try:
+        sub = hub.subscribe({"all"})
+        await hub.publish({"type": "shoutout.created", "shoutout_id": 42})
+        event = await asyncio.wait_for(sub.get(), timeout=5)
+        assert event["shoutout_id"] == 42
+    finally:
+        await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_postgres_hub_reconnects_after_losing_its_connection():
+    hub = realtime.PostgresHub(10, "bragboard_events_test", DSN, min_backoff=0.05)
+    await hub.start()
+    admin = await asyncpg.connect(DSN)
+    try:
+        sub = hub.subscribe({"all"})
+        await admin.execute("SELECT pg_terminate_backend($1)", hub._conn.get_server_pid())
+        for _ in range(50):
+            if hub.reconnects and hub.stats()["connected"]:
+                break
+            await asyncio.sleep(0.1)
+        assert hub.reconnects == 1
+
+        # the new connection both listens and notifies
+        await hub.publish({"type": "shoutout.created", "shoutout_id": 43})
+        assert (await asyncio.wait_for(sub.get(), timeout=5))["shoutout_id"] == 43
+        await admin.execute("SELECT pg_notify('bragboard_events_test', $1)", json.dumps({"shoutout_id": 44}))
+        assert (await asyncio.wait_for(sub.get(), timeout=5))["shoutout_id"] == 44
+    finally:
+        await admin.close()
+        await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_postgres_hub_starts_without_the_database_and_keeps_retrying():
+    hub = realtime.PostgresHub(10, "bragboard_events_test", "postgresql://nobody@127.0.0.1:1/none", connect_timeout=0.2)
+    await asyncio.wait_for(hub.start(), timeout=2)
+    try:
+        assert not hub.stats()["connected"]
+        assert not hub._task.done()  # still retrying
+        with pytest.raises(ConnectionError):
+            await hub.publish({"type": "shoutout.created", "shoutout_id": 1})
+    finally:
+        await hub.stop()
+
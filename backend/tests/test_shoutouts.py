@@ -0,0 +1,550 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import update
+
+from app import crud, models
+from app.database import AsyncSessionLocal
+from conftest import StatementCounter, register_and_login
+
+
+@pytest.mark.asyncio
+async def test_feed_statement_count_is_independent_of_page_size(client):
+    author, headers = await register_and_login(client)
+    recipient, _ = await register_and_login(client)
+
+    for i in range(6):
+        r = await client.post(
+            "/shoutouts",
+            json={"message": f"feed query count {i}", "recipient_ids": [recipient["id"]]},
+            headers=headers,
+        )
+        assert r.status_code == 200, r.text
+
+    counts = {}
+    for limit in (1, 6):
+        with StatementCounter() as counter:
+            r = await client.get("/shoutouts", params={"limit": limit, "sender_id": author["id"]}, headers=headers)
+        assert r.status_code == 200, r.text
+        assert len(r.json()) == limit
+        assert r.json()[0]["recipients"][0]["id"] == recipient["id"]
+        counts[limit] = counter.count
+
+    # page + authors + recipients (the current user is cached)
+    assert counts[1] == counts[6] == 3
+
+
+@pytest.mark.asyncio
+async def test_feed_cursor_pages_are_stable_across_new_posts(client):
+    author, headers = await register_and_login(client)
+
+    for i in range(3):
+        r = await client.post("/shoutouts", json={"message": f"cursor {i}"}, headers=headers)
+        assert r.status_code == 200, r.text
+
+    params = {"limit": 2, "sender_id": author["id"]}
+    r = await client.get("/shoutouts", params=params, headers=headers)
+    first = [s["message"] for s in r.json()]
+    assert first == ["cursor 2", "cursor 1"]
+    cursor = r.headers["X-Next-Cursor"]
+
+    # a new post must not shift the next page
+    r = await client.post("/shoutouts", json={"message": "cursor 3"}, headers=headers)
+    assert r.status_code == 200, r.text
+
+    r = await client.get("/shoutouts", params={**params, "cursor": cursor}, headers=headers)
+    assert [s["message"] for s in r.json()] == ["cursor 0"]
+    assert "X-Next-Cursor" not in r.headers
+
+    r = await client.get("/shoutouts", params={**params, "cursor": "not-a-cursor"}, headers=headers)
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_enriched_feed_aggregates_reactions_and_comments(client):
+    author, headers = await register_and_login(client)
+    other, other_headers = await register_and_login(client)
+
+    ids = []
+    for i in range(3):
+        r = await client.post("/shoutouts", json={"message": f"enriched {i}"}, headers=headers)
+        ids.append(r.json()["id"])
+
+    await client.post(f"/shoutouts/{ids[0]}/reactions", json={"reaction_type": "clap"}, headers=headers)
+    await client.post(f"/shoutouts/{ids[0]}/reactions", json={"reaction_type": "clap"}, headers=other_headers)
+    await client.post(f"/shoutouts/{ids[1]}/reactions", json={"reaction_type": "star"}, headers=other_headers)
+    for i in range(4):
+        await client.post(f"/shoutouts/{ids[0]}/comments", json={"content": f"c{i}"}, headers=other_headers)
+
+    params = {"sender_id": author["id"], "comments_preview": 2}
+    counts = []
+    for limit in (1, 3):
+        with StatementCounter() as counter:
+            r = await client.get("/shoutouts/feed", params={**params, "limit": limit}, headers=headers)
+        assert r.status_code == 200, r.text
+        counts.append(counter.count)
+    # page (with reaction counters), authors, recipients, own reactions,
+    # comment counts, previews and preview authors -- never per shoutout
+    assert counts[0] <= counts[1] == 7
+
+    feed = {s["id"]: s for s in r.json()}
+    assert feed[ids[0]]["reactions"] == {"clap": 2}
+    assert feed[ids[0]]["user_reaction"] == "clap"
+    assert feed[ids[0]]["comment_count"] == 4
+    assert [c["content"] for c in feed[ids[0]]["comments"]] == ["c3", "c2"]
+    assert feed[ids[0]]["comments"][0]["author"]["id"] == other["id"]
+    assert feed[ids[1]]["reactions"] == {"star": 1}
+    assert feed[ids[1]]["user_reaction"] is None
+    assert feed[ids[2]]["comment_count"] == 0 and feed[ids[2]]["comments"] == []
+
+
+@pytest.mark.asyncio
+async def test_create_shoutout_inserts_recipients_in_one_statement(client):
+    author, headers = await register_and_login(client)
+    recipients = [(await register_and_login(client))[0] for _ in range(3)]
+    ids = [u["id"] for u in recipients]
+
+    with StatementCounter() as counter:
+        r = await client.post("/shoutouts", json={"message": "bulk", "recipient_ids": ids + ids[:1]}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert sorted(u["id"] for u in r.json()["recipients"]) == sorted(ids)
+    assert sum("INSERT INTO shoutout_recipients" in s for s in counter.statements) == 1
+
+    r = await client.post("/shoutouts", json={"message": "bad", "recipient_ids": [ids[0], 0]}, headers=headers)
+    assert r.status_code == 400
+    assert "0" in r.json()["detail"]
+    # the rejected shoutout was rolled back
+    r = await client.get("/shoutouts", params={"sender_id": author["id"]}, headers=headers)
+    assert [s["message"] for s in r.json()] == ["bulk"]
+
+
+@pytest.mark.asyncio
+async def test_department_tagging_is_expanded_server_side(client):
+    department = f"Dept-{uuid.uuid4().hex[:8]}"
+    author, headers = await register_and_login(client, department=department)
+    members = [(await register_and_login(client, department=department))[0] for _ in range(3)]
+    outsider, _ = await register_and_login(client)
+
+    r = await client.post(
+        "/shoutouts",
+        json={"message": "whole team", "recipient_departments": [department], "recipient_ids": [outsider["id"], members[0]["id"]]},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    tagged = sorted(u["id"] for u in r.json()["recipients"])
+    # every member except the author, plus the individually tagged user, each once
+    assert tagged == sorted([m["id"] for m in members] + [outsider["id"]])
+
+
+@pytest.mark.asyncio
+async def test_invalid_recipients_keep_the_callers_transaction(client):
+    author, headers = await register_and_login(client)
+    async with AsyncSessionLocal() as session:
+        kept = await crud.create_shoutout(session, author_id=author["id"], message="kept", commit=False)
+        with pytest.raises(crud.InvalidRecipients):
+            await crud.create_shoutout(
+                session, author_id=author["id"], message="dropped", recipient_ids=[2147483000], commit=False
+            )
+        await session.commit()
+
+    r = await client.get("/shoutouts", params={"sender_id": author["id"]}, headers=headers)
+    assert [s["id"] for s in r.json()] == [kept.id]
+
+
+@pytest.mark.asyncio
+async def test_reaction_counters_follow_upserts_and_reconcile(client):
+    _, headers = await register_and_login(client)
+    _, other_headers = await register_and_login(client)
+    r = await client.post("/shoutouts", json={"message": "counters"}, headers=headers)
+    sid = r.json()["id"]
+
+    async def counts():
+        r = await client.get(f"/shoutouts/{sid}/reactions", headers=headers)
+        return r.json()["reactions"]
+
+    for _ in range(2):
+        r = await client.post(f"/shoutouts/{sid}/reactions", json={"reaction_type": "like"}, headers=headers)
+        assert r.status_code == 200, r.text
+    await client.post(f"/shoutouts/{sid}/reactions", json={"reaction_type": "like"}, headers=other_headers)
+    assert await counts() == {"like": 2}
+
+    r = await client.post(f"/shoutouts/{sid}/reactions", json={"reaction_type": "star"}, headers=other_headers)
+    assert r.json()["reaction_type"] == "star"
+    assert await counts() == {"like": 1, "star": 1}
+
+    await client.delete(f"/shoutouts/{sid}/reactions", headers=headers)
+    assert await counts() == {"star": 1}
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(models.ShoutOut).where(models.ShoutOut.id == sid).values(clap_count=7))
+        await session.commit()
+        assert await crud.reconcile_reaction_counts(session, sid, sid + 1) == 1
+    assert await counts() == {"star": 1}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_does_not_lose_concurrent_reactions(client):
+    user, headers = await register_and_login(client)
+    r = await client.post("/shoutouts", json={"message": "reconcile race"}, headers=headers)
+    sid = r.json()["id"]
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(models.ShoutOut).where(models.ShoutOut.id == sid).values(like_count=5))
+        await session.commit()
+
+    # a reaction in flight: its trigger has bumped like_count to 6 but it has not committed
+    async with AsyncSessionLocal() as writer:
+        await crud.add_reaction(writer, sid, user["id"], "like", commit=False)
+
+        async def reconcile():
+            async with AsyncSessionLocal() as session:
+                return await crud.reconcile_reaction_counts(session, sid, sid + 1)
+
+        task = asyncio.create_task(reconcile())
+        await asyncio.sleep(0.5)
+        assert not task.done()  # waiting for the writer's lock on the shoutout
+        await writer.commit()
+    assert await task == 1
+    r = await client.get(f"/shoutouts/{sid}/reactions", headers=headers)
+    assert r.json()["reactions"] == {"like": 1}
+
+
+@pytest.mark.asyncio
+async def test_comment_tree_is_assembled_in_one_query(client):
+    _, headers = await register_and_login(client)
+    r = await client.post("/shoutouts", json={"message": "thread"}, headers=headers)
+    sid = r.json()["id"]
+
+    async def comment(content, parent_id=None):
+        r = await client.post(
+            f"/shoutouts/{sid}/comments", json={"content": content, "parent_id": parent_id}, headers=headers
+        )
+        assert r.status_code == 200, r.text
+        return r.json()["id"]
+
+    a = await comment("a")
+    a1 = await comment("a1", a)
+    await comment("a1x", a1)
+    await comment("a2", a)
+    await comment("b")
+
+    with StatementCounter() as counter:
+        r = await client.get(f"/shoutouts/{sid}/comments/tree", headers=headers)
+    assert r.status_code == 200, r.text
+    # thread CTE + authors
+    assert counter.count == 2
+
+    def shape(nodes):
+        return [(n["content"], shape(n["replies"])) for n in nodes]
+
+    assert shape(r.json()["comments"]) == [("a", [("a1", [("a1x", [])]), ("a2", [])]), ("b", [])]
+
+    r = await client.get(f"/shoutouts/{sid}/comments/tree", params={"limit": 1, "max_depth": 1}, headers=headers)
+    page = r.json()
+    assert shape(page["comments"]) == [("a", [("a1", []), ("a2", [])])]
+
+    r = await client.get(
+        f"/shoutouts/{sid}/comments/tree", params={"limit": 1, "cursor": page["next_cursor"]}, headers=headers
+    )
+    assert shape(r.json()["comments"]) == [("b", [])]
+
+    r = await client.get(f"/shoutouts/{sid}/comments/tree", params={"max_replies": 1}, headers=headers)
+    assert shape(r.json()["comments"]) == [("a", [("a1", [])]), ("b", [])]
+    assert r.json()["truncated"] is True
+
+
+@pytest.mark.asyncio
+async def test_feed_cache_serves_etags_and_follows_writes(client):
+    author, headers = await register_and_login(client)
+    r = await client.post("/shoutouts", json={"message": "cached 0"}, headers=headers)
+    shoutout_id = r.json()["id"]
+
+    params = {"sender_id": author["id"]}
+    r = await client.get("/shoutouts", params=params, headers=headers)
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+
+    # a hit never touches the database
+    with StatementCounter() as counter:
+        r = await client.get("/shoutouts", params=params, headers=headers)
+    assert counter.count == 0
+    assert r.headers["ETag"] == etag
+
+    r = await client.get("/shoutouts", params=params, headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+    # a reaction does not change the plain feed, a new shoutout does
+    await client.post(f"/shoutouts/{shoutout_id}/reactions", json={"reaction_type": "like"}, headers=headers)
+    r = await client.get("/shoutouts", params=params, headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+
+    await client.post("/shoutouts", json={"message": "cached 1"}, headers=headers)
+    r = await client.get("/shoutouts", params=params, headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert [s["message"] for s in r.json()] == ["cached 1", "cached 0"]
+
+    # the enriched feed is invalidated by reactions
+    r = await client.get("/shoutouts/feed", params=params, headers=headers)
+    etag = r.headers["ETag"]
+    await client.post(f"/shoutouts/{shoutout_id}/reactions", json={"reaction_type": "star"}, headers=headers)
+    r = await client.get("/shoutouts/feed", params=params, headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()[1]["user_reaction"] == "star"
+
+
+@pytest.mark.asyncio
+async def test_feed_cache_only_follows_writes_on_the_cards_shown(client):
+    author, headers = await register_and_login(client)
+    other, other_headers = await register_and_login(client)
+    r = await client.post("/shoutouts", json={"message": "shown"}, headers=headers)
+    shown = r.json()["id"]
+    r = await client.post("/shoutouts", json={"message": "elsewhere"}, headers=other_headers)
+    elsewhere = r.json()["id"]
+
+    params = {"sender_id": author["id"]}
+    r = await client.get("/shoutouts/feed", params=params, headers=headers)
+    etag = r.headers["ETag"]
+
+    # reactions and comments on shoutouts off the page leave it cached
+    for reaction_type in ("like", "clap", "star"):
+        r = await client.post(
+            f"/shoutouts/{elsewhere}/reactions", json={"reaction_type": reaction_type}, headers=other_headers
+        )
+        assert r.status_code == 200, r.text
+        with StatementCounter() as counter:
+            r = await client.get("/shoutouts/feed", params=params, headers={**headers, "If-None-Match": etag})
+        assert r.status_code == 304
+        assert counter.count == 0
+    r = await client.post(f"/shoutouts/{elsewhere}/comments", json={"content": "nice"}, headers=headers)
+    comment_id = r.json()["id"]
+    r = await client.get("/shoutouts/feed", params=params, headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+
+    # a comment can only be deleted under its own shoutout
+    r = await client.delete(f"/shoutouts/{shown}/comments/{comment_id}", headers=headers)
+    assert r.status_code == 404
+
+    r = await client.post(f"/shoutouts/{shown}/reactions", json={"reaction_type": "clap"}, headers=other_headers)
+    r = await client.get("/shoutouts/feed", params=params, headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()[0]["reactions"]["clap"] == 1
+
+
+@pytest.mark.asyncio
+async def test_response_cache_on_redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.core.response_cache import RedisBackend, ResponseCache
+
+    cache = ResponseCache(RedisBackend(fakeredis.FakeAsyncRedis(), ttl=30))
+    key = await cache.key("shoutouts", {"limit": 5, "department": None}, depends_on=("shoutouts",))
+    assert await cache.get(key) is None
+
+    stored = await cache.set(key, b"[]", {"X-Next-Cursor": "abc"})
+    assert await cache.get(key) == stored
+
+    # parameter order does not matter; a bump moves to a new key
+    assert key == await cache.key("shoutouts", {"department": None, "limit": 5}, depends_on=("shoutouts",))
+    await cache.invalidate("shoutouts")
+    assert key != await cache.key("shoutouts", {"limit": 5, "department": None}, depends_on=("shoutouts",))
+
+    # generations expire with the entries built under them
+    assert 0 < await cache.backend.client.pttl("bragboard:cache:gen:shoutouts") <= 60_000
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_forgets_quiet_generations():
+    from app.core.response_cache import MemoryBackend
+
+    backend = MemoryBackend(maxsize=10, ttl=0.05)
+    await backend.bump("shoutout:1")
+    await backend.bump("shoutout:2")
+    first, second = await backend.generations(["shoutout:1", "shoutout:2"])
+    assert 0 < first < second
+
+    await asyncio.sleep(0.11)
+    assert await backend.generations(["shoutout:1"]) == [0]
+    await backend.bump("shoutout:1")
+    assert (await backend.generations(["shoutout:1"]))[0] > second
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_messages_and_comments_with_filters_and_cursor(client):
+    author, headers = await register_and_login(client)
+    other, other_headers = await register_and_login(client)
+    word = "quokka" + "".join(chr(ord("a") + int(c, 16)) for c in uuid.uuid4().hex[:8])
+
+    async def post(message, h=headers):
+        r = await client.post("/shoutouts", json={"message": message}, headers=h)
+        return r.json()["id"]
+
+    once = await post(f"the {word} launch went well")
+    twice = await post(f"{word} {word} all the way")
+    via_comment = await post("nothing to see here")
+    await client.post(f"/shoutouts/{via_comment}/comments", json={"content": f"{word} indeed"}, headers=other_headers)
+    by_other = await post(f"{word} from someone else", other_headers)
+    await post("unrelated")
+
+    r = await client.get("/shoutouts/search", params={"q": word}, headers=headers)
+    assert r.status_code == 200, r.text
+    hits = r.json()
+    assert {h["id"] for h in hits} == {once, twice, via_comment, by_other}
+    assert hits[0]["id"] == twice
+    assert hits[-1]["id"] == via_comment  # comment hits rank below message hits
+    assert [h["rank"] for h in hits] == sorted((h["rank"] for h in hits), reverse=True)
+
+    r = await client.get("/shoutouts/search", params={"q": word, "sender_id": author["id"]}, headers=headers)
+    assert by_other not in {h["id"] for h in r.json()}
+
+    pages, params = [], {"q": word, "limit": 3}
+    while True:
+        r = await client.get("/shoutouts/search", params=params, headers=headers)
+        pages.extend(h["id"] for h in r.json())
+        if "X-Next-Cursor" not in r.headers:
+            break
+        params["cursor"] = r.headers["X-Next-Cursor"]
+    assert pages == [h["id"] for h in hits]
+
+    r = await client.get("/shoutouts/search", params={"q": word, "cursor": "not-a-cursor"}, headers=headers)
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_inbox_pages_tagged_shoutouts_with_unread_marker(client):
+    _, author_headers = await register_and_login(client)
+    me, headers = await register_and_login(client)
+
+    ids = []
+    for i in range(4):
+        r = await client.post(
+            "/shoutouts", json={"message": f"inbox {i}", "recipient_ids": [me["id"]]}, headers=author_headers
+        )
+        ids.append(r.json()["id"])
+    await client.post("/shoutouts", json={"message": "not for me"}, headers=author_headers)
+
+    r = await client.get("/shoutouts/inbox", params={"limit": 3}, headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [s["id"] for s in body["items"]] == ids[::-1][:3]
+    assert all(s["unread"] for s in body["items"])
+    assert (body["unread"], body["unread_capped"], body["last_read_shoutout_id"]) == (4, False, 0)
+    assert body["items"][0]["recipients"][0]["id"] == me["id"]
+
+    with StatementCounter() as counter:
+        r = await client.get("/shoutouts/inbox", params={"limit": 3, "cursor": body["next_cursor"]}, headers=headers)
+    # marker + unread count, page, authors, recipients (the current user is cached by now)
+    assert counter.count == 4
+    assert [s["id"] for s in r.json()["items"]] == [ids[0]]
+    assert r.json()["next_cursor"] is None
+
+    r = await client.post("/shoutouts/inbox/read", json={"up_to": ids[2]}, headers=headers)
+    assert r.json() == {"last_read_shoutout_id": ids[2]}
+    body = (await client.get("/shoutouts/inbox", headers=headers)).json()
+    assert body["unread"] == 1
+    assert [s["unread"] for s in body["items"]] == [True, False, False, False]
+
+    # the marker never moves back; no body marks everything read
+    await client.post("/shoutouts/inbox/read", json={"up_to": ids[0]}, headers=headers)
+    r = await client.post("/shoutouts/inbox/read", headers=headers)
+    assert r.json() == {"last_read_shoutout_id": ids[3]}
+    assert (await client.get("/shoutouts/inbox", headers=headers)).json()["unread"] == 0
+
+    r = await client.get("/shoutouts/inbox", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_reactions_in_two_statements(client):
+    _, headers = await register_and_login(client)
+    _, other_headers = await register_and_login(client)
+    ids = []
+    for i in range(3):
+        ids.append((await client.post("/shoutouts", json={"message": f"batch {i}"}, headers=headers)).json()["id"])
+    await client.post(f"/shoutouts/{ids[0]}/reactions", json={"reaction_type": "clap"}, headers=headers)
+    await client.post(f"/shoutouts/{ids[0]}/reactions", json={"reaction_type": "like"}, headers=other_headers)
+    await client.post(f"/shoutouts/{ids[2]}/reactions", json={"reaction_type": "star"}, headers=other_headers)
+
+    with StatementCounter() as counter:
+        r = await client.get(
+            "/shoutouts/reactions", params={"ids": [f"{ids[0]},{ids[1]}", str(ids[2]), "2147483000"]}, headers=headers
+        )
+    assert r.status_code == 200, r.text
+    assert counter.count == 2
+    assert r.json() == {
+        str(ids[0]): {"reactions": {"like": 1, "clap": 1}, "user_reaction": "clap"},
+        str(ids[1]): {"reactions": {}, "user_reaction": None},
+        str(ids[2]): {"reactions": {"star": 1}, "user_reaction": None},
+    }
+
+    r = await client.post("/shoutouts/reactions", json={"ids": ids}, headers=other_headers)
+    assert r.json()[str(ids[2])]["user_reaction"] == "star"
+
+    too_many = list(range(1, 202))
+    assert (await client.post("/shoutouts/reactions", json={"ids": too_many}, headers=headers)).status_code == 422
+    r = await client.get("/shoutouts/reactions", params={"ids": ",".join(map(str, too_many))}, headers=headers)
+    assert r.status_code == 422
+    r = await client.get("/shoutouts/reactions", params={"ids": "1,abc"}, headers=headers)
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_write_endpoints_round_trips(client):
+    """BEGIN, the writes themselves (RETURNING the row, no refresh SELECT) and one COMMIT."""
+    user, headers = await register_and_login(client)
+    await client.get("/auth/users/me", headers=headers)  # warm the current-user cache
+
+    with StatementCounter() as counter:
+        r = await client.post("/shoutouts", json={"message": "trips", "recipient_ids": [user["id"]]}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["created_at"] and r.json()["recipients"][0]["id"] == user["id"]
+    assert counter.transaction_events == ["BEGIN", "COMMIT"]
+    assert counter.round_trips == 4  # shoutout INSERT, recipients INSERT ... SELECT
+    sid = r.json()["id"]
+
+    with StatementCounter() as counter:
+        r = await client.post(f"/shoutouts/{sid}/reactions", json={"reaction_type": "clap"}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert counter.round_trips == 3
+
+    with StatementCounter() as counter:
+        r = await client.post(f"/shoutouts/{sid}/comments", json={"content": "first"}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["author"]["id"] == user["id"] and r.json()["created_at"]
+    assert counter.round_trips == 3  # the foreign keys stand in for existence checks
+    comment_id = r.json()["id"]
+
+    with StatementCounter() as counter:
+        r = await client.post(
+            f"/shoutouts/{sid}/comments", json={"content": "reply", "parent_id": comment_id}, headers=headers
+        )
+    assert r.status_code == 200, r.text
+    assert counter.round_trips == 3
+
+    for url in (f"/shoutouts/{sid}/reactions", f"/shoutouts/{sid}/comments/{r.json()['id']}"):
+        with StatementCounter() as counter:
+            assert (await client.delete(url, headers=headers)).status_code == 200
+        assert counter.round_trips == 3
+
+    with StatementCounter() as counter:
+        r = await client.post(
+            "/auth/register", json={"email": f"trips-{uuid.uuid4().hex[:12]}@example.com", "password": "secret"}
+        )
+    assert r.status_code == 200, r.text
+    assert r.json()["role"] and counter.round_trips == 3
+
+    # the constraints, not extra SELECTs, turn away unknown shoutouts and duplicate emails
+    r = await client.post("/shoutouts/2147483000/reactions", json={"reaction_type": "clap"}, headers=headers)
+    assert r.status_code == 404
+    r = await client.post("/shoutouts/2147483000/comments", json={"content": "x"}, headers=headers)
+    assert r.status_code == 404 and r.json()["detail"] == "Shoutout not found"
+    r = await client.post(
+        f"/shoutouts/{sid}/comments", json={"content": "x", "parent_id": 2147483000}, headers=headers
+    )
+    assert r.status_code == 404 and r.json()["detail"] == "Parent comment not found"
+    r = await client.post("/shoutouts", json={"message": "another"}, headers=headers)
+    r = await client.post(
+        f"/shoutouts/{r.json()['id']}/comments", json={"content": "x", "parent_id": comment_id}, headers=headers
+    )
+    assert r.status_code == 404 and r.json()["detail"] == "Parent comment not found"
+    r = await client.post("/auth/register", json={"email": user["email"], "password": "secret"})
+    assert r.status_code == 400
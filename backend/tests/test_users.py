@@ -0,0 +1,58 @@
+import uuid
+
+import pytest
+
+from conftest import register_and_login
+
+
+@pytest.mark.asyncio
+async def test_directory_search_by_name_and_email_prefix_with_cursor(client):
+    me, headers = await register_and_login(client)
+    tag = uuid.uuid4().hex[:8]
+    people = [
+        (f"Dir{tag} Zed", f"zed-{tag}@example.com"),
+        (f"dir{tag} ada", f"ada-{tag}@example.com"),
+        (f"Dir{tag}_x Bob", f"bob-{tag}@example.com"),
+        (None, f"dir{tag}-noname@example.com"),           # matches by email only
+        (f"Dir{tag} Cy", f"dir{tag}-cy@example.com"),     # matches both ways, listed once
+        (f"Other {tag}", f"other-{tag}@example.com"),
+    ]
+    for name, email in people:
+        r = await client.post(
+            "/auth/register", json={"email": email, "password": "secret", "name": name, "department": "Directory"}
+        )
+        assert r.status_code == 200, r.text
+
+    r = await client.get("/users/search", params={"q": f"DIR{tag}"}, headers=headers)
+    assert r.status_code == 200, r.text
+    hits = r.json()
+    assert set(hits[0]) == {"id", "name", "email", "department"}
+    # ordered by what matched, lowercased, byte by byte (" " < "-" < "_")
+    assert [h["email"] for h in hits] == [
+        f"ada-{tag}@example.com", f"dir{tag}-cy@example.com", f"zed-{tag}@example.com",
+        f"dir{tag}-noname@example.com", f"bob-{tag}@example.com",
+    ]
+
+    # LIKE wildcards in the query are literal
+    r = await client.get("/users/search", params={"q": f"dir{tag}_"}, headers=headers)
+    assert [h["email"] for h in r.json()] == [f"bob-{tag}@example.com"]
+    r = await client.get("/users/search", params={"q": "%"}, headers=headers)
+    assert r.json() == []
+
+    # one per page: the cursor walks the same order without repeats
+    seen, cursor = [], None
+    while True:
+        params = {"q": f"dir{tag}", "limit": 1, **({"cursor": cursor} if cursor else {})}
+        r = await client.get("/users/search", params=params, headers=headers)
+        seen += [h["email"] for h in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == [h["email"] for h in hits]
+
+    # the caller is never offered to themselves
+    r = await client.get("/users/search", params={"q": me["email"]}, headers=headers)
+    assert r.json() == []
+
+    r = await client.get("/users/search", params={"q": f"dir{tag}", "cursor": "garbage"}, headers=headers)
+    assert r.status_code == 400
@@ -1,10 +1,12 @@
 import React, { useState } from "react"
 
-export default function CreateShoutout({ token, peers = [], onCreated }) {
+export default function CreateShoutout({ token, peers = [], department, onCreated }) {
   const [message, setMessage] = useState("")
   const [selected, setSelected] = useState(new Set())
   const [loading, setLoading] = useState(false)
   const [showPeers, setShowPeers] = useState(false)
+  // department-wide tagging is expanded by the backend; no need to send every id
+  const [tagDepartment, setTagDepartment] = useState(false)
 
   const toggle = (id) => {
     setSelected(prev => {
@@ -35,7 +37,8 @@ export default function CreateShoutout({ token, peers = [], onCreated }) {
         },
         body: JSON.stringify({
           message,
-          recipient_ids: Array.from(selected)
+          recipient_ids: Array.from(selected),
+          recipient_departments: tagDepartment && department ? [department] : []
         })
       })
 
@@ -43,6 +46,7 @@ export default function CreateShoutout({ token, peers = [], onCreated }) {
         setMessage("")
         setSelected(new Set())
         setShowPeers(false)
+        setTagDepartment(false)
         onCreated && onCreated()
       } else {
         const j = await res.json()
@@ -98,6 +102,18 @@ export default function CreateShoutout({ token, peers = [], onCreated }) {
             </button>
           </div>
 
+          {department && (
+            <label className="flex items-center text-sm mb-2 cursor-pointer">
+              <input
+                type="checkbox"
+                checked={tagDepartment}
+                onChange={e => setTagDepartment(e.target.checked)}
+                className="mr-2 w-4 h-4 text-blue-600 rounded focus:ring-blue-500"
+              />
+              🏢 Tag everyone in {department}
+            </label>
+          )}
+
           {/* Peer dropdown */}
           <select
             className="w-full text-sm border-2 border-gray-200 rounded-lg p-2.5 focus:border-blue-500 focus:ring-2 focus:ring-blue-200 transition-all duration-200 bg-white"
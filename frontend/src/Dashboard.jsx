@@ -82,6 +82,7 @@ export default function Dashboard({ token, onLogout }) {
             <CreateShoutout
               token={token}
               peers={peers}
+              department={me.department}
               onCreated={() => setRefreshKey(k => k + 1)}
             />
           </div>
@@ -46,18 +46,33 @@ function Comment({ comment, onDelete, currentUserId }) {
 }
 
 // Shoutout card with reactions and comments
-function ShoutoutCard({ shoutout, token, currentUserId }) {
-  const [reactions, setReactions] = useState({})
-  const [userReaction, setUserReaction] = useState(null)
-  const [comments, setComments] = useState([])
+function ShoutoutCard({ shoutout, token, currentUserId, liveEvent }) {
+  // The feed already carries reaction counts, the user's reaction and a comment preview
+  const [reactions, setReactions] = useState(shoutout.reactions || {})
+  const [userReaction, setUserReaction] = useState(shoutout.user_reaction ?? null)
+  const [comments, setComments] = useState(shoutout.comments || [])
+  const [commentCount, setCommentCount] = useState(shoutout.comment_count || 0)
   const [commentText, setCommentText] = useState('')
   const [showComments, setShowComments] = useState(false)
 
-  // Load reactions and comments
+  // Load the full comment list only when the thread is opened
   useEffect(() => {
-    loadReactions()
-    loadComments()
-  }, [])
+    if (showComments) loadComments()
+  }, [showComments])
+
+  // Apply live updates pushed by the server for this card
+  useEffect(() => {
+    if (!liveEvent || liveEvent.shoutout_id !== shoutout.id) return
+    if (liveEvent.type === 'reaction.updated' || liveEvent.type === 'reaction.removed') {
+      setReactions(liveEvent.reactions || {})
+      if (liveEvent.user_id === currentUserId) {
+        setUserReaction(liveEvent.type === 'reaction.updated' ? liveEvent.reaction_type : null)
+      }
+    } else if (liveEvent.type === 'comment.created' || liveEvent.type === 'comment.deleted') {
+      setCommentCount(n => Math.max(0, n + (liveEvent.type === 'comment.created' ? 1 : -1)))
+      if (showComments) loadComments()
+    }
+  }, [liveEvent])
 
   async function loadReactions() {
     try {
@@ -82,6 +97,7 @@ function ShoutoutCard({ shoutout, token, currentUserId }) {
       if (res.ok) {
         const data = await res.json()
         setComments(data)
+        setCommentCount(data.length)
       }
     } catch (err) {
       console.error('Error loading comments:', err)
@@ -196,7 +212,7 @@ function ShoutoutCard({ shoutout, token, currentUserId }) {
           onClick={() => setShowComments(!showComments)}
           className="ml-auto px-3 py-1 text-sm text-gray-600 hover:text-gray-800"
         >
-          💬 {comments.length} {comments.length === 1 ? 'Comment' : 'Comments'}
+          💬 {commentCount} {commentCount === 1 ? 'Comment' : 'Comments'}
         </button>
       </div>
 
@@ -254,6 +270,54 @@ export default function ShoutoutFeed({ token, refreshKey }) {
   const [filterToDate, setFilterToDate] = useState('')
   const [showFilters, setShowFilters] = useState(false)
 
+  // Live updates over Server-Sent Events
+  const [liveEvent, setLiveEvent] = useState(null)
+  const [liveKey, setLiveKey] = useState(0)
+
+  useEffect(() => {
+    if (!token) return
+    let source = null
+    let retry = null
+    let closed = false
+    const onEvent = (e) => {
+      const event = JSON.parse(e.data)
+      if (event.type === 'shoutout.created') {
+        setLiveKey(k => k + 1)
+      } else {
+        setLiveEvent(event)
+      }
+    }
+    // the URL carries a short-lived stream token, never the access token; every (re)connect fetches a new one
+    async function connect() {
+      try {
+        const res = await fetch('/stream/token', {
+          method: 'POST',
+          headers: { Authorization: `Bearer ${token}` }
+        })
+        if (!res.ok || closed) return
+        const { token: streamToken } = await res.json()
+        source = new EventSource(`/stream?token=${encodeURIComponent(streamToken)}`)
+        ;['shoutout.created', 'reaction.updated', 'reaction.removed', 'comment.created', 'comment.deleted']
+          .forEach(type => source.addEventListener(type, onEvent))
+        // EventSource would retry with the same, by then expired, token
+        source.addEventListener('evicted', reconnect)
+        source.onerror = reconnect
+      } catch (err) {
+        reconnect()
+      }
+    }
+    function reconnect() {
+      if (source) source.close()
+      if (!closed) retry = setTimeout(connect, 3000)
+    }
+    connect()
+    return () => {
+      closed = true
+      clearTimeout(retry)
+      if (source) source.close()
+    }
+  }, [token])
+
   useEffect(() => {
     async function loadUsers() {
       try {
@@ -308,7 +372,7 @@ export default function ShoutoutFeed({ token, refreshKey }) {
           params.append('to_date', filterToDate)
         }
 
-        const url = `/shoutouts?${params.toString()}`
+        const url = `/shoutouts/feed?${params.toString()}`
         const res = await fetch(url, {
           headers: { Authorization: `Bearer ${token}` }
         })
@@ -324,7 +388,7 @@ export default function ShoutoutFeed({ token, refreshKey }) {
     }
 
     load()
-  }, [token, refreshKey, me, filterDept, filterSender, filterFromDate, filterToDate])
+  }, [token, refreshKey, liveKey, me, filterDept, filterSender, filterFromDate, filterToDate])
 
   if (loading) {
     return (
@@ -438,6 +502,7 @@ export default function ShoutoutFeed({ token, refreshKey }) {
             shoutout={it} 
             token={token} 
             currentUserId={me?.id} 
+            liveEvent={liveEvent}
           />
         ))}
       </div>
@@ -7,7 +7,8 @@ export default defineConfig({
     proxy: {
       '/auth': 'http://localhost:8000',
       '/users': 'http://localhost:8000',
-      '/shoutouts': 'http://localhost:8000'
+      '/shoutouts': 'http://localhost:8000',
+      '/stream': 'http://localhost:8000'
     }
   }
 })